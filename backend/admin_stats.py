@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from migrations import is_applied, mark_applied
+
+# Admin dashboard statistics, served from a snapshot rebuilt on a timer.
+#   totals          estimated_document_count (collection metadata, O(1))
+#   city_stop_counts {_id: city_id, count}, $inc'd when stops are added/removed
+#   daily_stats     {_id: "YYYY-MM-DD", signups, trips}, $inc'd on register/create_trip
+# Both counter collections are built from source once per database when a
+# worker first starts (bootstrap_counters), and can be rebuilt with --rebuild.
+
+TOTALS = {
+    "users_count": "users",
+    "trips_count": "trips",
+    "activities_count": "trip_activities",
+    "posts_count": "posts",
+}
+TOP_CITIES = 10
+SERIES_DAYS = 30
+
+def _day(when: Optional[datetime] = None) -> str:
+    return (when or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
+# ==================== WRITE HOOKS ====================
+
+async def record_daily(db, field: str, amount: int = 1, when: Optional[datetime] = None):
+    await db.daily_stats.update_one({"_id": _day(when)}, {"$inc": {field: amount}}, upsert=True)
+
+async def record_stop_cities(db, city_ids: Iterable[str], sign: int = 1):
+    counts = {}
+    for city_id in city_ids:
+        counts[city_id] = counts.get(city_id, 0) + sign
+    if counts:
+        await db.city_stop_counts.bulk_write(
+            [UpdateOne({"_id": city_id}, {"$inc": {"count": count}}, upsert=True) for city_id, count in counts.items()],
+            ordered=False
+        )
+
+# ==================== SNAPSHOT ====================
+
+def top_cities_pipeline(limit: int = TOP_CITIES) -> list:
+    # Reads the maintained counts and joins city names in the same pipeline
+    return [
+        {"$match": {"count": {"$gt": 0}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "cities",
+            "localField": "_id",
+            "foreignField": "id",
+            "pipeline": [{"$project": {"_id": 0, "name": 1, "country": 1}}],
+            "as": "city"
+        }},
+        {"$unwind": {"path": "$city", "preserveNullAndEmptyArrays": True}},
+        {"$project": {"_id": 1, "count": 1, "city_name": "$city.name", "country": "$city.country"}}
+    ]
+
+async def build_snapshot(db, days: int = SERIES_DAYS) -> dict:
+    snapshot = {key: await db[name].estimated_document_count() for key, name in TOTALS.items()}
+    snapshot["top_cities"] = await db.city_stop_counts.aggregate(top_cities_pipeline()).to_list(TOP_CITIES)
+
+    today = datetime.now(timezone.utc)
+    series_days = [_day(today - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+    rows = {row['_id']: row async for row in db.daily_stats.find({"_id": {"$gte": series_days[0]}})}
+    snapshot["signups_per_day"] = [{"day": day, "count": rows.get(day, {}).get('signups', 0)} for day in series_days]
+    snapshot["trips_per_day"] = [{"day": day, "count": rows.get(day, {}).get('trips', 0)} for day in series_days]
+    snapshot["generated_at"] = today
+    return snapshot
+
+class AdminStats:
+    def __init__(self):
+        self.snapshot: Optional[dict] = None
+
+    async def refresh(self, db) -> dict:
+        self.snapshot = await build_snapshot(db)
+        return self.snapshot
+
+    async def get(self, db) -> dict:
+        return self.snapshot if self.snapshot is not None else await self.refresh(db)
+
+# ==================== REBUILD ====================
+
+def _day_of(field: str) -> dict:
+    # created_at may be an ISO string or a BSON date
+    return {"$cond": [
+        {"$eq": [{"$type": f"${field}"}, "date"]},
+        {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}},
+        {"$substrBytes": [f"${field}", 0, 10]}
+    ]}
+
+async def rebuild_counters(db):
+    # Full scans; meant for first deployment or after suspected drift
+    await db.stops.aggregate([
+        {"$group": {"_id": "$city_id", "count": {"$sum": 1}}},
+        {"$out": "city_stop_counts"}
+    ]).to_list(None)
+    await db.users.aggregate([
+        {"$group": {"_id": _day_of("created_at"), "signups": {"$sum": 1}}},
+        {"$out": "daily_stats"}
+    ]).to_list(None)
+    await db.trips.aggregate([
+        {"$group": {"_id": _day_of("created_at"), "trips": {"$sum": 1}}},
+        {"$merge": {"into": "daily_stats", "whenMatched": "merge", "whenNotMatched": "insert"}}
+    ]).to_list(None)
+
+async def bootstrap_counters(db) -> bool:
+    # Deployments from before the counters existed have none, or only what
+    # the hooks counted since; the first start fills them in from source.
+    # Recorded in the migrations collection, so it happens once.
+    if await is_applied(db, "admin_counters"):
+        return False
+    await rebuild_counters(db)
+    await mark_applied(db, "admin_counters", {})
+    return True
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    if args.rebuild:
+        await rebuild_counters(db)
+        await mark_applied(db, "admin_counters", {})
+        print("Rebuilt city_stop_counts and daily_stats")
+    snapshot = await build_snapshot(db)
+    for key in TOTALS:
+        print(f"{key}: {snapshot[key]}")
+    for city in snapshot["top_cities"]:
+        print(f"{city.get('city_name') or city['_id']}, {city.get('country') or '?'}: {city['count']} stops")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Print admin statistics and rebuild their counters")
+    parser.add_argument("--rebuild", action="store_true", help="recompute city and daily counters from source")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from admin_stats import AdminStats, build_snapshot, rebuild_counters
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from indexes import ensure_indexes
+
+# Admin dashboard at scale (default 10M stops): the previous exact counts
+# plus $group over every stop vs building the snapshot from maintained
+# counters vs serving the cached snapshot.
+# Usage: python -m benchmarks.bench_admin_stats [--stops 10000000] [--cities 5000]
+
+async def legacy_stats(db):
+    counts = [await db[name].count_documents({}) for name in ("users", "trips", "trip_activities", "posts")]
+    top_cities = await db.stops.aggregate([
+        {"$group": {"_id": "$city_id", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 10}
+    ]).to_list(10)
+    return counts, top_cities
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await db.stops.drop()
+    await ensure_indexes(db)
+
+    city_ids = [str(uuid.uuid4()) for _ in range(args.cities)]
+    await db.cities.insert_many([
+        {"id": city_id, "name": f"City {i}", "country": "Bench", "popularity": i % 100} for i, city_id in enumerate(city_ids)
+    ])
+    # Skewed popularity so the top ten is meaningful
+    weights = [1 / (rank + 1) for rank in range(args.cities)]
+    start = time.perf_counter()
+    for offset in range(0, args.stops, 10000):
+        picks = random.choices(city_ids, weights, k=min(10000, args.stops - offset))
+        await db.stops.insert_many([{"id": str(uuid.uuid4()), "trip_id": "bench", "city_id": city_id} for city_id in picks])
+    print(f"Inserted {args.stops} stops in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    await rebuild_counters(db)
+    print(f"Counter rebuild (one-off): {time.perf_counter() - start:.1f}s")
+
+    stats = AdminStats()
+    await stats.refresh(db)
+    print_row("count_documents + $group (previous)", summarize(await time_async(lambda: legacy_stats(db), args.repeat)))
+    print_row("snapshot rebuild from counters", summarize(await time_async(lambda: build_snapshot(db), args.repeat)))
+    print_row("cached snapshot", summarize(await time_async(lambda: stats.get(db), args.repeat)))
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stops", type=int, default=10_000_000)
+    parser.add_argument("--cities", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import os
+import random
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from benchmarks.bench_trip_detail import seed_trip
+from budget import compute_budget
+
+# Budget for a trip with many expenses: Python-side summing (the previous
+# get_trip_budget, without its 1000-row cap) vs the server-side $group.
+# Also checks both produce the same totals.
+# Usage: python -m benchmarks.bench_budget [--expenses 50000] [--activities 5000]
+
+async def legacy_budget(db, trip_id: str) -> dict:
+    activities = await db.trip_activities.find({"trip_id": trip_id}, {"_id": 0}).to_list(None)
+    activities_cost = sum(a['cost'] for a in activities)
+    expenses = await db.expenses.find({"trip_id": trip_id}, {"_id": 0}).to_list(None)
+    breakdown = {
+        "transport": sum(e['amount'] for e in expenses if e['category'] == 'transport'),
+        "accommodation": sum(e['amount'] for e in expenses if e['category'] == 'accommodation'),
+        "food": sum(e['amount'] for e in expenses if e['category'] == 'food'),
+        "activities": activities_cost + sum(e['amount'] for e in expenses if e['category'] == 'activities'),
+        "other": sum(e['amount'] for e in expenses if e['category'] == 'other')
+    }
+    return {
+        "total": sum(breakdown.values()),
+        "breakdown": breakdown,
+        "activities_count": len(activities),
+        "expenses_count": len(expenses)
+    }
+
+def assert_same(expected: dict, actual: dict):
+    assert expected["activities_count"] == actual["activities_count"], (expected, actual)
+    assert expected["expenses_count"] == actual["expenses_count"], (expected, actual)
+    for category, amount in expected["breakdown"].items():
+        assert abs(amount - actual["breakdown"][category]) < 1e-6, (category, expected, actual)
+    assert abs(expected["total"] - actual["total"]) < 1e-6, (expected, actual)
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await db.expenses.create_index("trip_id")
+    await db.trip_activities.create_index("trip_id")
+
+    # Small trips first to check totals on mixed data
+    for _ in range(20):
+        trip_id = await seed_trip(db, "bench", random.randint(0, 5), random.randint(0, 50), random.randint(0, 50))
+        expected = await legacy_budget(db, trip_id)
+        assert_same(expected, await compute_budget(db, trip_id))
+        for group_by in ("day", "stop"):
+            grouped = await compute_budget(db, trip_id, group_by)
+            assert_same(expected, grouped)
+            buckets = grouped["by_day"] if group_by == "day" else grouped["by_stop"] + [grouped["unassigned"]]
+            assert abs(sum(b["total"] for b in buckets) - expected["total"]) < 1e-6
+    print("totals match the Python-side implementation")
+
+    trip_id = await seed_trip(db, "bench", 10, args.activities, args.expenses)
+    print_row("python-side sum", summarize(await time_async(lambda: legacy_budget(db, trip_id), args.repeat)))
+    print_row("server-side $group", summarize(await time_async(lambda: compute_budget(db, trip_id), args.repeat)))
+    print_row("server-side $group by day", summarize(await time_async(lambda: compute_budget(db, trip_id, "day"), args.repeat)))
+    print_row("server-side $group by stop", summarize(await time_async(lambda: compute_budget(db, trip_id, "stop"), args.repeat)))
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--expenses", type=int, default=50000)
+    parser.add_argument("--activities", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import asgi_client, load_server
+
+# Adding N activities to a trip one request at a time vs through the bulk
+# endpoint in batches.
+# Usage: python -m benchmarks.bench_bulk [--activities 1000] [--batch 1000]
+
+async def main(args):
+    server = load_server()
+    db = server.db
+    await server.ensure_indexes(db)
+
+    city = {"id": str(uuid.uuid4()), "name": "Bench City", "country": "Bench", "cost_index": 5, "popularity": 50}
+    templates = [{
+        "id": str(uuid.uuid4()), "city_id": city['id'], "name": f"Activity {i}", "category": "culture",
+        "duration": 2, "estimated_cost": float(i),
+    } for i in range(50)]
+    await db.cities.insert_one(city)
+    await db.activity_templates.insert_many(templates)
+    await server.refresh_catalog()
+
+    async with asgi_client(server.app) as http:
+        response = await http.post("/api/auth/register", json={
+            "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password",
+            "first_name": "Bench", "last_name": "User",
+        })
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        async def new_stop():
+            trip = (await http.post("/api/trips", headers=headers, json={
+                "name": "Bench trip", "start_date": "2025-06-01", "end_date": "2025-06-30",
+            })).json()
+            stop = (await http.post("/api/stops", headers=headers, json={
+                "trip_id": trip['id'], "city_id": city['id'], "start_date": "2025-06-01", "end_date": "2025-06-30", "order": 0,
+            })).json()
+            return stop['id']
+
+        def payload(stop_id):
+            return [{
+                "stop_id": stop_id, "activity_template_id": templates[i % len(templates)]['id'],
+                "date": f"2025-06-{i % 30 + 1:02d}",
+            } for i in range(args.activities)]
+
+        stop_id = await new_stop()
+        start = time.perf_counter()
+        for item in payload(stop_id):
+            await http.post("/api/trip-activities", headers=headers, json=item)
+        single = time.perf_counter() - start
+
+        stop_id = await new_stop()
+        items = payload(stop_id)
+        start = time.perf_counter()
+        created = 0
+        for offset in range(0, len(items), args.batch):
+            result = (await http.post("/api/trip-activities/bulk", headers=headers, json=items[offset:offset + args.batch])).json()
+            created += result['created']
+        bulk = time.perf_counter() - start
+
+    print(f"one at a time  {args.activities} activities in {single:8.3f}s ({args.activities / single:9.1f}/s)")
+    print(f"bulk x{args.batch:<7} {created} activities in {bulk:8.3f}s ({created / bulk:9.1f}/s), {single / bulk:.1f}x faster")
+
+    await server.client.drop_database(db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.bench_trip_detail import seed_trip
+from benchmarks.common import bench_db_name, print_row, summarize
+from cascade import delete_trip_cascade, reap_tombstones, supports_transactions
+from indexes import ensure_indexes
+from rollups import rebuild_rollup
+
+# Delete latency for trips with ~10k child rows: the previous sequential
+# deletes vs the parallel tombstone cascade, a transaction (replica sets
+# only) and the background mode, whose request returns before the reaper
+# removes the children.
+# Usage: python -m benchmarks.bench_cascade [--children 10000] [--repeat 5]
+
+async def legacy_delete(db, trip_id: str, user_id: str):
+    await db.trips.delete_one({"id": trip_id, "user_id": user_id})
+    await db.stops.delete_many({"trip_id": trip_id})
+    await db.trip_activities.delete_many({"trip_id": trip_id})
+    await db.expenses.delete_many({"trip_id": trip_id})
+    await db.trip_budget_rollups.delete_one({"trip_id": trip_id})
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await ensure_indexes(db)
+    user_id = str(uuid.uuid4())
+
+    variants = [
+        ("sequential (previous)", lambda trip_id: legacy_delete(db, trip_id, user_id)),
+        ("parallel + tombstone", lambda trip_id: delete_trip_cascade(db, trip_id, user_id, use_transactions=False)),
+        ("background (request only)", lambda trip_id: delete_trip_cascade(db, trip_id, user_id, soft_threshold=0)),
+    ]
+    if await supports_transactions(db):
+        variants.insert(2, ("transaction", lambda trip_id: delete_trip_cascade(db, trip_id, user_id)))
+    else:
+        print("Transactions not supported by this deployment; skipping that variant")
+
+    stops = max(1, args.children // 100)
+    activities = (args.children - stops) // 2
+    expenses = args.children - stops - activities
+
+    for label, delete in variants:
+        samples = []
+        for _ in range(args.repeat):
+            trip_id = await seed_trip(db, user_id, stops, activities, expenses)
+            await rebuild_rollup(db, trip_id, user_id)
+            start = time.perf_counter()
+            await delete(trip_id)
+            samples.append(time.perf_counter() - start)
+        print_row(label, summarize(samples))
+
+    start = time.perf_counter()
+    reaped = await reap_tombstones(db)
+    print(f"reaper: {reaped} trips in {time.perf_counter() - start:.3f}s")
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--children", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
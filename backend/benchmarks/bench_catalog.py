@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_client, load_server, run_concurrent
+
+# Throughput of the catalog endpoints served from Mongo vs the in-memory
+# catalog cache, plus cache hit rate and 304 revalidation.
+# Usage: python -m benchmarks.bench_catalog [--requests 5000] [--concurrency 50]
+
+async def main(args):
+    server = load_server()
+    import seed_data  # bound to the benchmark database by load_server()
+
+    await seed_data.seed_database()
+    await server.ensure_indexes(server.db)
+    await server.backfill_search_fields(server.db)
+    await server.refresh_catalog()
+
+    cities = server.catalog_cache.cities()
+    paths = []
+    for city in cities:
+        paths += [
+            f"/api/cities/{city['id']}",
+            f"/api/cities/{city['id']}/activities",
+            f"/api/cities/{city['id']}/activities?category=culture&max_cost=50",
+            f"/api/cities?search={city['name'][:3]}",
+        ]
+
+    async with asgi_client(server.app) as http:
+        async def call():
+            await http.get(random.choice(paths))
+
+        async def revalidate():
+            await http.get(random.choice(paths), headers={"If-None-Match": server.catalog_cache.etag})
+
+        for label, enabled, fn in (
+            ("mongo", False, call),
+            ("catalog cache", True, call),
+            ("catalog cache + If-None-Match", True, revalidate),
+        ):
+            server.CATALOG_CACHE = enabled
+            start = time.perf_counter()
+            await run_concurrent(fn, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<32} {args.requests / elapsed:10.1f} req/s")
+
+    print(server.catalog_cache.stats())
+    await server.client.drop_database(server.db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
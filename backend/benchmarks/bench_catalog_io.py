@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import csv
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+
+from benchmarks.common import bench_db_name, peak_rss_mb
+from benchmarks.bench_planner import CATEGORIES
+from catalog_io import export_file, import_catalog, read_rows
+
+# Streaming catalog import and export at scale (default: 1M activity
+# templates over 1000 cities). The files are generated in a temp dir, then
+# imported in swap mode (staging collections renamed over the live ones)
+# and exported back. Reports rows/s per phase and the process's peak RSS,
+# which should stay flat as --templates grows since rows are never all in
+# memory at once.
+# Needs MONGO_URL; runs against the benchmark database.
+# Usage: python -m benchmarks.bench_catalog_io [--templates 1000000] [--format ndjson|csv] [--batch 1000] [--concurrency 4]
+
+def write_files(directory: Path, args) -> tuple:
+    rng = random.Random(args.seed)
+    cities = [{
+        "name": f"City {i}", "country": f"Country {i % 50}",
+        "cost_index": round(rng.uniform(1, 10), 1), "popularity": rng.randint(1, 100),
+    } for i in range(args.cities)]
+    suffix = f".{args.format}"
+    cities_path, templates_path = directory / f"cities{suffix}", directory / f"templates{suffix}"
+
+    def rows():
+        for i in range(args.templates):
+            city = cities[i % len(cities)]
+            yield {
+                "name": f"Activity {i}", "category": rng.choice(CATEGORIES),
+                "duration": rng.randint(1, 8), "estimated_cost": float(rng.randint(0, 300)),
+                "city": city['name'], "country": city['country'],
+            }
+
+    for path, items in ((cities_path, cities), (templates_path, rows())):
+        with open(path, "w", newline="") as f:
+            if args.format == "csv":
+                writer = None
+                for item in items:
+                    if writer is None:
+                        writer = csv.DictWriter(f, list(item))
+                        writer.writeheader()
+                    writer.writerow(item)
+            else:
+                for item in items:
+                    f.write(orjson.dumps(item).decode() + "\n")
+    return cities_path, templates_path
+
+async def main(args):
+    from database import create_client
+
+    client = create_client()
+    db = client[bench_db_name()]
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        start = time.perf_counter()
+        cities_path, templates_path = write_files(directory, args)
+        size = templates_path.stat().st_size / 2 ** 20
+        print(f"generate: {args.templates} templates, {size:.1f}MB {args.format} in {time.perf_counter() - start:.1f}s")
+        baseline = peak_rss_mb()
+
+        for run in range(args.repeat):
+            start = time.perf_counter()
+            report = await import_catalog(
+                db, read_rows(cities_path), read_rows(templates_path), "swap", args.batch, args.concurrency
+            )
+            elapsed = time.perf_counter() - start
+            written = report['cities']['written'] + report['templates']['written']
+            print(
+                f"import #{run + 1}: {written} rows in {elapsed:.1f}s = {written / elapsed:10.0f} rows/s  "
+                f"invalid={report['templates']['invalid']}  peak RSS {peak_rss_mb():.0f}MB (after generate {baseline:.0f}MB)"
+            )
+
+        export_path = directory / f"export.{args.format}"
+        start = time.perf_counter()
+        size = await export_file(db, "activity_templates", export_path)
+        elapsed = time.perf_counter() - start
+        print(
+            f"export: {report['templates']['written']} templates, {size / 2 ** 20:.1f}MB in {elapsed:.1f}s = "
+            f"{report['templates']['written'] / elapsed:10.0f} rows/s  peak RSS {peak_rss_mb():.0f}MB"
+        )
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=1000000)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per bulk_write")
+    parser.add_argument("--concurrency", type=int, default=4, help="bulk_writes in flight")
+    parser.add_argument("--repeat", type=int, default=2, help="imports; later ones reuse the ids already in the catalog")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
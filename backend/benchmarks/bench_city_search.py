@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import os
+import random
+import string
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from city_search import CityPrefixIndex, load_city_index, search_cities, search_fields
+from indexes import ensure_indexes
+
+# City search at catalog scale: the previous unanchored case-insensitive
+# $regex vs indexed token prefix, text search and the in-memory index.
+# Usage: python -m benchmarks.bench_city_search [--cities 100000]
+
+SYLLABLES = ["ka", "lo", "mé", "ri", "san", "tó", "vi", "na", "por", "bel", "ão", "ze", "qu", "el", "do"]
+
+def random_name(words: int) -> str:
+    return " ".join(
+        "".join(random.choice(SYLLABLES) for _ in range(random.randint(2, 4))).capitalize()
+        for _ in range(words)
+    )
+
+async def legacy_search(db, search: str):
+    query = {"$or": [
+        {"name": {"$regex": search, "$options": "i"}},
+        {"country": {"$regex": search, "$options": "i"}}
+    ]}
+    return await db.cities.find(query, {"_id": 0}).sort("popularity", -1).to_list(100)
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await db.cities.drop()
+
+    countries = [random_name(1) for _ in range(200)]
+    for start in range(0, args.cities, 10000):
+        batch = []
+        for _ in range(min(10000, args.cities - start)):
+            city = {
+                "id": str(uuid.uuid4()), "name": random_name(random.randint(1, 3)),
+                "country": random.choice(countries), "cost_index": round(random.uniform(1, 10), 1),
+                "popularity": random.randint(1, 100), "description": random_name(6),
+            }
+            batch.append({**city, **search_fields(city)})
+        await db.cities.insert_many(batch)
+    await ensure_indexes(db)
+
+    queries = ["".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(2, 4))) for _ in range(args.repeat)]
+    queries += [random.choice(SYLLABLES) for _ in range(args.repeat)]
+    picks = iter(queries * 4)
+
+    index = CityPrefixIndex()
+    await load_city_index(db, index)
+
+    print_row("unanchored $regex (previous)", summarize(await time_async(lambda: legacy_search(db, next(picks)), len(queries))))
+    print_row("indexed token prefix", summarize(await time_async(lambda: search_cities(db, search=next(picks)), len(queries))))
+    print_row("text index + popularity", summarize(await time_async(lambda: search_cities(db, text=next(picks)), len(queries))))
+
+    async def in_memory():
+        index.search(next(picks))
+
+    print_row("in-memory prefix index", summarize(await time_async(in_memory, len(queries))))
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
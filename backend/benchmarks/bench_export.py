@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import load_server, peak_rss_mb, rss_mb
+
+# Account export throughput and memory: an account with --trips trips and
+# --activities activity rows in total (default 1k trips, 1M activities) is
+# exported through GET /api/account/export in every format, with and
+# without gzip. The request is driven straight through the ASGI app (the
+# httpx ASGI transport buffers whole bodies), counting bytes as they are
+# sent and sampling RSS along the way: the growth should stay flat.
+# Needs MONGO_URL; runs against the benchmark database.
+# Usage: python -m benchmarks.bench_export [--trips 1000] [--activities 1000000] [--formats ndjson csv ics]
+
+CATEGORIES = ["sightseeing", "food", "adventure", "culture", "shopping", "nightlife"]
+EXPENSE_CATEGORIES = ["transport", "accommodation", "food", "activities", "other"]
+
+async def seed_trip(db, rng: random.Random, user_id: str, index: int, args, created_at: datetime):
+    trip_id = str(uuid.uuid4())
+    start = datetime(2025, 6, 1) + timedelta(days=index % 300)
+    days = [(start + timedelta(days=d)).date().isoformat() for d in range(args.days)]
+    stops = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id, "user_id": user_id, "city_id": str(uuid.uuid4()),
+        "city_name": f"City {s}", "country": "Country", "start_date": days[0], "end_date": days[-1],
+        "order": s, "created_at": created_at,
+    } for s in range(args.stops)]
+    activities = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id, "user_id": user_id, "stop_id": rng.choice(stops)['id'],
+        "activity_template_id": str(uuid.uuid4()), "activity_name": f"Activity {a}",
+        "activity_description": "Seeded for the export benchmark", "category": rng.choice(CATEGORIES),
+        "duration": rng.randint(1, 6), "date": rng.choice(days), "time": f"{rng.randint(7, 20):02d}:00",
+        "cost": float(rng.randint(0, 200)), "created_at": created_at + timedelta(microseconds=a),
+    } for a in range(args.activities // args.trips)]
+    expenses = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id, "user_id": user_id, "category": rng.choice(EXPENSE_CATEGORIES),
+        "amount": float(rng.randint(1, 500)), "description": "Seeded", "date": rng.choice(days),
+        "created_at": created_at,
+    } for _ in range(args.expenses)]
+    await db.trips.insert_one({
+        "id": trip_id, "user_id": user_id, "name": f"Bench trip {index}", "start_date": days[0],
+        "end_date": days[-1], "status": "upcoming", "is_public": False, "created_at": created_at + timedelta(seconds=index),
+    })
+    for collection, docs in ((db.stops, stops), (db.trip_activities, activities), (db.expenses, expenses)):
+        if docs:
+            await collection.insert_many(docs, ordered=False)
+
+async def seed_account(db, args) -> str:
+    rng = random.Random(args.seed)
+    user_id = str(uuid.uuid4())
+    await db.users.insert_one({
+        "id": user_id, "email": f"bench-{user_id[:8]}@example.com", "password": "x",
+        "first_name": "Bench", "last_name": "User", "is_admin": False, "created_at": datetime.now(timezone.utc),
+    })
+    created_at = datetime.now(timezone.utc)
+    pending = set()
+    for index in range(args.trips):
+        pending.add(asyncio.create_task(seed_trip(db, rng, user_id, index, args, created_at)))
+        if len(pending) >= args.concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    if pending:
+        await asyncio.gather(*pending)
+    return user_id
+
+async def drop_account(db, user_id: str):
+    trip_ids = await db.trips.distinct("id", {"user_id": user_id})
+    for name in ("stops", "trip_activities", "expenses"):
+        await db[name].delete_many({"trip_id": {"$in": trip_ids}})
+    await db.trips.delete_many({"user_id": user_id})
+    await db.users.delete_one({"id": user_id})
+
+async def stream_get(app, path: str, query: str, token: str, sample_every: int = 10) -> tuple:
+    # Minimal ASGI client: returns (status, bytes, chunks, max RSS seen)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    state = {"status": None, "bytes": 0, "chunks": 0, "rss": rss_mb()}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["bytes"] += len(message.get("body", b""))
+            state["chunks"] += 1
+            if state["chunks"] % sample_every == 0:
+                state["rss"] = max(state["rss"], rss_mb())
+
+    await app(scope, receive, send)
+    return state["status"], state["bytes"], state["chunks"], max(state["rss"], rss_mb())
+
+async def main(args):
+    server = load_server()
+    db = server.db
+    await server.ensure_indexes(db)
+
+    start = time.perf_counter()
+    user_id = await seed_account(db, args)
+    rows = args.trips * (1 + args.stops + args.activities // args.trips + args.expenses)
+    print(f"seed: {args.trips} trips, {rows} rows in {time.perf_counter() - start:.1f}s")
+    token = server.create_access_token({"sub": user_id})
+    try:
+        for fmt in args.formats:
+            for compress in (False, True):
+                before = rss_mb()
+                start = time.perf_counter()
+                status, size, chunks, peak = await stream_get(
+                    server.app, "/api/account/export", f"format={fmt}&gzip={'true' if compress else 'false'}", token
+                )
+                elapsed = time.perf_counter() - start
+                assert status == 200, status
+                label = f"{fmt}{'+gzip' if compress else ''}"
+                print(
+                    f"{label:<12} {rows / elapsed:10.0f} rows/s {size / 2 ** 20 / elapsed:7.1f}MB/s  "
+                    f"{size / 2 ** 20:8.1f}MB in {chunks} chunks, {elapsed:6.1f}s  "
+                    f"RSS {before:.0f}MB -> max {peak:.0f}MB (+{peak - before:.0f}MB)"
+                )
+        print(f"process peak RSS {peak_rss_mb():.0f}MB")
+    finally:
+        await drop_account(db, user_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trips", type=int, default=1000)
+    parser.add_argument("--activities", type=int, default=1000000, help="activity rows across all trips")
+    parser.add_argument("--stops", type=int, default=5, help="stops per trip")
+    parser.add_argument("--expenses", type=int, default=20, help="expenses per trip")
+    parser.add_argument("--days", type=int, default=10, help="days per trip")
+    parser.add_argument("--formats", nargs="+", choices=["ndjson", "csv", "ics"], default=["ndjson", "csv", "ics"])
+    parser.add_argument("--concurrency", type=int, default=8, help="trips seeded at once")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+import uuid
+
+import numpy as np
+
+from forecast import DEFAULT_BASELINES, CityCosts, baseline_vector, forecast_matrix, forecast_totals
+from pipelines import EXPENSE_CATEGORIES
+
+# Batch cost forecasting over (city, days) candidates, default 1M pairs
+# across 1000 cities. Pure CPU: no database needed.
+#   loop       per-candidate Python, the way a handler would do it per row
+#              (timed on --loop-sample pairs and scaled up)
+#   ids        city id -> row (one dict lookup per id)
+#   totals     cost_index * days * sum(baselines)
+#   matrix     full per-category (candidates x categories) forecast
+#   cheapest   every city for one stay, top 20 (the dashboard query)
+# Usage: python -m benchmarks.bench_forecast [--pairs 1000000] [--cities 1000]
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), result
+
+def main(args):
+    rng = random.Random(args.seed)
+    cities = [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))), "name": f"City {i}", "country": "Bench",
+        "cost_index": round(rng.uniform(1, 10), 1),
+    } for i in range(args.cities)]
+    costs = CityCosts()
+    costs.build(cities)
+
+    picks = np.random.default_rng(args.seed).integers(0, args.cities, args.pairs)
+    city_ids = [cities[i]['id'] for i in picks]
+    days = np.random.default_rng(args.seed + 1).integers(1, 31, args.pairs)
+    vector = baseline_vector()
+
+    # Per-row Python over a sample, scaled to the full batch
+    by_id = {city['id']: city['cost_index'] for city in cities}
+    sample = min(args.loop_sample, args.pairs)
+    sample_days = days[:sample].tolist()
+
+    def loop():
+        return [
+            sum(by_id[city_id] * n * DEFAULT_BASELINES[category] for category in EXPENSE_CATEGORIES)
+            for city_id, n in zip(city_ids[:sample], sample_days)
+        ]
+
+    elapsed, expected = timed(loop, 1)
+    print(f"{'loop':<10} {elapsed * args.pairs / sample * 1000:10.1f}ms (scaled from {sample} pairs)")
+
+    elapsed, rows = timed(lambda: costs.rows(city_ids), args.repeat)
+    print(f"{'ids':<10} {elapsed * 1000:10.1f}ms")
+    cost_index = costs.cost_index[rows]
+
+    elapsed, totals = timed(lambda: forecast_totals(cost_index, days, vector), args.repeat)
+    print(f"{'totals':<10} {elapsed * 1000:10.1f}ms")
+    assert np.allclose(totals[:sample], expected)
+
+    elapsed, matrix = timed(lambda: forecast_matrix(cost_index, days, vector), args.repeat)
+    print(f"{'matrix':<10} {elapsed * 1000:10.1f}ms  shape={matrix.shape}")
+
+    elapsed, _ = timed(lambda: costs.score(city_ids, days), args.repeat)
+    print(f"{'score':<10} {elapsed * 1000:10.1f}ms  (ids + totals, the batch endpoint path)")
+
+    elapsed, cheapest = timed(lambda: costs.cheapest(7, 20), args.repeat)
+    print(f"{'cheapest':<10} {elapsed * 1000:10.3f}ms  top={cheapest[0]['city_name']} total={cheapest[0]['total']:.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=1000000)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--loop-sample", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
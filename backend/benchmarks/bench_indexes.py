@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from indexes import ensure_indexes
+
+# Scan vs index latency for the trip query shapes in server.py.
+# Usage: python -m benchmarks.bench_indexes [--trips 1000000] [--repeat 50]
+
+async def generate_trips(db, count: int, users: int, batch_size: int = 10000):
+    await db.trips.drop()
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    inserted = 0
+    while inserted < count:
+        batch = []
+        for i in range(min(batch_size, count - inserted)):
+            is_public = random.random() < 0.1
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "user_id": random.choice(user_ids),
+                "name": f"Trip {inserted + i}",
+                "start_date": "2025-06-01",
+                "end_date": "2025-06-10",
+                "status": "upcoming",
+                "is_public": is_public,
+                "public_url": str(uuid.uuid4()) if is_public else None,
+                "created_at": (base + timedelta(seconds=inserted + i)).isoformat(),
+            })
+        await db.trips.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return user_ids
+
+async def sample_keys(db, n: int):
+    trips = await db.trips.aggregate([{"$sample": {"size": n}}]).to_list(n)
+    public = await db.trips.find({"is_public": True}, {"public_url": 1}).limit(n).to_list(n)
+    return trips, [t["public_url"] for t in public]
+
+async def run_queries(db, trips, public_urls, repeat: int, label: str):
+    picks = iter(random.choices(trips, k=repeat * 3))
+    urls = iter(random.choices(public_urls, k=repeat))
+
+    async def by_id():
+        t = next(picks)
+        await db.trips.find_one({"id": t["id"], "user_id": t["user_id"]}, {"_id": 0})
+
+    async def by_user():
+        t = next(picks)
+        await db.trips.find({"user_id": t["user_id"]}, {"_id": 0}).to_list(1000)
+
+    async def by_public_url():
+        await db.trips.find_one({"public_url": next(urls), "is_public": True}, {"_id": 0})
+
+    print_row(f"{label} trips by id+user_id", summarize(await time_async(by_id, repeat)))
+    print_row(f"{label} trips by user_id", summarize(await time_async(by_user, repeat)))
+    print_row(f"{label} trips by public_url", summarize(await time_async(by_public_url, repeat)))
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+
+    print(f"Generating {args.trips} trips in {bench_db_name()}...")
+    await generate_trips(db, args.trips, users=max(1, args.trips // 20))
+    trips, public_urls = await sample_keys(db, 1000)
+
+    await db.trips.drop_indexes()
+    await run_queries(db, trips, public_urls, args.repeat, "scan ")
+
+    await ensure_indexes(db)
+    await run_queries(db, trips, public_urls, args.repeat, "index")
+
+    plan = await db.trips.find({"user_id": trips[0]["user_id"]}).explain()
+    stats = plan.get("executionStats", {})
+    print(f"explain(user_id): docsExamined={stats.get('totalDocsExamined')} keysExamined={stats.get('totalKeysExamined')}")
+
+    if not args.keep:
+        await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trips", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--keep", action="store_true", help="keep the generated database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import os
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from benchmarks.bench_trip_detail import seed_trip
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from indexes import ensure_indexes
+
+# Round trips and latency per child mutation: fetching the child and then
+# its trip to authorize (previous) vs ownership in the filter itself.
+# Usage: python -m benchmarks.bench_ownership [--repeat 1000]
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+async def main(args):
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=[counter])
+    db = client[bench_db_name()]
+    await ensure_indexes(db)
+
+    user_id = str(uuid.uuid4())
+    trip_id = await seed_trip(db, user_id, 10, args.repeat * 2, 0)
+    await db.stops.update_many({"trip_id": trip_id}, {"$set": {"user_id": user_id}})
+    await db.trip_activities.update_many({"trip_id": trip_id}, {"$set": {"user_id": user_id}})
+    ids = iter([doc['id'] async for doc in db.trip_activities.find({"trip_id": trip_id}, {"id": 1})])
+
+    async def legacy_delete():
+        activity_id = next(ids)
+        activity = await db.trip_activities.find_one({"id": activity_id}, {"_id": 0})
+        await db.trips.find_one({"id": activity['trip_id'], "user_id": user_id})
+        await db.trip_activities.delete_one({"id": activity_id})
+
+    async def owned_delete():
+        await db.trip_activities.find_one_and_delete({"id": next(ids), "user_id": user_id}, {"_id": 0, "trip_id": 1, "cost": 1})
+
+    for label, fn in (("find + trip check + delete (previous)", legacy_delete), ("find_one_and_delete by owner", owned_delete)):
+        counter.count = 0
+        samples = await time_async(fn, args.repeat)
+        print_row(label, summarize(samples))
+        print(f"{'':<40} round trips per delete: {counter.count / args.repeat:.1f}")
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
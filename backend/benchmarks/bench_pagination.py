@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import bench_db_name
+from indexes import ensure_indexes
+from pagination import MAX_PAGE_SIZE, fetch_page, stream_ndjson
+
+# Memory and latency of reading a trip's expenses: buffering the whole
+# result (to_list) vs walking keyset pages vs NDJSON streaming.
+# Usage: python -m benchmarks.bench_pagination [--sizes 10000 100000 1000000]
+
+SORT = [("created_at", 1), ("id", 1)]
+
+async def seed_expenses(db, trip_id: str, count: int, batch_size: int = 10000):
+    base = datetime.now(timezone.utc).isoformat()
+    for start in range(0, count, batch_size):
+        await db.expenses.insert_many([{
+            "id": str(uuid.uuid4()), "trip_id": trip_id, "category": "food",
+            "amount": float(random.randint(1, 100)), "date": "2025-06-01",
+            "description": "x" * 40, "created_at": base,
+        } for _ in range(min(batch_size, count - start))])
+
+async def measure(label: str, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} rows={rows:<9} time={elapsed * 1000:10.1f}ms peak_mem={peak / 1024 / 1024:8.1f}MB")
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await ensure_indexes(db)
+
+    for size in args.sizes:
+        trip_id = str(uuid.uuid4())
+        await seed_expenses(db, trip_id, size)
+        query = {"trip_id": trip_id}
+
+        async def buffered():
+            return len(await db.expenses.find(query, {"_id": 0}).to_list(None))
+
+        async def paged():
+            rows, cursor = 0, None
+            while True:
+                docs, cursor = await fetch_page(db.expenses, query, SORT, MAX_PAGE_SIZE, cursor)
+                rows += len(docs)
+                if not cursor:
+                    return rows
+
+        async def streamed():
+            rows = 0
+            async for _ in stream_ndjson(db.expenses, query, SORT):
+                rows += 1
+            return rows
+
+        async def first_page():
+            docs, _ = await fetch_page(db.expenses, query, SORT, MAX_PAGE_SIZE)
+            return len(docs)
+
+        await measure(f"{size}: buffered to_list", buffered)
+        await measure(f"{size}: keyset pages of {MAX_PAGE_SIZE}", paged)
+        await measure(f"{size}: ndjson stream", streamed)
+        await measure(f"{size}: first page only", first_page)
+        await db.expenses.delete_many(query)
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    asyncio.run(main(parser.parse_args()))
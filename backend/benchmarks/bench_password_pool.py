@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import asgi_client, load_server, percentile
+
+from password_pool import PasswordHasher
+
+# Event loop lag and throughput of mixed login + read traffic with bcrypt
+# running inline on the loop ("before") vs on the worker pool ("after").
+# Usage: python -m benchmarks.bench_password_pool [--duration 10] [--logins 20] [--readers 50]
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+async def run_mix(http, email: str, headers: dict, duration: float, logins: int, readers: int):
+    stop = asyncio.Event()
+    counts = {"login": 0, "login_busy": 0, "read": 0}
+
+    async def login_loop():
+        while not stop.is_set():
+            response = await http.post("/api/auth/login", json={"email": email, "password": "bench-password"})
+            counts["login" if response.status_code == 200 else "login_busy"] += 1
+
+    async def read_loop():
+        while not stop.is_set():
+            await http.get("/api/auth/me", headers=headers)
+            counts["read"] += 1
+
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    tasks = [asyncio.create_task(login_loop()) for _ in range(logins)]
+    tasks += [asyncio.create_task(read_loop()) for _ in range(readers)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    lags = await lag_task
+    return counts, lags
+
+async def main(args):
+    server = load_server()
+
+    async with asgi_client(server.app) as http:
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        response = await http.post("/api/auth/register", json={
+            "email": email, "password": "bench-password", "first_name": "Bench", "last_name": "User",
+        })
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        for kind in ("inline", "thread", "process"):
+            server.password_hasher.shutdown()
+            server.password_hasher = PasswordHasher(kind=kind, workers=args.workers)
+            counts, lags = await run_mix(http, email, headers, args.duration, args.logins, args.readers)
+            print(
+                f"{kind:<8} logins/s={counts['login'] / args.duration:8.1f} "
+                f"rejected={counts['login_busy']:<6} reads/s={counts['read'] / args.duration:8.1f} "
+                f"loop lag p50={percentile(lags, 50) * 1000:7.2f}ms p99={percentile(lags, 99) * 1000:7.2f}ms "
+                f"max={max(lags) * 1000:7.2f}ms"
+            )
+
+    server.password_hasher.shutdown()
+    await server.client.drop_database(server.db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=20, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=50, help="concurrent /api/auth/me clients")
+    parser.add_argument("--workers", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+import argparse
+import itertools
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from benchmarks.common import percentile
+from planner import CityTemplates, PlannerIndex, plan_trip, solve
+
+# Itinerary planner latency on a synthetic catalog (default: 100k templates
+# spread over the trip's 10 cities, i.e. 10k per city, 30 days, 8 hours a
+# day), plus a correctness check against brute force on small instances:
+# every plan must be feasible (no template twice, even when a city is
+# visited again), and its score is compared with the optimum.
+# Pure CPU: no database needed.
+# Usage: python -m benchmarks.bench_planner [--templates 100000] [--cities 10] [--days 30]
+#        python -m benchmarks.bench_planner --check 500
+
+CATEGORIES = ["sightseeing", "food", "adventure", "culture", "shopping", "nightlife"]
+
+def make_templates(rng: random.Random, cities: list, count: int, max_duration: int = 8, free: float = 0.0) -> list:
+    return [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "city_id": cities[i % len(cities)],
+        "name": f"Activity {i}",
+        "category": rng.choice(CATEGORIES),
+        "duration": rng.randint(1, max_duration),
+        "estimated_cost": float(0 if rng.random() < free else rng.randint(5, 300)),
+    } for i in range(count)]
+
+def make_stops(cities: list, days: int) -> list:
+    # Consecutive stops; each shares its first day with the previous one
+    start, stops = date(2025, 6, 1), []
+    per_city = max(1, days // len(cities))
+    for order, city_id in enumerate(cities):
+        stop_start = start + timedelta(days=order * per_city)
+        stop_end = stop_start + timedelta(days=per_city if order < len(cities) - 1 else days - 1 - order * per_city)
+        stops.append({
+            "id": f"stop-{order}", "city_id": city_id, "order": order,
+            "start_date": stop_start.isoformat(), "end_date": stop_end.isoformat(),
+        })
+    return stops
+
+# ==================== LATENCY ====================
+
+def bench(args):
+    rng = random.Random(args.seed)
+    cities = [f"city-{i}" for i in range(args.cities)]
+    templates = make_templates(rng, cities, args.templates, free=args.free)
+    start = time.perf_counter()
+    index = PlannerIndex()
+    index.build(templates)
+    print(f"index build: {len(index)} templates in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    stops = make_stops(cities, args.days)
+    weights = {category: rng.choice([0.5, 1.0, 2.0]) for category in CATEGORIES}
+    for budget in args.budgets:
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            plan = plan_trip(index, stops, budget, weights, args.hours)
+            samples.append(time.perf_counter() - start)
+        activities = sum(len(day['activities']) for day in plan['days'])
+        print(
+            f"budget={budget:<8} days={len(plan['days']):<3} activities={activities:<4} "
+            f"cost={plan['total_cost']:9.1f} score={plan['total_score']:7.1f}  "
+            f"p50={percentile(samples, 50) * 1000:7.2f}ms p95={percentile(samples, 95) * 1000:7.2f}ms "
+            f"max={max(samples) * 1000:7.2f}ms"
+        )
+
+# ==================== BRUTE FORCE ====================
+
+def brute_force(city_days: list, budget: float, weights: dict, hours_per_day: int) -> float:
+    # Every template goes to one day of one of its city's stops, or nowhere
+    best = 0.0
+    days_by_city = {}
+    for position, (city, days) in enumerate(city_days):
+        days_by_city.setdefault(id(city), (city, []))[1].extend((position, day) for day in range(days))
+    slots, items = [], []
+    for city, city_slots in days_by_city.values():
+        for template in city.templates:
+            slots.append([None] + city_slots)
+            items.append(template)
+    for assignment in itertools.product(*slots):
+        hours, cost, score = {}, 0.0, 0.0
+        for template, slot in zip(items, assignment):
+            if slot is None:
+                continue
+            hours[slot] = hours.get(slot, 0) + template['duration']
+            cost += template['estimated_cost']
+            score += weights.get(template['category'], 0.0) * template['duration']
+        if cost <= budget and all(h <= hours_per_day for h in hours.values()):
+            best = max(best, score)
+    return best
+
+def check_plan(chosen: list, city_days: list, budget: float, hours_per_day: int):
+    used, cost = set(), 0.0
+    for (city, days), stop_days in zip(city_days, chosen):
+        assert len(stop_days) == days
+        ids = {t['id'] for t in city.templates}
+        for templates in stop_days:
+            assert sum(t['duration'] for t in templates) <= hours_per_day, "day over hours"
+            for template in templates:
+                assert template['id'] in ids and template['id'] not in used, "template reused or from another city"
+                used.add(template['id'])
+                cost += template['estimated_cost']
+    assert cost <= budget + 1e-9, "plan over budget"
+
+def check(args):
+    rng = random.Random(args.seed)
+    exact, gaps = 0, []
+    for case in range(args.check):
+        stops = rng.randint(1, 3)
+        # Some trips come back to a city they already visited
+        cities = [CityTemplates(make_templates(rng, [f"city-{c}"], rng.randint(2, 6 if stops == 1 else 4), max_duration=4, free=0.2))
+                  for c in range(stops)]
+        city_days = [(rng.choice(cities[:s + 1]) if s and rng.random() < 0.5 else cities[s], rng.randint(1, 2))
+                     for s in range(stops)]
+        weights = {category: rng.choice([0.0, 0.5, 1.0, 2.0]) for category in CATEGORIES}
+        hours = rng.randint(2, 6)
+        budget = float(rng.randint(0, 400))
+
+        chosen, score, _ = solve(city_days, budget, weights, hours)
+        check_plan(chosen, city_days, budget, hours)
+        optimum = brute_force(city_days, budget, weights, hours)
+        assert score <= optimum + 1e-9, f"case {case}: score {score} above optimum {optimum}"
+        if score >= optimum - 1e-9:
+            exact += 1
+        else:
+            gaps.append((optimum - score) / optimum)
+    print(f"{args.check} cases: all feasible, {exact} optimal ({exact / args.check:.1%})")
+    if gaps:
+        print(f"suboptimal: mean gap {sum(gaps) / len(gaps):.1%}, max gap {max(gaps):.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=100000)
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--hours", type=int, default=8)
+    parser.add_argument("--free", type=float, default=0.0, help="fraction of templates that cost nothing")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[50, 100, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--check", type=int, default=0, help="brute-force this many small instances instead")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    check(args) if args.check else bench(args)
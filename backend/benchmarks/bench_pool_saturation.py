@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import time
+
+from pymongo.errors import PyMongoError
+
+from benchmarks.common import bench_db_name, percentile
+from database import create_client, pool_metrics
+
+# Behaviour under pool exhaustion: many concurrent requests, some of them
+# slow, against small pools. Without bounded waits and deadlines a few slow
+# queries hold every connection and fast requests queue behind them; with
+# them, the excess fails quickly and fast requests keep flowing.
+# Slow queries use server-side $where sleep(), so JavaScript must be enabled.
+# Usage: python -m benchmarks.bench_pool_saturation [--requests 2000] [--concurrency 200]
+
+async def run(label: str, args, **options):
+    client = create_client(**options)
+    db = client[bench_db_name()]
+    await db.pool_bench.insert_one({"x": 1})
+    pool_metrics.reset()
+
+    fast, errors = [], {}
+    remaining = iter(range(args.requests))
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            try:
+                if i % args.slow_every == 0:
+                    await db.pool_bench.find({"$where": f"sleep({args.slow_ms}) || true"}).to_list(1)
+                else:
+                    await db.pool_bench.find_one({"x": 1})
+                    fast.append(time.perf_counter() - start)
+            except PyMongoError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = pool_metrics.stats()
+    print(
+        f"{label:<34} {args.requests / elapsed:8.1f} req/s  fast p50={percentile(fast, 50) * 1000:8.1f}ms "
+        f"p99={percentile(fast, 99) * 1000:8.1f}ms  errors={errors}  "
+        f"max checkout wait={stats['wait_seconds']['max'] * 1000:.1f}ms"
+    )
+    await client.drop_database(bench_db_name())
+    client.close()
+
+async def main(args):
+    # With timeoutMS set the driver ignores waitQueueTimeoutMS (the pool
+    # wait shares the operation deadline), so the two bounds run separately
+    for size in args.pool_sizes:
+        await run(f"pool={size} unbounded waits", args, maxPoolSize=size, waitQueueTimeoutMS=None, timeoutMS=None)
+        await run(f"pool={size} wait queue 200ms", args, maxPoolSize=size, waitQueueTimeoutMS=200, timeoutMS=None)
+        await run(f"pool={size} deadline 1s", args, maxPoolSize=size, waitQueueTimeoutMS=None, timeoutMS=1000)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--slow-every", type=int, default=20, help="every Nth request is slow")
+    parser.add_argument("--slow-ms", type=int, default=2000)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[5, 20, 100])
+    asyncio.run(main(parser.parse_args()))
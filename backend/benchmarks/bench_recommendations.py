@@ -0,0 +1,117 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb, percentile
+from recommendations import PairCounts, RecommendationIndex, Rows, build_index
+
+# Recommendation model build time and query latency on synthetic
+# trip_activities (default: 10M rows, 1000 cities x 100 templates, stops of
+# 1-49 activities, 4 stops per trip). Each trip has a favourite category, so
+# templates of that category co-occur more than chance.
+#   full         PairCounts.from_rows over every row
+#   incremental  --touched trips get their last 10% of rows as new ones
+#   index        CSR serving arrays from the counts
+#   query        RecommendationIndex.recommend for a stop's templates
+#                against its city's templates
+# Pure CPU: reading the rows from Mongo, GridFS I/O and the endpoint's stop
+# lookup aren't included.
+# Usage: python -m benchmarks.bench_recommendations [--rows 10000000] [--queries 10000] [--verify]
+
+CATEGORIES = 6
+STOPS_PER_TRIP = 4
+
+def make_rows(args) -> tuple:
+    rng = np.random.default_rng(args.seed)
+    size = args.cities * args.templates
+    category = rng.integers(0, CATEGORIES, size)
+    # Zipf-like popularity within each city, favourite category x4
+    base = 1.0 / (1 + rng.permutation(np.tile(np.arange(args.templates), args.cities)).reshape(args.cities, args.templates)) ** 0.8
+    themed = base[:, None, :] * np.where(category.reshape(args.cities, 1, args.templates) == np.arange(CATEGORIES)[None, :, None], 4.0, 1.0)
+    cdf = np.cumsum(themed, axis=2)
+    cdf = (cdf / cdf[:, :, -1:]).reshape(args.cities * CATEGORIES, args.templates)
+
+    sizes = rng.integers(1, 50, args.rows // 20)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), args.rows) + 1]
+    stop_city = rng.integers(0, args.cities, len(sizes))
+    trip_theme = rng.integers(0, CATEGORIES, len(sizes) // STOPS_PER_TRIP + 1)
+
+    stop = np.repeat(np.arange(len(sizes)), sizes)[:args.rows]
+    trip = stop // STOPS_PER_TRIP
+    key = stop_city[stop] * CATEGORIES + trip_theme[trip]
+    template = np.empty(len(stop), dtype=np.int64)
+    for start in range(0, len(stop), 100000):
+        end = start + 100000
+        u = rng.random(len(key[start:end]))
+        offset = (cdf[key[start:end]] < u[:, None]).sum(axis=1)
+        template[start:end] = stop_city[stop[start:end]] * args.templates + np.minimum(offset, args.templates - 1)
+    return Rows(trip.astype(np.int64), stop.astype(np.int64), template), stop_city, size
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<12} {time.perf_counter() - start:8.2f}s  peak RSS {peak_rss_mb():.0f}MB")
+    return result
+
+def same_counts(a: PairCounts, b: PairCounts) -> bool:
+    return all(np.array_equal(x, y) for x, y in (
+        (a.popularity, b.popularity), (a.stop_keys, b.stop_keys), (a.stop_counts, b.stop_counts),
+        (a.trip_keys, b.trip_keys), (a.trip_counts, b.trip_counts),
+    ))
+
+def main(args):
+    rows, stop_city, size = timed("generate", lambda: make_rows(args))
+    print(f"{len(rows)} rows, {rows.trip[-1] + 1} trips, {rows.stop[-1] + 1} stops, {size} templates")
+
+    # The touched trips' last rows arrive after the first build
+    touched = np.random.default_rng(args.seed + 1).choice(rows.trip[-1] + 1, args.touched, replace=False)
+    in_touched = np.isin(rows.trip, touched)
+    starts = np.searchsorted(rows.trip, rows.trip)
+    ends = np.searchsorted(rows.trip, rows.trip, side="right")
+    late = in_touched & (np.arange(len(rows)) >= ends - np.maximum((ends - starts) // 10, 1))
+    rows.is_new = late
+
+    counts = timed("full", lambda: PairCounts.from_rows(rows.subset(~late), size))
+    print(f"{len(counts.stop_keys)} stop pairs, {len(counts.trip_keys)} trip pairs, "
+          f"{(counts.stop_keys.nbytes + counts.stop_counts.nbytes + counts.trip_keys.nbytes + counts.trip_counts.nbytes) / 2 ** 20:.0f}MB of counts")
+    timed("incremental", lambda: counts.apply(rows.subset(in_touched), size))
+    print(f"{args.touched} trips touched, {int(late.sum())} new rows")
+    if args.verify:
+        rebuilt = timed("verify", lambda: PairCounts.from_rows(Rows(rows.trip, rows.stop, rows.template), size))
+        print(f"incremental == full rebuild: {same_counts(counts, rebuilt)}")
+
+    arrays = timed("index", lambda: build_index(counts))
+    index = RecommendationIndex()
+    ids = [f"t{code}" for code in range(size)]
+    index.build(ids, arrays, 1)
+    print(f"index: {len(index.neighbours)} neighbours, {index.nbytes() / 2 ** 20:.0f}MB")
+
+    rng = random.Random(args.seed)
+    by_city = [[{"id": ids[c * args.templates + t]} for t in range(args.templates)] for c in range(args.cities)]
+    stop_starts = np.searchsorted(rows.stop, np.arange(rows.stop[-1] + 2))
+    samples = []
+    for _ in range(args.queries):
+        s = rng.randrange(len(stop_starts) - 1)
+        seeds = [ids[t] for t in rows.template[stop_starts[s]:stop_starts[s + 1]][:rng.randint(0, args.seeds)]]
+        start = time.perf_counter()
+        index.recommend(seeds, by_city[stop_city[s]], args.limit)
+        samples.append(time.perf_counter() - start)
+    print(
+        f"query        p50={percentile(samples, 50) * 1000:.3f}ms p95={percentile(samples, 95) * 1000:.3f}ms "
+        f"p99={percentile(samples, 99) * 1000:.3f}ms max={max(samples) * 1000:.3f}ms"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--templates", type=int, default=100, help="templates per city")
+    parser.add_argument("--touched", type=int, default=1000, help="trips with new rows for the incremental build")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--seeds", type=int, default=10, help="at most this many of the stop's templates per query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--verify", action="store_true", help="check the incremental counts against a full rebuild")
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import bench_db_name, print_row, summarize, time_async
+from benchmarks.bench_trip_detail import seed_trip
+from budget import compute_budget
+from indexes import ensure_indexes
+from rollups import read_budget, rebuild_rollup
+
+# Budget read latency: materialized rollup point read vs recomputing with
+# the $group pipeline, for trips of increasing size.
+# Usage: python -m benchmarks.bench_rollups [--sizes 100 10000 100000]
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[bench_db_name()]
+    await ensure_indexes(db)
+
+    for size in args.sizes:
+        trip_id = await seed_trip(db, "bench", 10, size // 2, size // 2)
+        await rebuild_rollup(db, trip_id, "bench")
+        print_row(f"{size} items: $group recompute", summarize(await time_async(lambda: compute_budget(db, trip_id), args.repeat)))
+        print_row(f"{size} items: rollup point read", summarize(await time_async(lambda: read_budget(db, trip_id, "bench"), args.repeat)))
+
+    await client.drop_database(bench_db_name())
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import copy
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from benchmarks.common import load_server, print_row, summarize, time_async
+from serialization import TrustedJSONResponse
+
+# Encoding cost of list endpoints at 1k and 10k rows, using each route's own
+# response field, without the database round trip:
+#   previous   string dates + fromisoformat loop + validation + json
+#   orjson     BSON dates + validation + ORJSONResponse (the default now)
+#   trusted    BSON dates straight to orjson (TRUSTED_SERIALIZATION=true)
+# Usage: python -m benchmarks.bench_serialization [--rows 1000 10000] [--repeat 20]
+
+def trip_docs(rows: int) -> list:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()), "user_id": "bench", "name": f"Trip {i}", "start_date": "2025-06-01",
+        "end_date": "2025-06-10", "description": "Bench trip", "cover_photo": None, "status": "upcoming",
+        "is_public": False, "public_url": None, "created_at": start + timedelta(seconds=i),
+    } for i in range(rows)]
+
+def activity_docs(rows: int) -> list:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()), "trip_id": "bench", "stop_id": "bench", "activity_template_id": str(uuid.uuid4()),
+        "activity_name": f"Activity {i}", "activity_description": "Bench activity", "category": "sightseeing",
+        "duration": 2, "date": "2025-06-02", "time": None, "cost": float(i % 100), "created_at": start + timedelta(seconds=i),
+    } for i in range(rows)]
+
+LISTS = {
+    "/api/trips": trip_docs,
+    "/api/trips/{trip_id}/activities": activity_docs,
+}
+
+async def main(args):
+    server = load_server()
+    fields = {route.path: route.response_field for route in server.app.routes if getattr(route, "path", None) in LISTS}
+
+    for path, make_docs in LISTS.items():
+        field = fields[path]
+        for rows in args.rows:
+            docs = make_docs(rows)
+            legacy = [{**doc, "created_at": doc['created_at'].isoformat()} for doc in docs]
+
+            async def previous():
+                # Handlers used to convert on a copy of the driver's documents
+                rows_in = copy.copy(legacy)
+                for i, doc in enumerate(rows_in):
+                    rows_in[i] = {**doc, "created_at": datetime.fromisoformat(doc['created_at'])}
+                JSONResponse(await serialize_response(field=field, response_content=rows_in))
+
+            async def orjson_default():
+                ORJSONResponse(await serialize_response(field=field, response_content=docs))
+
+            async def trusted():
+                TrustedJSONResponse(docs)
+
+            for label, fn in (("previous", previous), ("orjson", orjson_default), ("trusted", trusted)):
+                print_row(f"{label:<9} {path} x{rows}", summarize(await time_async(fn, args.repeat)))
+
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
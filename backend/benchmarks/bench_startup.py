@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BACKEND_DIR, start_launcher, wait_ready
+
+# Startup and shutdown cost of the API:
+#   import   `import server` in a fresh interpreter; it should open nothing,
+#            so this is module loading only
+#   ready    launcher.py start until every worker's /readyz answers 200
+#            (lifespan: Mongo warm-up, indexes, catalog, bcrypt pool)
+#   stop     SIGTERM until the launcher exits, with draining disabled
+# Needs MONGO_URL; workers use the benchmark database.
+# Usage: python -m benchmarks.bench_startup [--workers 1 2 4] [--repeat 5]
+#        add --loop asyncio --http h11 where uvloop/httptools aren't installed
+
+def import_seconds() -> float:
+    code = "import time; start = time.perf_counter(); import server; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+async def launch_seconds(workers: int, args) -> tuple:
+    start = time.perf_counter()
+    process = start_launcher(workers, args.port, ["--drain-seconds", "0", "--loop", args.loop, "--http", args.http])
+    try:
+        await wait_ready(args.port, workers, args.timeout)
+        ready = time.perf_counter() - start
+        start = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(args.timeout)
+        return ready, time.perf_counter() - start
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def print_samples(label: str, samples: list):
+    print(
+        f"{label:<24} n={len(samples):<3} median={statistics.median(samples) * 1000:9.1f}ms "
+        f"min={min(samples) * 1000:9.1f}ms max={max(samples) * 1000:9.1f}ms"
+    )
+
+async def main(args):
+    print_samples("import server", [import_seconds() for _ in range(args.repeat)])
+    for workers in args.workers:
+        ready, stop = [], []
+        for _ in range(args.repeat):
+            ready_seconds, stop_seconds = await launch_seconds(workers, args)
+            ready.append(ready_seconds)
+            stop.append(stop_seconds)
+        print_samples(f"ready  workers={workers}", ready)
+        print_samples(f"stop   workers={workers}", stop)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--loop", default="uvloop")
+    parser.add_argument("--http", default="httptools")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
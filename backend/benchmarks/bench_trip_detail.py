@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import datetime, timezone
+
+from benchmarks.common import asgi_client, load_server, print_row, summarize, time_async
+
+# Trip page load: five separate endpoint calls vs GET /api/trips/{id}/full.
+# Usage: python -m benchmarks.bench_trip_detail [--stops 10] [--activities 200] [--expenses 200]
+
+CATEGORIES = ["transport", "accommodation", "food", "activities", "other"]
+
+async def seed_trip(db, user_id: str, stops: int, activities: int, expenses: int) -> str:
+    trip_id = str(uuid.uuid4())
+    now = datetime.now(timezone.utc).isoformat()
+    await db.trips.insert_one({
+        "id": trip_id, "user_id": user_id, "name": "Bench trip", "start_date": "2025-06-01",
+        "end_date": "2025-06-30", "status": "upcoming", "is_public": False, "created_at": now,
+    })
+    stop_docs = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id, "city_id": str(uuid.uuid4()), "city_name": f"City {i}",
+        "country": "Country", "start_date": "2025-06-01", "end_date": "2025-06-03", "order": i, "created_at": now,
+    } for i in range(stops)]
+    activity_docs = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id,
+        "stop_id": random.choice(stop_docs)["id"] if stop_docs else str(uuid.uuid4()),
+        "activity_template_id": str(uuid.uuid4()), "activity_name": f"Activity {i}", "category": "sightseeing",
+        "duration": 2, "date": "2025-06-02", "cost": float(random.randint(0, 100)), "created_at": now,
+    } for i in range(activities)]
+    expense_docs = [{
+        "id": str(uuid.uuid4()), "trip_id": trip_id, "category": random.choice(CATEGORIES),
+        "amount": float(random.randint(1, 500)), "date": f"2025-06-{random.randint(1, 30):02d}", "created_at": now,
+    } for _ in range(expenses)]
+
+    for collection, docs in ((db.stops, stop_docs), (db.trip_activities, activity_docs), (db.expenses, expense_docs)):
+        if docs:
+            await collection.insert_many(docs)
+    return trip_id
+
+async def main(args):
+    server = load_server()
+    await server.ensure_indexes(server.db)
+
+    async with asgi_client(server.app) as http:
+        response = await http.post("/api/auth/register", json={
+            "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password",
+            "first_name": "Bench", "last_name": "User",
+        })
+        body = response.json()
+        headers = {"Authorization": f"Bearer {body['token']}"}
+        trip_id = await seed_trip(server.db, body["user"]["id"], args.stops, args.activities, args.expenses)
+
+        async def five_calls():
+            await asyncio.gather(
+                http.get(f"/api/trips/{trip_id}", headers=headers),
+                http.get(f"/api/trips/{trip_id}/stops", headers=headers),
+                http.get(f"/api/trips/{trip_id}/activities", headers=headers),
+                http.get(f"/api/trips/{trip_id}/expenses", headers=headers),
+                http.get(f"/api/trips/{trip_id}/budget", headers=headers),
+            )
+
+        async def full():
+            await http.get(f"/api/trips/{trip_id}/full", headers=headers)
+
+        print_row("five endpoint calls", summarize(await time_async(five_calls, args.repeat)))
+        print_row("GET /trips/{id}/full", summarize(await time_async(full, args.repeat)))
+
+    await server.client.drop_database(server.db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stops", type=int, default=10)
+    parser.add_argument("--activities", type=int, default=200)
+    parser.add_argument("--expenses", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import time
+
+from benchmarks.common import bench_db_name, percentile, start_launcher, wait_ready
+
+# Throughput vs worker count for launcher.py. For each worker count the
+# launcher is started, load runs for a fixed duration from several client
+# processes (one asyncio client can't saturate more than a worker or two),
+# and req/s, latency and scaling efficiency relative to one worker are
+# reported. Paths default to catalog reads, which stay off bcrypt and are
+# mostly CPU in the worker (serialization, routing) once cached.
+# Needs MONGO_URL; the catalog is seeded into the benchmark database.
+# Usage: python -m benchmarks.bench_workers [--workers 1 2 4 8] [--clients 4] [--duration 10]
+#        add --loop asyncio --http h11 where uvloop/httptools aren't installed
+
+async def generate(port: int, paths: list, concurrency: int, duration: float) -> tuple:
+    import httpx
+
+    samples, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=10.0) as http:
+        async def worker(offset: int):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await http.get(paths[i % len(paths)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                samples.append(time.perf_counter() - start)
+                i += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, errors
+
+def run_client(port: int, paths: list, concurrency: int, duration: float) -> tuple:
+    # Entry point of each load generator process
+    return asyncio.run(generate(port, paths, concurrency, duration))
+
+async def seed_paths() -> list:
+    from database import create_client
+    from seed_data import seed_catalog
+
+    client = create_client()
+    db = client[bench_db_name()]
+    await db.cities.delete_many({})
+    await db.activity_templates.delete_many({})
+    await seed_catalog(db)
+    city_ids = await db.cities.distinct("id")
+    client.close()
+    return ["/api/cities"] + [f"/api/cities/{city_id}/activities" for city_id in city_ids]
+
+async def measure(workers: int, paths: list, args) -> tuple:
+    process = start_launcher(workers, args.port, ["--drain-seconds", "0", "--loop", args.loop, "--http", args.http])
+    try:
+        await wait_ready(args.port, workers)
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(args.clients) as pool:
+            results = pool.starmap(run_client, [(args.port, paths, args.concurrency, args.duration)] * args.clients)
+        process.send_signal(signal.SIGTERM)
+        process.wait(60)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    samples = [sample for client_samples, _ in results for sample in client_samples]
+    errors = sum(client_errors for _, client_errors in results)
+    return samples, errors
+
+async def main(args):
+    paths = args.paths or await seed_paths()
+    baseline = None
+    for workers in args.workers:
+        samples, errors = await measure(workers, paths, args)
+        throughput = len(samples) / args.duration
+        baseline = baseline or throughput / workers
+        print(
+            f"workers={workers:<3} {throughput:10.1f} req/s  errors={errors:<6} "
+            f"p50={percentile(samples, 50) * 1000:8.2f}ms p99={percentile(samples, 99) * 1000:8.2f}ms  "
+            f"speedup={throughput / baseline:5.2f}x efficiency={throughput / (baseline * workers):6.1%}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="connections per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--paths", nargs="+", help="GET paths to cycle through (default: seeded catalog)")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--loop", default="uvloop")
+    parser.add_argument("--http", default="httptools")
+    asyncio.run(main(parser.parse_args()))
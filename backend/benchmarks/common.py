@@ -0,0 +1,118 @@
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Sequence, Set
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(BACKEND_DIR / '.env')
+
+# Benchmarks are run as `python -m benchmarks.<name>` from backend/, but keep
+# them importable from anywhere by putting the backend modules on the path.
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# Never benchmark against the live database
+BENCH_DB_NAME = os.environ.get('BENCH_DB_NAME', f"{os.environ['DB_NAME']}_bench")
+
+def bench_db_name() -> str:
+    return BENCH_DB_NAME
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+async def time_async(fn: Callable[[], Awaitable], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def print_row(label: str, stats: Dict[str, float]):
+    print(
+        f"{label:<40} n={stats['n']:<6} mean={stats['mean_ms']:9.3f}ms "
+        f"p50={stats['p50_ms']:9.3f}ms p95={stats['p95_ms']:9.3f}ms p99={stats['p99_ms']:9.3f}ms"
+    )
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def rss_mb() -> float:
+    # Current resident set, from /proc (Linux)
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+def load_server(client=None):
+    # Import server.py pointed at the benchmark database and open its
+    # resources; the lifespan (when a benchmark runs it) reuses them
+    os.environ['DB_NAME'] = bench_db_name()
+    import server
+    server.open_resources(client)
+    return server
+
+def asgi_client(app):
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+async def run_concurrent(fn: Callable[[], Awaitable], total: int, concurrency: int) -> List[float]:
+    samples: List[float] = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+def start_launcher(workers: int, port: int, extra: Sequence[str] = ()) -> subprocess.Popen:
+    # launcher.py in its own process, pointed at the benchmark database
+    env = {**os.environ, 'DB_NAME': bench_db_name()}
+    return subprocess.Popen(
+        [sys.executable, "launcher.py", "--workers", str(workers), "--port", str(port), "--no-access-log", *extra],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+async def wait_ready(port: int, workers: int, timeout: float = 60.0) -> Set[int]:
+    # Polls /readyz on fresh connections until that many distinct worker
+    # pids have answered 200
+    import httpx
+
+    ready: Set[int] = set()
+    deadline = time.monotonic() + timeout
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=1.0) as http:
+        while len(ready) < workers:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{len(ready)}/{workers} workers ready after {timeout:.0f}s")
+            try:
+                response = await http.get("/readyz")
+                if response.status_code == 200:
+                    ready.add(response.json()['pid'])
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.01)
+    return ready
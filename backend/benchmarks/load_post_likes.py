@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from benchmarks.common import asgi_client, load_server, print_row, run_concurrent, summarize
+
+# Many users liking the same post at once: the previous unconditional $inc
+# on the post vs deduplicated like rows with a buffered counter. Every
+# user likes twice, so the final count also shows whether repeats leak in.
+# Usage: python -m benchmarks.load_post_likes [--users 2000] [--concurrency 100]
+
+async def main(args):
+    server = load_server()
+    db = server.db
+    await server.ensure_indexes(db)
+
+    # Users are inserted directly; registering thousands through bcrypt
+    # would dominate the run
+    now = datetime.now(timezone.utc).isoformat()
+    users = [{
+        "id": str(uuid.uuid4()), "email": f"liker-{i}@example.com", "password": "-",
+        "first_name": "Liker", "last_name": str(i), "is_admin": False, "created_at": now,
+    } for i in range(args.users)]
+    await db.users.insert_many(users)
+    tokens = [{"Authorization": f"Bearer {server.create_access_token({'sub': user['id']})}"} for user in users]
+
+    async with asgi_client(server.app) as http:
+        post = (await http.post("/api/posts", headers=tokens[0], json={"title": "Hot post", "content": "..."})).json()
+
+        async def legacy_like():
+            await db.posts.update_one({"id": post['id']}, {"$inc": {"likes": 1}})
+
+        likers = iter(tokens * 2)
+
+        async def like():
+            await http.post(f"/api/posts/{post['id']}/like", headers=next(likers))
+
+        samples = await run_concurrent(legacy_like, args.users * 2, args.concurrency)
+        print_row("$inc on the post (previous)", summarize(samples))
+        legacy_count = (await db.posts.find_one({"id": post['id']}))['likes']
+        await db.posts.update_one({"id": post['id']}, {"$set": {"likes": 0}})
+
+        flusher = asyncio.create_task(server.like_flusher())
+        start = time.perf_counter()
+        samples = await run_concurrent(like, args.users * 2, args.concurrency)
+        elapsed = time.perf_counter() - start
+        flusher.cancel()
+        await server.like_buffer.flush(db)
+        print_row("like rows + buffered counter", summarize(samples))
+
+        count = (await db.posts.find_one({"id": post['id']}))['likes']
+        print(f"{args.users * 2 / elapsed:.1f} likes/s through the API")
+        print(f"final count: previous={legacy_count} buffered={count} (expected {args.users})")
+        print(server.like_buffer.stats())
+
+    await server.client.drop_database(db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
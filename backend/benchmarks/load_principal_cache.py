@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import uuid
+
+from benchmarks.common import asgi_client, load_server, print_row, run_concurrent, summarize
+
+# Latency of authenticated endpoints with the principal cache off vs on.
+# Usage: python -m benchmarks.load_principal_cache [--requests 5000] [--concurrency 50]
+
+async def main(args):
+    server = load_server()
+
+    async with asgi_client(server.app) as http:
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        response = await http.post("/api/auth/register", json={
+            "email": email, "password": "bench-password", "first_name": "Bench", "last_name": "User",
+        })
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        for i in range(args.trips):
+            await http.post("/api/trips", headers=headers, json={
+                "name": f"Trip {i}", "start_date": "2025-06-01", "end_date": "2025-06-10",
+            })
+
+        for path in ("/api/auth/me", "/api/trips"):
+            async def call():
+                await http.get(path, headers=headers)
+
+            for label, ttl in (("cache off", 0), ("cache on ", 60)):
+                server.principal_cache.ttl = ttl
+                server.principal_cache.clear()
+                samples = await run_concurrent(call, args.requests, args.concurrency)
+                print_row(f"{label} GET {path}", summarize(samples))
+
+        print(server.principal_cache.stats())
+
+    await server.client.drop_database(server.db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--trips", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
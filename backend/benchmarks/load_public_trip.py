@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+from benchmarks.bench_trip_detail import seed_trip
+from benchmarks.common import asgi_client, load_server, print_row, summarize
+
+# Open-loop load on shared trip pages: requests are fired at a fixed rate
+# (default 5k/s) whether or not earlier ones have finished, while the owner
+# edits one trip periodically so its page keeps going cold. Compares the
+# uncached handler with the pre-serialized cache and counts database
+# fetches to show request coalescing.
+# Usage: python -m benchmarks.load_public_trip [--rate 5000] [--duration 10]
+
+async def run_open_loop(http, urls, rate: int, duration: float, etags=None):
+    samples, statuses, tasks = [], Counter(), []
+
+    async def one(url):
+        headers = {"If-None-Match": etags[url]} if etags and url in etags else None
+        start = time.perf_counter()
+        response = await http.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        # Sleep until the next scheduled send time, then fire without waiting
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(random.choice(urls))))
+    await asyncio.gather(*tasks)
+    return samples, statuses, total / (time.perf_counter() - start)
+
+async def editor(http, headers, trip_id: str, interval: float):
+    # Metadata edits invalidate the hottest page throughout the run
+    i = 0
+    while True:
+        await asyncio.sleep(interval)
+        i += 1
+        await http.put(f"/api/trips/{trip_id}", headers=headers, json={"description": f"edit {i}"})
+
+async def main(args):
+    server = load_server()
+    await server.ensure_indexes(server.db)
+
+    async with asgi_client(server.app) as http:
+        response = await http.post("/api/auth/register", json={
+            "email": f"bench-{random.getrandbits(32):08x}@example.com", "password": "bench-password",
+            "first_name": "Bench", "last_name": "User",
+        })
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        user_id = response.json()['user']['id']
+
+        trip_ids = [await seed_trip(server.db, user_id, args.stops, args.activities, 0) for _ in range(args.trips)]
+        urls = []
+        for trip_id in trip_ids:
+            published = await http.post(f"/api/trips/{trip_id}/publish", headers=headers)
+            urls.append(f"/api/public/trips/{published.json()['public_url']}")
+        # Skew traffic towards the first (edited) trip like a link going viral
+        weighted = urls + [urls[0]] * len(urls)
+
+        fetches = 0
+        load = server.load_public_trip
+
+        async def counted_load(*a):
+            nonlocal fetches
+            fetches += 1
+            return await load(*a)
+
+        server.load_public_trip = counted_load
+        etags = {url: (await http.get(url)).headers["etag"] for url in urls}
+
+        for label, ttl, conditional in (
+            ("no cache", 0, False),
+            ("pre-serialized cache", 30, False),
+            ("cache + If-None-Match", 30, True),
+        ):
+            server.public_trip_cache.ttl = ttl
+            server.public_trip_cache.clear()
+            fetches = 0
+            edits = asyncio.ensure_future(editor(http, headers, trip_ids[0], args.edit_interval))
+            samples, statuses, achieved = await run_open_loop(
+                http, weighted, args.rate, args.duration, etags if conditional else None
+            )
+            edits.cancel()
+            print_row(label, summarize(samples))
+            print(f"{'':<40} achieved={achieved:8.1f} req/s db_fetches={fetches} statuses={dict(statuses)}")
+
+        print(server.public_trip_cache.stats())
+
+    await server.client.drop_database(server.db.name)
+    server.client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=5000)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--trips", type=int, default=20)
+    parser.add_argument("--stops", type=int, default=10)
+    parser.add_argument("--activities", type=int, default=100)
+    parser.add_argument("--edit-interval", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
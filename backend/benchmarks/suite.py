@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.common import asgi_client, bench_db_name, load_server, percentile
+
+# End-to-end scenarios against the full app (lifespan included) on a
+# seeded benchmark database. Reports throughput, p50/p95/p99 latency and
+# Mongo round trips per request, and saves/compares JSON baselines.
+#   login_storm    POST /api/auth/login for random users
+#   trip_detail    GET /api/trips/{id}/full for random owned trips
+#   public_trip    GET /api/public/trips/{url}, skewed toward a few hot trips
+#   feed_scroll    GET /api/posts, following X-Next-Cursor for a few pages
+#   budget_poll    GET /api/trips/{id}/budget
+# --in-memory runs against mongomock-motor instead of MONGO_URL (not a
+# backend dependency; install it separately). It has no command monitoring
+# and only partial aggregation support, so use it for smoke runs, not numbers.
+# Usage: python -m benchmarks.suite [--users 200] [--save baseline.json]
+#        python -m benchmarks.suite --compare baseline.json [--tolerance 0.10]
+
+PASSWORD = "bench-password"
+CATEGORIES = ["transport", "accommodation", "food", "activities", "other"]
+
+# ==================== SEEDING ====================
+
+async def seed(server, args) -> dict:
+    from seed_data import seed_catalog
+
+    db = server.db
+    await seed_catalog(db)
+    cities = await db.cities.find({}, {"_id": 0, "id": 1, "name": 1, "country": 1}).to_list(None)
+    templates: Dict[str, list] = {}
+    async for template in db.activity_templates.find({}, {"_id": 0}):
+        templates.setdefault(template['city_id'], []).append(template)
+
+    # One bcrypt hash shared by every seeded user
+    password_hash = await server.password_hasher.hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+    users, trips, stops, activities, expenses, rollups, posts = [], [], [], [], [], [], []
+    for u in range(args.users):
+        user_id = str(uuid.uuid4())
+        users.append({
+            "id": user_id, "email": f"bench-{u}@example.com", "password": password_hash,
+            "first_name": "Bench", "last_name": f"User {u}", "is_admin": False, "created_at": now,
+        })
+        for t in range(args.trips):
+            trip_id = str(uuid.uuid4())
+            public = random.random() < args.public_fraction
+            trips.append({
+                "id": trip_id, "user_id": user_id, "name": f"Trip {t}", "start_date": "2025-06-01",
+                "end_date": "2025-06-30", "status": "upcoming", "is_public": public,
+                "public_url": str(uuid.uuid4()) if public else None, "created_at": now,
+            })
+            breakdown = {category: 0.0 for category in CATEGORIES}
+            activities_count = 0
+            for s in range(args.stops):
+                city = random.choice(cities)
+                stop_id = str(uuid.uuid4())
+                stops.append({
+                    "id": stop_id, "trip_id": trip_id, "user_id": user_id, "city_id": city['id'],
+                    "city_name": city['name'], "country": city['country'], "start_date": "2025-06-01",
+                    "end_date": "2025-06-03", "order": s, "created_at": now,
+                })
+                for template in random.sample(templates.get(city['id'], []), min(args.activities, len(templates.get(city['id'], [])))):
+                    activities.append({
+                        "id": str(uuid.uuid4()), "trip_id": trip_id, "stop_id": stop_id, "user_id": user_id,
+                        "activity_template_id": template['id'], "activity_name": template['name'],
+                        "activity_description": template.get('description'), "category": template['category'],
+                        "duration": template['duration'], "date": "2025-06-02", "cost": float(template['estimated_cost']),
+                        "created_at": now,
+                    })
+                    breakdown["activities"] += float(template['estimated_cost'])
+                    activities_count += 1
+            for _ in range(args.expenses):
+                category = random.choice(CATEGORIES)
+                amount = float(random.randint(1, 500))
+                expenses.append({
+                    "id": str(uuid.uuid4()), "trip_id": trip_id, "user_id": user_id, "category": category,
+                    "amount": amount, "date": f"2025-06-{random.randint(1, 30):02d}", "created_at": now,
+                })
+                breakdown[category] += amount
+            rollups.append({
+                "trip_id": trip_id, "user_id": user_id, "breakdown": breakdown, "activities_count": activities_count,
+                "expenses_count": args.expenses, "updated_at": now,
+            })
+    for p in range(args.posts):
+        author = random.choice(users)
+        posts.append({
+            "id": str(uuid.uuid4()), "user_id": author['id'], "user_name": f"{author['first_name']} {author['last_name']}",
+            "title": f"Post {p}", "content": "Bench post", "trip_id": None, "likes": 0,
+            "created_at": now - timedelta(seconds=p),
+        })
+
+    for collection, docs in (
+        (db.users, users), (db.trips, trips), (db.stops, stops), (db.trip_activities, activities),
+        (db.expenses, expenses), (db.trip_budget_rollups, rollups), (db.posts, posts),
+    ):
+        for offset in range(0, len(docs), 10000):
+            await collection.insert_many(docs[offset:offset + 10000], ordered=False)
+
+    print(
+        f"Seeded {len(users)} users, {len(trips)} trips, {len(stops)} stops, {len(activities)} activities, "
+        f"{len(expenses)} expenses, {len(posts)} posts"
+    )
+    return {
+        "users": users,
+        "trips": trips,
+        "public_urls": [trip['public_url'] for trip in trips if trip['is_public']],
+        "tokens": {user['id']: server.create_access_token({"sub": user['id']}) for user in users},
+    }
+
+# ==================== SCENARIOS ====================
+
+def login_storm(http, data) -> Callable[[], Awaitable]:
+    async def call():
+        user = random.choice(data["users"])
+        return await http.post("/api/auth/login", json={"email": user['email'], "password": PASSWORD})
+    return call
+
+def trip_detail(http, data) -> Callable[[], Awaitable]:
+    async def call():
+        trip = random.choice(data["trips"])
+        headers = {"Authorization": f"Bearer {data['tokens'][trip['user_id']]}"}
+        return await http.get(f"/api/trips/{trip['id']}/full", headers=headers)
+    return call
+
+def public_trip(http, data) -> Callable[[], Awaitable]:
+    # Zipf-like: the first few public trips get most of the traffic
+    urls = data["public_urls"]
+    weights = [1 / (rank + 1) for rank in range(len(urls))]
+
+    async def call():
+        return await http.get(f"/api/public/trips/{random.choices(urls, weights)[0]}")
+    return call
+
+def feed_scroll(http, data, pages: int = 5) -> Callable[[], Awaitable]:
+    # Each call fetches the next page of one reader's scroll, starting over
+    # after `pages` pages or at the end of the feed
+    scroll = {"cursor": None, "page": 0}
+
+    async def call():
+        headers = {"Authorization": f"Bearer {random.choice(list(data['tokens'].values()))}"}
+        params = {"limit": 20}
+        if scroll["cursor"]:
+            params["cursor"] = scroll["cursor"]
+        response = await http.get("/api/posts", headers=headers, params=params)
+        scroll["page"] += 1
+        scroll["cursor"] = response.headers.get("X-Next-Cursor") if scroll["page"] < pages else None
+        if not scroll["cursor"]:
+            scroll["page"] = 0
+        return response
+    return call
+
+def budget_poll(http, data) -> Callable[[], Awaitable]:
+    async def call():
+        trip = random.choice(data["trips"])
+        headers = {"Authorization": f"Bearer {data['tokens'][trip['user_id']]}"}
+        return await http.get(f"/api/trips/{trip['id']}/budget", headers=headers)
+    return call
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "trip_detail": trip_detail,
+    "public_trip": public_trip,
+    "feed_scroll": feed_scroll,
+    "budget_poll": budget_poll,
+}
+
+# ==================== RUNNER ====================
+
+async def run_scenario(call: Callable[[], Awaitable], total: int, concurrency: int, track_mongo: bool) -> dict:
+    from metrics import REQUEST_MONGO_COMMANDS
+
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = str((await call()).status_code)
+            except Exception as e:
+                status = type(e).__name__
+            samples.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    requests_before, commands_before = REQUEST_MONGO_COMMANDS.totals()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    requests_after, commands_after = REQUEST_MONGO_COMMANDS.totals()
+
+    served = requests_after - requests_before
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": total,
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mongo_ops_per_request": (commands_after - commands_before) / served if track_mongo and served else None,
+    }
+
+def print_result(name: str, result: dict):
+    ops = result["mongo_ops_per_request"]
+    print(
+        f"{name:<14} {result['throughput_rps']:9.1f} req/s  p50={result['p50_ms']:8.2f}ms  "
+        f"p95={result['p95_ms']:8.2f}ms  p99={result['p99_ms']:8.2f}ms  "
+        f"mongo ops/req={'n/a' if ops is None else f'{ops:.2f}'}  errors={result['errors']}"
+    )
+
+# ==================== BASELINES ====================
+
+# metric -> True when higher is better
+COMPARED = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "mongo_ops_per_request": False}
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline: dict, report: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            print(f"  {name:<14} {metric:<22} {old:10.2f} -> {new:10.2f} ({change:+.1%}){'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+# ==================== MAIN ====================
+
+def load_in_memory_server():
+    from mongomock_motor import AsyncMongoMockClient
+
+    os.environ['ENSURE_INDEXES'] = 'false'
+    server = load_server(AsyncMongoMockClient())
+    server.secondary_db = server.db
+    return server
+
+async def main(args):
+    random.seed(args.seed)
+    server = load_in_memory_server() if args.in_memory else load_server()
+    await server.db.client.drop_database(bench_db_name())
+    # One INFO line per request would swamp the results
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    async with server.app.router.lifespan_context(server.app):
+        data = await seed(server, args)
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "in_memory": args.in_memory,
+                "args": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+            },
+            "scenarios": {},
+        }
+        async with asgi_client(server.app) as http:
+            for name in args.scenarios:
+                call = SCENARIOS[name](http, data)
+                await run_scenario(call, args.warmup, args.concurrency, False)
+                result = await run_scenario(call, args.requests, args.concurrency, not args.in_memory)
+                report["scenarios"][name] = result
+                print_result(name, result)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        print(f"Compared with {args.compare} (revision {baseline.get('meta', {}).get('revision')}):")
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+    # The lifespan closed the client; drop with a fresh one
+    if not args.in_memory:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        await client.drop_database(bench_db_name())
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--trips", type=int, default=3, help="per user")
+    parser.add_argument("--stops", type=int, default=5, help="per trip")
+    parser.add_argument("--activities", type=int, default=3, help="per stop")
+    parser.add_argument("--expenses", type=int, default=10, help="per trip")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--public-fraction", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request mix")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="compare with a saved baseline; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change before flagging")
+    asyncio.run(main(parser.parse_args()))
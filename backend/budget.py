@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional
+
+from pipelines import EXPENSE_CATEGORIES, budget_pipeline
+
+BUDGET_GROUPINGS = ("day", "stop")
+
+def empty_breakdown() -> Dict[str, float]:
+    return {category: 0 for category in EXPENSE_CATEGORIES}
+
+def _summary(breakdown: Dict[str, float]) -> dict:
+    return {"total": sum(breakdown.values()), "breakdown": breakdown}
+
+def _stop_for_date(stops: List[dict], date: Optional[str]) -> Optional[str]:
+    # Expenses carry a date but no stop; attribute them to the first stop
+    # (in itinerary order) whose date span contains that date.
+    if date:
+        for stop in stops:
+            if stop['start_date'] <= date <= stop['end_date']:
+                return stop['id']
+    return None
+
+async def compute_budget(db, trip_id: str, group_by: Optional[str] = None) -> dict:
+    rows = await db.expenses.aggregate(budget_pipeline(trip_id, group_by)).to_list(None)
+
+    stops = []
+    if group_by == "stop":
+        stops = await db.stops.find(
+            {"trip_id": trip_id}, {"_id": 0, "id": 1, "city_name": 1, "start_date": 1, "end_date": 1}
+        ).sort("order", 1).to_list(None)
+
+    breakdown = empty_breakdown()
+    buckets: Dict[Optional[str], Dict[str, float]] = {}
+    activities_count = 0
+    expenses_count = 0
+
+    for row in rows:
+        key = row['_id']
+        if key['source'] == "activity":
+            activities_count += row['count']
+        else:
+            expenses_count += row['count']
+
+        # Unknown expense categories are counted but not totalled
+        category = key['category']
+        if category not in breakdown:
+            continue
+        breakdown[category] += row['total']
+
+        if group_by:
+            bucket = key.get('bucket')
+            if group_by == "stop" and key['source'] == "expense":
+                bucket = _stop_for_date(stops, bucket)
+            buckets.setdefault(bucket, empty_breakdown())[category] += row['total']
+
+    result = {
+        "total": sum(breakdown.values()),
+        "breakdown": breakdown,
+        "activities_count": activities_count,
+        "expenses_count": expenses_count
+    }
+
+    if group_by == "day":
+        result["by_day"] = [
+            {"date": date, **_summary(day_breakdown)}
+            for date, day_breakdown in sorted(buckets.items(), key=lambda item: item[0] or "")
+        ]
+    elif group_by == "stop":
+        result["by_stop"] = [
+            {"stop_id": stop['id'], "city_name": stop['city_name'], **_summary(buckets.pop(stop['id'], empty_breakdown()))}
+            for stop in stops
+        ]
+        # Activities whose stop was removed, or expenses outside every stop
+        unassigned = empty_breakdown()
+        for bucket_breakdown in buckets.values():
+            for category, amount in bucket_breakdown.items():
+                unassigned[category] += amount
+        result["unassigned"] = _summary(unassigned)
+
+    return result
@@ -0,0 +1,23 @@
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from pymongo.errors import BulkWriteError
+
+# Helpers for the bulk endpoints. Inserts are unordered so one bad document
+# doesn't stop the rest; failures come back keyed by position in the batch
+# so each item can be reported individually.
+
+async def insert_unordered(collection, docs: List[dict]) -> Dict[int, str]:
+    if not docs:
+        return {}
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {error['index']: error.get('errmsg', "Write failed") for error in e.details.get('writeErrors', [])}
+    return {}
+
+def group_by(pairs: Iterable[Tuple[Hashable, object]]) -> Dict[Hashable, list]:
+    grouped = defaultdict(list)
+    for key, value in pairs:
+        grouped[key].append(value)
+    return dict(grouped)
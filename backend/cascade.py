@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from pymongo.errors import PyMongoError
+
+from rollups import SETTLED, delete_rollup, rebuild_rollup, record_activities
+
+# Cascading deletes for trips and stops.
+#
+# On a replica set or sharded cluster the parent and its children are
+# removed in one transaction. A session can't run operations concurrently,
+# so inside the transaction the deletes are issued back to back.
+#
+# Elsewhere a cascade_tombstones document is written first:
+#   {_id, kind: "trip"|"stop", target_id, trip_id, user_id, created_at, not_before}
+# then the parent is removed, the children are deleted concurrently and the
+# tombstone is dropped. If the process dies in between, the reaper finishes
+# the job once not_before has passed. Trips with more than soft_threshold
+# children skip the inline deletes entirely and leave them to the reaper.
+
+REAP_BATCH_SIZE = 1000
+# Inline cascades get this long before the reaper considers them abandoned
+REAP_GRACE = timedelta(seconds=60)
+# A claimed tombstone is retried after this if its reaper disappears
+REAP_LEASE = timedelta(minutes=5)
+
+TRIP_CHILDREN = ("stops", "trip_activities", "expenses", "trip_budget_rollups")
+
+_transactions_supported: Optional[bool] = None
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+async def supports_transactions(db) -> bool:
+    # Transactions need a replica set member or mongos
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await db.client.admin.command("hello")
+            _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except PyMongoError:
+            _transactions_supported = False
+    return _transactions_supported
+
+async def _in_transaction(db, callback):
+    # with_transaction retries on transient errors and unknown commit results
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
+
+async def _write_tombstone(db, kind: str, target_id: str, trip_id: str,
+                           user_id: Optional[str], delay: timedelta) -> str:
+    tombstone_id = str(uuid.uuid4())
+    now = _now()
+    await db.cascade_tombstones.insert_one({
+        "_id": tombstone_id,
+        "kind": kind,
+        "target_id": target_id,
+        "trip_id": trip_id,
+        "user_id": user_id,
+        "created_at": now,
+        "not_before": now + delay
+    })
+    return tombstone_id
+
+async def trip_child_count(db, trip_id: str) -> int:
+    rollup = await db.trip_budget_rollups.find_one(
+        {"trip_id": trip_id, **SETTLED}, {"_id": 0, "activities_count": 1, "expenses_count": 1}
+    )
+    if rollup:
+        return rollup.get('activities_count', 0) + rollup.get('expenses_count', 0)
+    counts = await asyncio.gather(
+        db.trip_activities.count_documents({"trip_id": trip_id}),
+        db.expenses.count_documents({"trip_id": trip_id})
+    )
+    return sum(counts)
+
+# ==================== TRIPS ====================
+
+async def delete_trip_cascade(db, trip_id: str, user_id: str, use_transactions: bool = True,
+                              soft_threshold: Optional[int] = None) -> Optional[str]:
+    # Returns how the delete ran ("transaction", "parallel" or "background"),
+    # or None when the user has no such trip
+    if not await db.trips.find_one({"id": trip_id, "user_id": user_id}, {"_id": 1}):
+        return None
+
+    soft = soft_threshold is not None and await trip_child_count(db, trip_id) >= soft_threshold
+
+    if not soft and use_transactions and await supports_transactions(db):
+        async def callback(session):
+            result = await db.trips.delete_one({"id": trip_id, "user_id": user_id}, session=session)
+            if not result.deleted_count:
+                return False
+            for name in TRIP_CHILDREN:
+                await db[name].delete_many({"trip_id": trip_id}, session=session)
+            return True
+
+        return "transaction" if await _in_transaction(db, callback) else None
+
+    tombstone_id = await _write_tombstone(db, "trip", trip_id, trip_id, user_id, timedelta(0) if soft else REAP_GRACE)
+    result = await db.trips.delete_one({"id": trip_id, "user_id": user_id})
+    if not result.deleted_count:
+        # Deleted by a concurrent request, which owns the cascade
+        await db.cascade_tombstones.delete_one({"_id": tombstone_id})
+        return None
+    if soft:
+        return "background"
+
+    await asyncio.gather(*(db[name].delete_many({"trip_id": trip_id}) for name in TRIP_CHILDREN))
+    await db.cascade_tombstones.delete_one({"_id": tombstone_id})
+    return "parallel"
+
+# ==================== STOPS ====================
+
+_STOP_TOTALS = [{"$group": {"_id": None, "cost": {"$sum": "$cost"}, "count": {"$sum": 1}}}]
+
+async def delete_stop_cascade(db, stop_id: str, trip_id: str, use_transactions: bool = True) -> str:
+    # Caller has verified ownership. The stop's activity totals are taken
+    # before the delete so the trip's budget rollup can be decremented.
+    if use_transactions and await supports_transactions(db):
+        async def callback(session):
+            removed = await db.trip_activities.aggregate(
+                [{"$match": {"stop_id": stop_id}}] + _STOP_TOTALS, session=session
+            ).to_list(1)
+            await db.stops.delete_one({"id": stop_id}, session=session)
+            await db.trip_activities.delete_many({"stop_id": stop_id}, session=session)
+            if removed:
+                await record_activities(db, trip_id, -removed[0]['cost'], -removed[0]['count'], session=session)
+
+        await _in_transaction(db, callback)
+        return "transaction"
+
+    tombstone_id = await _write_tombstone(db, "stop", stop_id, trip_id, None, REAP_GRACE)
+    removed = await db.trip_activities.aggregate([{"$match": {"stop_id": stop_id}}] + _STOP_TOTALS).to_list(1)
+    await asyncio.gather(
+        db.stops.delete_one({"id": stop_id}),
+        db.trip_activities.delete_many({"stop_id": stop_id})
+    )
+    if removed:
+        await record_activities(db, trip_id, -removed[0]['cost'], -removed[0]['count'])
+    await db.cascade_tombstones.delete_one({"_id": tombstone_id})
+    return "parallel"
+
+# ==================== REAPER ====================
+
+async def delete_in_batches(collection, query: dict, batch_size: int = REAP_BATCH_SIZE) -> int:
+    # Bounded deletes keep each operation short on very large trips
+    deleted = 0
+    while True:
+        ids = [doc['_id'] async for doc in collection.find(query, {"_id": 1}).limit(batch_size)]
+        if not ids:
+            return deleted
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        deleted += result.deleted_count
+        await asyncio.sleep(0)
+
+async def _reap(db, tombstone: dict, batch_size: int):
+    if tombstone['kind'] == "trip":
+        # The trip itself may still exist if the request died before removing it
+        await db.trips.delete_one({"id": tombstone['target_id']})
+        for name in ("stops", "trip_activities", "expenses"):
+            await delete_in_batches(db[name], {"trip_id": tombstone['trip_id']}, batch_size)
+        await delete_rollup(db, tombstone['trip_id'])
+    else:
+        await delete_in_batches(db.trip_activities, {"stop_id": tombstone['target_id']}, batch_size)
+        await db.stops.delete_one({"id": tombstone['target_id']})
+        # Whether the rollup was decremented is unknown, so recompute it
+        trip = await db.trips.find_one({"id": tombstone['trip_id']}, {"_id": 0, "user_id": 1})
+        if trip:
+            await rebuild_rollup(db, tombstone['trip_id'], trip['user_id'])
+
+async def reap_tombstones(db, batch_size: int = REAP_BATCH_SIZE) -> int:
+    reaped = 0
+    while True:
+        # Claim one due tombstone by pushing its not_before out by a lease
+        now = _now()
+        tombstone = await db.cascade_tombstones.find_one_and_update(
+            {"not_before": {"$lte": now}},
+            {"$set": {"not_before": now + REAP_LEASE}},
+            sort=[("not_before", 1)]
+        )
+        if not tombstone:
+            return reaped
+        await _reap(db, tombstone, batch_size)
+        await db.cascade_tombstones.delete_one({"_id": tombstone['_id']})
+        reaped += 1
+
+# ==================== ORPHAN SCAN ====================
+
+# (child collection, reference field, parent collection)
+ORPHAN_CHECKS = (
+    ("stops", "trip_id", "trips"),
+    ("trip_activities", "trip_id", "trips"),
+    ("trip_activities", "stop_id", "stops"),
+    ("expenses", "trip_id", "trips"),
+    ("trip_budget_rollups", "trip_id", "trips"),
+)
+
+async def scan_orphans(db) -> Dict[str, Dict[str, int]]:
+    # Child rows whose parent is gone, grouped by missing parent id. Parents
+    # with a pending tombstone are already queued for the reaper.
+    pending = {doc['target_id'] async for doc in db.cascade_tombstones.find({}, {"target_id": 1})}
+    report = {}
+    for collection_name, field, parent in ORPHAN_CHECKS:
+        rows = await db[collection_name].aggregate([
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$lookup": {
+                "from": parent,
+                "localField": "_id",
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 1}}],
+                "as": "parent"
+            }},
+            {"$match": {"parent": {"$size": 0}}},
+            {"$project": {"count": 1}}
+        ]).to_list(None)
+        report[f"{collection_name}.{field}"] = {
+            row['_id']: row['count'] for row in rows if row['_id'] not in pending
+        }
+    return report
+
+async def queue_orphans(db, report: Dict[str, Dict[str, int]]) -> int:
+    # Hand orphans to the reaper: a trip tombstone clears everything keyed
+    # by the trip id, a stop tombstone clears the stop's activities
+    queued = set()
+    for key, parents in report.items():
+        kind = "stop" if key == "trip_activities.stop_id" else "trip"
+        for parent_id in parents:
+            if (kind, parent_id) in queued:
+                continue
+            if kind == "stop":
+                activity = await db.trip_activities.find_one({"stop_id": parent_id}, {"_id": 0, "trip_id": 1})
+                trip_id = activity['trip_id'] if activity else None
+            else:
+                trip_id = parent_id
+            await _write_tombstone(db, kind, parent_id, trip_id, None, timedelta(0))
+            queued.add((kind, parent_id))
+    return len(queued)
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    report = await scan_orphans(db)
+    for key, parents in report.items():
+        for parent_id, count in parents.items():
+            print(f"[orphan] {key} = {parent_id}: {count} rows")
+    print(f"{sum(len(parents) for parents in report.values())} missing parents, "
+          f"{sum(sum(parents.values()) for parents in report.values())} orphaned rows")
+
+    if args.fix:
+        print(f"Queued {await queue_orphans(db, report)} tombstones")
+    if args.fix or args.reap:
+        print(f"Reaped {await reap_tombstones(db)} tombstones")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Scan for orphaned trip data and run the cascade reaper")
+    parser.add_argument("--fix", action="store_true", help="queue orphans for deletion and reap them")
+    parser.add_argument("--reap", action="store_true", help="process due tombstones")
+    asyncio.run(main(parser.parse_args()))
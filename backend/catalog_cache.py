@@ -0,0 +1,139 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Versioned in-memory copy of the reference catalog. The whole catalog is
+# loaded at startup and reloaded when catalog_meta.version changes (the
+# seeder bumps it). Templates are kept per city, presorted by
+# (estimated_cost, id) so max_cost filters and keyset pages are bisects.
+
+TemplateKey = Tuple[float, str]
+
+class CatalogCache:
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.loaded = False
+        self._cities_by_id: Dict[str, dict] = {}
+        self._templates_by_id: Dict[str, dict] = {}
+        self._templates_by_city: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        self._keys_by_city: Dict[Tuple[str, Optional[str]], List[TemplateKey]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def etag(self) -> Optional[str]:
+        return f'W/"catalog-{self.version}"' if self.loaded else None
+
+    async def load(self, db, version: Optional[int] = None):
+        cities = await db.cities.find({}, {"_id": 0, "search_tokens": 0, "country_key": 0}).to_list(None)
+        templates = await db.activity_templates.find({}, {"_id": 0}).to_list(None)
+        self.build(cities, templates, version)
+
+    def build(self, cities: List[dict], templates: List[dict], version: Optional[int] = None):
+        templates = sorted(templates, key=_template_key)
+        by_city: Dict[Tuple[str, Optional[str]], List[dict]] = {}
+        for template in templates:
+            # One list per city and one per (city, category)
+            by_city.setdefault((template['city_id'], None), []).append(template)
+            by_city.setdefault((template['city_id'], template.get('category')), []).append(template)
+
+        # Assign everything at the end; build() never awaits so readers
+        # always see a consistent version.
+        self._cities_by_id = {city['id']: city for city in cities}
+        self._templates_by_id = {template['id']: template for template in templates}
+        self._templates_by_city = by_city
+        self._keys_by_city = {key: [_template_key(t) for t in items] for key, items in by_city.items()}
+        self.version = version
+        self.loaded = True
+
+    def cities(self) -> List[dict]:
+        return list(self._cities_by_id.values())
+
+    def templates(self) -> List[dict]:
+        return list(self._templates_by_id.values())
+
+    # ==================== LOOKUPS ====================
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def city(self, city_id: str) -> Optional[dict]:
+        return self._count(self._cities_by_id.get(city_id))
+
+    def template(self, template_id: str) -> Optional[dict]:
+        return self._count(self._templates_by_id.get(template_id))
+
+    async def get_city(self, db, city_id: str) -> Optional[dict]:
+        # Read-through: anything added since the last load is fetched once
+        city = self.city(city_id)
+        if city is None:
+            city = await db.cities.find_one({"id": city_id}, {"_id": 0, "search_tokens": 0, "country_key": 0})
+            if city is not None:
+                self._cities_by_id[city_id] = city
+        return city
+
+    async def get_template(self, db, template_id: str) -> Optional[dict]:
+        template = self.template(template_id)
+        if template is None:
+            template = await db.activity_templates.find_one({"id": template_id}, {"_id": 0})
+            if template is not None:
+                self._templates_by_id[template_id] = template
+        return template
+
+    async def get_cities(self, db, city_ids: Iterable[str]) -> Dict[str, dict]:
+        return await self._get_many(db.cities, self._cities_by_id, city_ids, {"_id": 0, "search_tokens": 0, "country_key": 0})
+
+    async def get_templates(self, db, template_ids: Iterable[str]) -> Dict[str, dict]:
+        return await self._get_many(db.activity_templates, self._templates_by_id, template_ids, {"_id": 0})
+
+    async def _get_many(self, collection, by_id: Dict[str, dict], ids: Iterable[str], projection: dict) -> Dict[str, dict]:
+        # Read-through for a batch: all misses are fetched with one $in
+        found, missing = {}, []
+        for item_id in set(ids):
+            item = self._count(by_id.get(item_id))
+            if item is None:
+                missing.append(item_id)
+            else:
+                found[item_id] = item
+        if missing:
+            async for item in collection.find({"id": {"$in": missing}}, projection):
+                by_id[item['id']] = found[item['id']] = item
+        return found
+
+    def city_templates(
+        self,
+        city_id: str,
+        category: Optional[str] = None,
+        max_cost: Optional[float] = None,
+        after: Optional[TemplateKey] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[dict], bool]:
+        # Returns a page in (estimated_cost, id) order and whether more exist
+        key = (city_id, category or None)
+        templates = self._templates_by_city.get(key, [])
+        keys = self._keys_by_city.get(key, [])
+        self.hits += 1
+
+        start = bisect.bisect_right(keys, after) if after else 0
+        end = bisect.bisect_right(keys, (max_cost, "\uffff")) if max_cost is not None else len(keys)
+        if limit is not None and end - start > limit:
+            return templates[start:start + limit], True
+        return templates[start:end], False
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "cities": len(self._cities_by_id),
+            "templates": len(self._templates_by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def _template_key(template: dict) -> TemplateKey:
+    return (float(template.get('estimated_cost', 0)), template['id'])
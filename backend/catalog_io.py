@@ -0,0 +1,399 @@
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import os
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from dotenv import load_dotenv
+from pymongo import ReplaceOne
+
+from catalog_version import bump_catalog_version
+from city_search import normalize, search_fields
+from indexes import index_models
+
+# Streaming import and export of the reference catalog (cities and activity
+# templates) as NDJSON or CSV, optionally gzipped (.gz).
+#
+# Ids are stable: a row keeps the id it was exported with, else the id of
+# the live row with the same natural key (city: country + name; template:
+# city + name), else a uuid5 of that key. Reimporting the same catalog
+# therefore never orphans the city_id / activity_template_id references
+# held by stops and trip activities.
+#
+# Rows are read lazily and written as unordered upserts in chunks, with a
+# bounded number of chunks in flight, so memory stays flat whatever the
+# file size. In "swap" mode (full replace) everything is loaded into
+# staging collections, indexed, then renamed over the live ones, so the API
+# never sees a half-loaded or empty catalog; an import that wrote nothing,
+# or rejected more than max_invalid of its rows (a wrong CSV header, the
+# wrong file), is aborted before the swap. "upsert" mode writes into the
+# live collections and keeps rows missing from the file.
+# Usage: python catalog_io.py import [--cities cities.ndjson] [--templates templates.csv] [--mode swap]
+#        python catalog_io.py export [--cities cities.ndjson] [--templates templates.csv.gz]
+
+CATALOG_NAMESPACE = uuid.UUID("6f1c1f4e-9a51-4b8e-8d0e-2f6a3c7b9d10")
+
+# Field -> type for each collection; CSV values arrive as strings
+CITY_FIELDS: Dict[str, type] = {
+    "id": str, "name": str, "country": str, "cost_index": float, "popularity": int,
+    "description": str, "image_url": str,
+}
+TEMPLATE_FIELDS: Dict[str, type] = {
+    "id": str, "city_id": str, "name": str, "description": str, "category": str,
+    "duration": int, "estimated_cost": float, "image_url": str,
+}
+CITY_REQUIRED = ("name", "country", "cost_index", "popularity")
+TEMPLATE_REQUIRED = ("name", "category", "duration", "estimated_cost")
+EXPORT_FIELDS = {"cities": list(CITY_FIELDS), "activity_templates": list(TEMPLATE_FIELDS)}
+
+MAX_REPORTED_ERRORS = 20
+# Share of rejected rows above which a swap import is aborted
+MAX_INVALID_FRACTION = 0.05
+
+# ==================== KEYS ====================
+
+def city_key(name: str, country: str) -> str:
+    return f"{normalize(country)}/{normalize(name)}"
+
+def city_id_for(name: str, country: str) -> str:
+    return str(uuid.uuid5(CATALOG_NAMESPACE, "city:" + city_key(name, country)))
+
+def template_id_for(city_id: str, name: str) -> str:
+    return str(uuid.uuid5(CATALOG_NAMESPACE, f"template:{city_id}/{normalize(name)}"))
+
+# ==================== READING ====================
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _format(path: Path) -> str:
+    suffixes = [s for s in path.suffixes if s != ".gz"]
+    return "csv" if suffixes and suffixes[-1] == ".csv" else "ndjson"
+
+def read_rows(path: Path) -> Iterator[dict]:
+    # One dict per line (NDJSON) or per record (CSV, header row first)
+    with _open(path, "r") as f:
+        if _format(path) == "csv":
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if value not in (None, "")}
+        else:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+
+def coerce(row: dict, fields: Dict[str, type], required: Iterable[str]) -> dict:
+    # Known fields only, cast to their type; raises ValueError on bad rows
+    doc = {}
+    for field, kind in fields.items():
+        value = row.get(field)
+        if value is None:
+            continue
+        try:
+            doc[field] = kind(float(value)) if kind is int else kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field} is not a valid {kind.__name__}: {value!r}")
+    missing = [field for field in required if field not in doc]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return doc
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ==================== IMPORT ====================
+
+class ImportAborted(ValueError):
+    def __init__(self, message: str, report: dict):
+        super().__init__(message)
+        self.report = report
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.invalid = 0
+        self.errors: List[str] = []
+
+    def reject(self, line: int, reason: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {line}: {reason}")
+
+    def report(self) -> dict:
+        return {"read": self.read, "written": self.written, "invalid": self.invalid, "errors": self.errors}
+
+    def refusal(self, max_invalid: float) -> Optional[str]:
+        # Why this collection must not replace the live one, if it mustn't
+        if not self.written:
+            return "no valid rows"
+        if self.invalid > max_invalid * self.read:
+            return f"{self.invalid} of {self.read} rows invalid (limit {max_invalid:.0%})"
+        return None
+
+async def run_bounded(chunks: Iterable[list], write: Callable, concurrency: int):
+    # At most `concurrency` chunks in flight; reading the next chunk waits
+    # for a slot, which is what bounds memory
+    pending = set()
+    for chunk in chunks:
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        pending.add(asyncio.create_task(write(chunk)))
+    for task in await asyncio.gather(*pending, return_exceptions=True):
+        if isinstance(task, BaseException):
+            raise task
+
+async def _write(collection, requests: List[ReplaceOne], stats: ImportStats):
+    if requests:
+        result = await collection.bulk_write(requests, ordered=False)
+        stats.written += result.upserted_count + result.matched_count
+
+async def import_cities(
+    live, target, rows: Iterable[dict], batch_size: int, concurrency: int
+) -> Tuple[ImportStats, Dict[str, str]]:
+    # Returns the stats and natural key -> id for every imported city
+    existing = {
+        city_key(city['name'], city['country']): city['id']
+        async for city in live.find({}, {"_id": 0, "id": 1, "name": 1, "country": 1})
+    }
+    stats, ids = ImportStats(), {}
+
+    def requests() -> Iterator[ReplaceOne]:
+        for line, row in enumerate(rows, 1):
+            stats.read += 1
+            try:
+                doc = coerce(row, CITY_FIELDS, CITY_REQUIRED)
+            except ValueError as e:
+                stats.reject(line, str(e))
+                continue
+            key = city_key(doc['name'], doc['country'])
+            doc['id'] = doc.get('id') or existing.get(key) or city_id_for(doc['name'], doc['country'])
+            ids[key] = doc['id']
+            yield ReplaceOne({"id": doc['id']}, {**doc, **search_fields(doc)}, upsert=True)
+
+    await run_bounded(chunked(requests(), batch_size), lambda chunk: _write(target, chunk, stats), concurrency)
+    return stats, ids
+
+async def import_templates(
+    live, target, rows: Iterable[dict], cities: Dict[str, str], batch_size: int, concurrency: int
+) -> ImportStats:
+    # cities: natural key -> id of every city templates may point at.
+    # Templates name their city by city_id or by city + country.
+    stats = ImportStats()
+    city_ids = set(cities.values())
+    # Only an existing catalog can hold ids worth keeping
+    preserve = await live.estimated_document_count() > 0
+
+    def docs() -> Iterator[dict]:
+        for line, row in enumerate(rows, 1):
+            stats.read += 1
+            try:
+                doc = coerce(row, TEMPLATE_FIELDS, TEMPLATE_REQUIRED)
+            except ValueError as e:
+                stats.reject(line, str(e))
+                continue
+            if 'city_id' not in doc and row.get('city') and row.get('country'):
+                doc['city_id'] = cities.get(city_key(row['city'], row['country']))
+            if doc.get('city_id') not in city_ids:
+                stats.reject(line, "unknown city")
+                continue
+            yield doc
+
+    async def write(chunk: List[dict]):
+        known = {}
+        if preserve:
+            # Keep the ids of live templates with the same natural key
+            async for template in live.find(
+                {"city_id": {"$in": list({doc['city_id'] for doc in chunk})},
+                 "name": {"$in": list({doc['name'] for doc in chunk})}},
+                {"_id": 0, "id": 1, "city_id": 1, "name": 1}
+            ):
+                known[(template['city_id'], normalize(template['name']))] = template['id']
+        requests = []
+        for doc in chunk:
+            doc['id'] = (
+                doc.get('id') or known.get((doc['city_id'], normalize(doc['name'])))
+                or template_id_for(doc['city_id'], doc['name'])
+            )
+            requests.append(ReplaceOne({"id": doc['id']}, doc, upsert=True))
+        await _write(target, requests, stats)
+
+    await run_bounded(chunked(docs(), batch_size), write, concurrency)
+    return stats
+
+async def _swap(staging, name: str):
+    # Index before the rename so the live collection is never unindexed;
+    # the rename itself is atomic and replaces the old collection
+    await staging.create_indexes(index_models(name))
+    await staging.rename(name, dropTarget=True)
+
+async def import_catalog(
+    db,
+    cities: Optional[Iterable[dict]] = None,
+    templates: Optional[Iterable[dict]] = None,
+    mode: str = "swap",
+    batch_size: int = 1000,
+    concurrency: int = 4,
+    max_invalid: float = MAX_INVALID_FRACTION
+) -> dict:
+    # Raises ImportAborted, with the live catalog untouched, when a swap
+    # would replace it with an empty or mostly rejected file
+    if mode not in ("swap", "upsert"):
+        raise ValueError(f"Unknown import mode: {mode}")
+    token = uuid.uuid4().hex[:8]
+    staging = {}
+    if mode == "swap":
+        for name, rows in (("cities", cities), ("activity_templates", templates)):
+            if rows is not None:
+                staging[name] = db[f"{name}_import_{token}"]
+
+    report = {"mode": mode}
+    try:
+        if cities is not None:
+            stats, city_ids = await import_cities(
+                db.cities, staging.get("cities", db.cities), cities, batch_size, concurrency
+            )
+            report["cities"] = stats.report()
+            checked = {"cities": stats}
+        else:
+            checked = {}
+            city_ids = {
+                city_key(city['name'], city['country']): city['id']
+                async for city in db.cities.find({}, {"_id": 0, "id": 1, "name": 1, "country": 1})
+            }
+        if templates is not None:
+            stats = await import_templates(
+                db.activity_templates, staging.get("activity_templates", db.activity_templates),
+                templates, city_ids, batch_size, concurrency
+            )
+            report["templates"] = stats.report()
+            checked["activity_templates"] = stats
+
+        # Both are checked before either is swapped
+        refusals = []
+        for name, stats in checked.items():
+            reason = stats.refusal(max_invalid) if name in staging else None
+            if reason:
+                refusals.append(f"{name}: {reason}")
+        if refusals:
+            raise ImportAborted("Import aborted, catalog left as it was: " + "; ".join(refusals), report)
+
+        # Templates first: for a moment the new templates sit next to the old
+        # cities, which is harmless since reimported cities keep their ids
+        for name in ("activity_templates", "cities"):
+            if name in staging:
+                await _swap(staging.pop(name), name)
+    finally:
+        for collection in staging.values():
+            await collection.drop()
+
+    # Tell running API workers to reload their in-memory catalog
+    report["version"] = await bump_catalog_version(db)
+    return report
+
+# ==================== EXPORT ====================
+
+EXPORT_PROJECTION = {"_id": 0, "search_tokens": 0, "country_key": 0}
+
+async def export_rows(db, name: str, batch_size: int = 1000) -> AsyncIterator[dict]:
+    async for doc in db[name].find({}, EXPORT_PROJECTION).sort("id", 1).batch_size(batch_size):
+        yield doc
+
+async def export_chunks(db, name: str, fmt: str = "ndjson", rows_per_chunk: int = 1000) -> AsyncIterator[bytes]:
+    # Encoded output in chunks of rows_per_chunk rows
+    fields = EXPORT_FIELDS[name]
+    buffer, count = io.StringIO(), 0
+    writer = csv.DictWriter(buffer, fields, extrasaction="ignore", lineterminator="\n") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    lines: List[bytes] = []
+    async for doc in export_rows(db, name, rows_per_chunk):
+        if writer:
+            writer.writerow(doc)
+        else:
+            lines.append(orjson.dumps(doc) + b"\n")
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode() if writer else b"".join(lines)
+            buffer.seek(0)
+            buffer.truncate()
+            lines = []
+    if writer and buffer.tell():
+        yield buffer.getvalue().encode()
+    elif lines:
+        yield b"".join(lines)
+
+async def export_file(db, name: str, path: Path) -> int:
+    written = 0
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "wb") as f:
+        async for chunk in export_chunks(db, name, _format(path)):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    if args.command == "import":
+        try:
+            report = await import_catalog(
+                db,
+                read_rows(Path(args.cities)) if args.cities else None,
+                read_rows(Path(args.templates)) if args.templates else None,
+                args.mode, args.batch, args.concurrency, args.max_invalid
+            )
+        except ImportAborted as e:
+            report, aborted = e.report, str(e)
+        else:
+            aborted = None
+        for name in ("cities", "templates"):
+            if name in report:
+                stats = report[name]
+                print(f"{name}: read {stats['read']}, written {stats['written']}, invalid {stats['invalid']}")
+                for error in stats['errors']:
+                    print(f"  {error}")
+        if aborted:
+            client.close()
+            raise SystemExit(aborted)
+        print(f"Catalog version is now {report['version']}")
+    else:
+        for name, path in (("cities", args.cities), ("activity_templates", args.templates)):
+            if path:
+                print(f"{name}: {await export_file(db, name, Path(path))} bytes to {path}")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Import or export the city and activity catalog")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--cities", help="cities file (.ndjson, .jsonl or .csv, optionally .gz)")
+    parser.add_argument("--templates", help="activity templates file (same formats)")
+    parser.add_argument("--mode", choices=["swap", "upsert"], default="swap",
+                        help="swap: replace the catalog via staging collections; upsert: update in place")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per bulk_write")
+    parser.add_argument("--concurrency", type=int, default=4, help="bulk_writes in flight")
+    parser.add_argument("--max-invalid", type=float, default=MAX_INVALID_FRACTION,
+                        help="swap mode: abort when more than this share of rows is invalid")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,18 @@
+from pymongo import ReturnDocument
+
+# A single version stamp for the reference catalog (cities and activity
+# templates). Anything that rewrites the catalog bumps it; in-memory copies
+# compare it to decide when to rebuild.
+
+async def get_catalog_version(db) -> int:
+    doc = await db.catalog_meta.find_one({"_id": "catalog"})
+    return doc.get("version", 0) if doc else 0
+
+async def bump_catalog_version(db) -> int:
+    doc = await db.catalog_meta.find_one_and_update(
+        {"_id": "catalog"},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
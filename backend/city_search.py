@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import bisect
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+# Derived fields stored on every city so prefix search can use an index:
+#   country_key    normalized country name
+#   search_tokens  normalized words of name and country (multikey)
+SEARCH_FIELDS = ("country_key", "search_tokens")
+SEARCH_PROJECTION = {"_id": 0, **{field: 0 for field in SEARCH_FIELDS}}
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# ==================== NORMALIZATION ====================
+
+def normalize(text: Optional[str]) -> str:
+    # Accent-fold, case-fold and collapse anything that isn't a word char
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return normalize(text).split()
+
+def search_fields(city: dict) -> dict:
+    return {
+        "country_key": normalize(city.get('country')),
+        "search_tokens": sorted(set(tokenize(city.get('name')) + tokenize(city.get('country')))),
+    }
+
+def prefix_range(prefix: str) -> dict:
+    # Index-friendly equivalent of an anchored regex; user input never
+    # reaches the query as a pattern.
+    return {"$gte": prefix, "$lt": prefix + "\uffff"}
+
+def _rank(cities: List[dict], tokens: List[str]) -> List[dict]:
+    # Cities whose name starts with the query come first, then popularity
+    name_prefix = " ".join(tokens)
+    return sorted(
+        cities,
+        key=lambda city: (not normalize(city.get('name')).startswith(name_prefix), -city.get('popularity', 0))
+    )
+
+# ==================== MONGO SEARCH ====================
+
+def prefix_query(search: Optional[str], country: Optional[str]) -> dict:
+    query = {}
+    tokens = tokenize(search)
+    if tokens:
+        # Earlier words must match whole tokens, the last one may be partial
+        clauses = [{"search_tokens": token} for token in tokens[:-1]]
+        # $elemMatch keeps both range bounds on the same array element
+        clauses.append({"search_tokens": {"$elemMatch": prefix_range(tokens[-1])}})
+        query["$and"] = clauses
+    country_key = normalize(country)
+    if country_key:
+        query["country_key"] = prefix_range(country_key)
+    return query
+
+async def search_cities(db, search: Optional[str] = None, country: Optional[str] = None,
+                        text: Optional[str] = None, limit: int = 100) -> List[dict]:
+    if text and normalize(text):
+        # Free-form: text index score weighted by popularity
+        match = {"$text": {"$search": text}}
+        country_key = normalize(country)
+        if country_key:
+            match["country_key"] = prefix_range(country_key)
+        return await db.cities.aggregate([
+            {"$match": match},
+            {"$addFields": {"rank": {"$multiply": [
+                {"$meta": "textScore"}, {"$add": [1, {"$divide": ["$popularity", 100]}]}
+            ]}}},
+            {"$sort": {"rank": -1}},
+            {"$limit": limit},
+            {"$project": {**SEARCH_PROJECTION, "rank": 0}},
+        ]).to_list(limit)
+
+    cities = await db.cities.find(prefix_query(search, country), SEARCH_PROJECTION).sort(
+        "popularity", -1
+    ).to_list(limit)
+    return _rank(cities, tokenize(search))
+
+async def backfill_search_fields(db) -> int:
+    # Cities inserted before the search fields existed
+    updated = 0
+    async for city in db.cities.find({"search_tokens": {"$exists": False}}, {"_id": 1, "name": 1, "country": 1}):
+        await db.cities.update_one({"_id": city['_id']}, {"$set": search_fields(city)})
+        updated += 1
+    return updated
+
+# ==================== IN-MEMORY INDEX ====================
+
+class CityPrefixIndex:
+    # Sorted (token, position) array over the whole city catalog. A prefix
+    # lookup is two bisects over contiguous memory, no Mongo round trip.
+    def __init__(self):
+        self.version = None
+        self._cities: List[dict] = []
+        self._token_sets: List[set] = []
+        self._country_keys: List[str] = []
+        self._tokens: List[str] = []
+        self._positions: List[int] = []
+
+    def __len__(self):
+        return len(self._cities)
+
+    def build(self, cities: List[dict], version=None):
+        cities = sorted(cities, key=lambda city: -city.get('popularity', 0))
+        entries = []
+        token_sets = []
+        for position, city in enumerate(cities):
+            tokens = set(tokenize(city.get('name')) + tokenize(city.get('country')))
+            token_sets.append(tokens)
+            entries.extend((token, position) for token in tokens)
+        entries.sort()
+
+        # build() never awaits, so readers on the event loop can't observe
+        # a half-built index
+        self._cities = [{k: v for k, v in city.items() if k not in SEARCH_FIELDS and k != '_id'} for city in cities]
+        self._token_sets = token_sets
+        self._country_keys = [normalize(city.get('country')) for city in cities]
+        self._tokens = [token for token, _ in entries]
+        self._positions = [position for _, position in entries]
+        self.version = version
+
+    def search(self, search: Optional[str] = None, country: Optional[str] = None, limit: int = 100) -> List[dict]:
+        tokens = tokenize(search)
+        country_key = normalize(country)
+
+        if tokens:
+            last = tokens[-1]
+            lo = bisect.bisect_left(self._tokens, last)
+            hi = bisect.bisect_left(self._tokens, last + "\uffff")
+            candidates = sorted(set(self._positions[lo:hi]))
+            candidates = [p for p in candidates if all(t in self._token_sets[p] for t in tokens[:-1])]
+        else:
+            candidates = range(len(self._cities))
+
+        results = []
+        for position in candidates:
+            if country_key and not self._country_keys[position].startswith(country_key):
+                continue
+            results.append(self._cities[position])
+            if len(results) >= limit:
+                break
+        return _rank(results, tokens)
+
+async def load_city_index(db, index: CityPrefixIndex, version=None):
+    index.build(await db.cities.find({}, {"_id": 0}).to_list(None), version)
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Backfilled search fields on {await backfill_search_fields(db)} cities")
+    if args.search or args.text:
+        for city in await search_cities(db, search=args.search, text=args.text):
+            print(f"{city['name']}, {city['country']} ({city['popularity']})")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Backfill city search fields and run test queries")
+    parser.add_argument("--search", help="prefix query to run after the backfill")
+    parser.add_argument("--text", help="free-form text query to run after the backfill")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_preferences import SecondaryPreferred
+
+logger = logging.getLogger(__name__)
+
+# MongoDB client construction, configured from the environment:
+#   MONGO_MAX_POOL_SIZE                connections per server (default 100)
+#   MONGO_MIN_POOL_SIZE                kept open and warmed at startup (default 0)
+#   MONGO_MAX_IDLE_TIME_MS             close idle pooled connections after this
+#   MONGO_WAIT_QUEUE_TIMEOUT_MS        max wait for a free pooled connection (default 2000),
+#                                      only used with MONGO_TIMEOUT_MS=0 (see below)
+#   MONGO_SERVER_SELECTION_TIMEOUT_MS  fail fast when no server is reachable (default 5000)
+#   MONGO_CONNECT_TIMEOUT_MS           TCP connect timeout (default 5000)
+#   MONGO_TIMEOUT_MS                   deadline for every operation, 0 disables (default 10000)
+#   MONGO_COMPRESSORS                  e.g. "zstd,snappy,zlib"; zstd/snappy need extra packages
+#   MONGO_SECONDARY_READS              route catalog/public reads to secondaries (default false)
+#   MONGO_SECONDARY_MAX_STALENESS      seconds (>= 90) a secondary may lag to still be used
+# With timeoutMS set, pymongo (4.2+) bounds the wait for a pooled
+# connection by the operation's deadline and ignores waitQueueTimeoutMS, so
+# a saturated pool fails requests after MONGO_TIMEOUT_MS, not after the
+# wait queue timeout. The wait queue timeout is only passed when the
+# deadline is disabled; for a tighter bound on a single call, wrap it in
+# pymongo.timeout(seconds), which Motor carries onto its executor threads.
+# Dates come back timezone-aware (UTC), so they serialize with an offset.
+# The client is created with connect=False so nothing touches the network
+# until warm_up() runs at startup.
+
+def _int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": _int('MONGO_MAX_POOL_SIZE', 100),
+        "minPoolSize": _int('MONGO_MIN_POOL_SIZE', 0),
+        "serverSelectionTimeoutMS": _int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+        "connectTimeoutMS": _int('MONGO_CONNECT_TIMEOUT_MS', 5000),
+        "appname": "globetrotter",
+        "tz_aware": True,
+    }
+    if _int('MONGO_MAX_IDLE_TIME_MS', None):
+        options["maxIdleTimeMS"] = _int('MONGO_MAX_IDLE_TIME_MS', None)
+    if _int('MONGO_TIMEOUT_MS', 10000):
+        options["timeoutMS"] = _int('MONGO_TIMEOUT_MS', 10000)
+        if os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'):
+            logger.warning("MONGO_WAIT_QUEUE_TIMEOUT_MS has no effect while MONGO_TIMEOUT_MS is set; pool waits use the operation deadline")
+    else:
+        options["waitQueueTimeoutMS"] = _int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)
+    if os.environ.get('MONGO_COMPRESSORS'):
+        options["compressors"] = os.environ['MONGO_COMPRESSORS']
+    return options
+
+# ==================== POOL METRICS ====================
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    # Pool events fire on Motor's executor threads; check-out start and
+    # finish happen on the same thread, so wait time is measured per thread.
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures: Dict[str, int] = {}
+            self.checked_out = 0
+            self.open_connections = 0
+            self.wait_count = 0
+            self.wait_sum = 0.0
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * len(self.WAIT_BUCKETS)
+            self.pool_clears = 0
+
+    def _record_wait(self):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        self._local.started = None
+        waited = time.monotonic() - started
+        self.wait_count += 1
+        self.wait_sum += waited
+        self.wait_max = max(self.wait_max, waited)
+        for i, bound in enumerate(self.WAIT_BUCKETS):
+            if waited <= bound:
+                self.wait_buckets[i] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._record_wait()
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._record_wait()
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "in_use": self.checked_out,
+                "open_connections": self.open_connections,
+                "pool_clears": self.pool_clears,
+                "wait_seconds": {
+                    "count": self.wait_count,
+                    "sum": self.wait_sum,
+                    "max": self.wait_max,
+                    "mean": self.wait_sum / self.wait_count if self.wait_count else 0.0,
+                    "buckets": dict(zip(self.WAIT_BUCKETS, self.wait_buckets)),
+                },
+            }
+
+pool_metrics = PoolMetrics()
+
+# ==================== CLIENT ====================
+
+def create_client(url: Optional[str] = None, listeners: Sequence = (), **overrides) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        url or os.environ['MONGO_URL'],
+        connect=False,
+        event_listeners=[pool_metrics, *listeners],
+        **{**client_options(), **overrides}
+    )
+
+def secondary_database(client: AsyncIOMotorClient, name: str):
+    # Reads that tolerate replication lag (catalog, public trip pages)
+    if os.environ.get('MONGO_SECONDARY_READS', 'false').lower() != 'true':
+        return client[name]
+    staleness = _int('MONGO_SECONDARY_MAX_STALENESS', -1)
+    return client.get_database(name, read_preference=SecondaryPreferred(max_staleness=staleness))
+
+async def warm_up(client: AsyncIOMotorClient, connections: Optional[int] = None):
+    # Concurrent pings each check out their own connection, so the first
+    # requests don't pay for connection setup. Raises if the server can't
+    # be selected within serverSelectionTimeoutMS.
+    count = max(1, connections if connections is not None else client_options()["minPoolSize"])
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(count)))
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from indexes import index_models
+from pagination import fetch_page
+
+logger = logging.getLogger(__name__)
+
+# Community feed.
+#   posts       created_at stored as a BSON date, newest first on
+#               (created_at, id) so pages are index range scans
+#   post_likes  one {post_id, user_id, created_at} row per like, unique on
+#               (post_id, user_id); the source of truth for like counts
+# posts.likes is a denormalized counter. Likes are buffered per post in
+# memory and folded into the post with one $inc per post per flush, so a
+# popular post isn't a hot document written by every liker.
+
+FEED_SORT = [("created_at", -1), ("id", -1)]
+
+def _as_utc(value):
+    # The app's client is tz_aware; a client without it (scripts,
+    # benchmarks) hands back naive UTC datetimes
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+# ==================== LIKE COUNTERS ====================
+
+class LikeBuffer:
+    def __init__(self):
+        self._deltas: Dict[str, int] = {}
+        self.flushed = 0
+        self.flushes = 0
+
+    def add(self, post_id: str, delta: int):
+        self._deltas[post_id] = self._deltas.get(post_id, 0) + delta
+
+    def pending(self, post_id: str) -> int:
+        return self._deltas.get(post_id, 0)
+
+    async def flush(self, db) -> int:
+        # Swap the buffer out first so likes arriving during the write land
+        # in the next batch
+        deltas, self._deltas = self._deltas, {}
+        updates = [UpdateOne({"id": post_id}, {"$inc": {"likes": delta}}) for post_id, delta in deltas.items() if delta]
+        if not updates:
+            return 0
+        try:
+            await db.posts.bulk_write(updates, ordered=False)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            for post_id, delta in deltas.items():
+                self.add(post_id, delta)
+            raise
+        self.flushed += len(updates)
+        self.flushes += 1
+        return len(updates)
+
+    def stats(self) -> dict:
+        return {"pending_posts": len(self._deltas), "flushed_updates": self.flushed, "flushes": self.flushes}
+
+async def like_post(db, buffer: LikeBuffer, post_id: str, user_id: str) -> Optional[bool]:
+    # None: no such post; False: already liked; True: liked now
+    if not await db.posts.find_one({"id": post_id}, {"_id": 1}):
+        return None
+    # Keyed on the pair, so a repeat like matches the existing row rather
+    # than relying on the unique index to reject a second one
+    try:
+        result = await db.post_likes.update_one(
+            {"post_id": post_id, "user_id": user_id},
+            {"$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Two concurrent upserts of the same like; the index let one through
+        return False
+    if result.upserted_id is None:
+        return False
+    buffer.add(post_id, 1)
+    return True
+
+async def unlike_post(db, buffer: LikeBuffer, post_id: str, user_id: str) -> bool:
+    result = await db.post_likes.delete_one({"post_id": post_id, "user_id": user_id})
+    if result.deleted_count:
+        buffer.add(post_id, -1)
+    return bool(result.deleted_count)
+
+async def ensure_like_index(db):
+    # Concurrent upserts of one like only stay single with the unique
+    # (post_id, user_id) index, so it's created even when ENSURE_INDEXES
+    # is off. Fails (and is logged) if duplicates already exist.
+    try:
+        await db.post_likes.create_indexes(index_models("post_likes"))
+    except PyMongoError as e:
+        logger.error(f"Could not create the post_likes unique index: {e}")
+
+async def recount_likes(db) -> int:
+    # Rebuild posts.likes from post_likes, e.g. after a crash lost a buffer
+    counts = {row['_id']: row['count'] async for row in db.post_likes.aggregate([
+        {"$group": {"_id": "$post_id", "count": {"$sum": 1}}}
+    ])}
+    updates = []
+    async for post in db.posts.find({}, {"_id": 0, "id": 1, "likes": 1}):
+        if post.get('likes', 0) != counts.get(post['id'], 0):
+            updates.append(UpdateOne({"id": post['id']}, {"$set": {"likes": counts.get(post['id'], 0)}}))
+    if updates:
+        await db.posts.bulk_write(updates, ordered=False)
+    return len(updates)
+
+# ==================== FEED ====================
+
+class FeedCache:
+    # First page of the feed, shared by everyone, held for a few seconds and
+    # dropped when this worker creates a post
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._pages: Dict[int, Tuple[float, List[dict], Optional[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, limit: int) -> Optional[Tuple[List[dict], Optional[str]]]:
+        entry = self._pages.get(limit)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1], entry[2]
+        self.misses += 1
+        return None
+
+    def set(self, limit: int, posts: List[dict], next_cursor: Optional[str]):
+        if self.ttl > 0:
+            self._pages[limit] = (time.monotonic() + self.ttl, posts, next_cursor)
+
+    def clear(self):
+        self._pages.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+def feed_query(before: Optional[datetime]) -> dict:
+    return {"created_at": {"$lt": before}} if before else {}
+
+async def fetch_feed(db, cache: FeedCache, buffer: LikeBuffer, before: Optional[datetime],
+                     cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    top = not before and not cursor
+    cached = cache.get(limit) if top else None
+    if cached:
+        posts, next_cursor = cached
+    else:
+        posts, next_cursor = await fetch_page(db.posts, feed_query(before), FEED_SORT, limit, cursor)
+        if top:
+            cache.set(limit, posts, next_cursor)
+    # Counts include likes this worker hasn't flushed yet
+    return [
+        {**post, "created_at": _as_utc(post.get('created_at')), "likes": post.get('likes', 0) + buffer.pending(post['id'])}
+        for post in posts
+    ], next_cursor
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Corrected like counts on {await recount_likes(db)} posts")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    # String post dates are converted by python -m migrations.native_dates
+    parser = argparse.ArgumentParser(description="Rebuild like counters")
+    parser.add_argument("--recount", action="store_true", help="recompute posts.likes from post_likes")
+    args = parser.parse_args()
+    if not args.recount:
+        parser.error("nothing to do; pass --recount")
+    asyncio.run(main(args))
@@ -0,0 +1,136 @@
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from pipelines import EXPENSE_CATEGORIES
+from planner import trip_days
+
+# Spend forecasts from City.cost_index (1-10). A day in a city costs
+# cost_index * baseline per expense category, so a forecast is a product
+# of three arrays: cost_index per candidate, days per candidate and the
+# baselines per category. Scoring thousands (or millions) of (city, days)
+# candidates is a handful of NumPy operations, with no per-row Python.
+#
+# Baselines are the daily spend per traveller at cost_index 1. Override
+# them with FORECAST_BASELINES, e.g. "accommodation=15,food=6".
+
+DEFAULT_BASELINES = {"transport": 2.0, "accommodation": 12.0, "food": 5.0, "activities": 3.0, "other": 1.0}
+
+def parse_baselines(value: Optional[str]) -> Dict[str, float]:
+    baselines = dict(DEFAULT_BASELINES)
+    for item in (value or "").split(","):
+        if item.strip():
+            category, amount = item.split("=", 1)
+            baselines[category.strip()] = float(amount)
+    return baselines
+
+BASELINES = parse_baselines(os.environ.get('FORECAST_BASELINES'))
+
+def baseline_vector(baselines: Optional[Dict[str, float]] = None) -> np.ndarray:
+    # One column per expense category, in EXPENSE_CATEGORIES order
+    merged = {**BASELINES, **(baselines or {})}
+    return np.array([merged.get(category, 0.0) for category in EXPENSE_CATEGORIES], dtype=np.float64)
+
+def forecast_matrix(cost_index: np.ndarray, days: np.ndarray, baselines: np.ndarray) -> np.ndarray:
+    # (candidates, categories) projected spend
+    return (np.asarray(cost_index, dtype=np.float64) * days)[:, None] * baselines[None, :]
+
+def forecast_totals(cost_index: np.ndarray, days: np.ndarray, baselines: np.ndarray) -> np.ndarray:
+    # Same as forecast_matrix(...).sum(axis=1) without the matrix
+    return np.asarray(cost_index, dtype=np.float64) * days * baselines.sum()
+
+def _breakdown(row: np.ndarray) -> Dict[str, float]:
+    return {category: float(amount) for category, amount in zip(EXPENSE_CATEGORIES, row)}
+
+class CityCosts:
+    # Array-backed cost_index per city, rebuilt with the catalog cache.
+    # Incoming ids are mapped to rows with a dict; that one lookup per id is
+    # the only per-row Python (it beats a searchsorted over string arrays).
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.cost_index = np.zeros(0)
+        self.cities: List[dict] = []
+        self._rows: Dict[str, int] = {}
+
+    def build(self, cities: Iterable[dict], version: Optional[int] = None):
+        cities = [city for city in cities if city.get('cost_index') is not None]
+        self.cost_index = np.array([float(city['cost_index']) for city in cities], dtype=np.float64)
+        self.cities = cities
+        self._rows = {city['id']: row for row, city in enumerate(cities)}
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def rows(self, city_ids: Sequence[str]) -> np.ndarray:
+        # Row per id, -1 where the city is unknown
+        get = self._rows.get
+        return np.array([get(city_id, -1) for city_id in city_ids], dtype=np.int64)
+
+    def lookup(self, rows: np.ndarray, missing: float) -> np.ndarray:
+        # cost_index per row, `missing` where the row is -1
+        if not len(self.cost_index):
+            return np.full(len(rows), missing)
+        return np.where(rows >= 0, self.cost_index[rows], missing)
+
+    def score(self, city_ids: Sequence[str], days: Sequence[int], baselines: Optional[Dict[str, float]] = None) -> np.ndarray:
+        # Batch mode: projected total per (city, days) candidate, NaN for
+        # unknown cities
+        cost_index = self.lookup(self.rows(city_ids), np.nan)
+        return forecast_totals(cost_index, np.asarray(days, dtype=np.float64), baseline_vector(baselines))
+
+    def cheapest(self, days: int, limit: int, baselines: Optional[Dict[str, float]] = None) -> List[dict]:
+        # Every city scored for the same stay, cheapest first
+        vector = baseline_vector(baselines)
+        totals = forecast_totals(self.cost_index, days, vector)
+        limit = min(limit, len(totals))
+        if limit <= 0:
+            return []
+        top = np.argpartition(totals, limit - 1)[:limit]
+        top = top[np.argsort(totals[top], kind="stable")]
+        matrix = forecast_matrix(self.cost_index[top], days, vector)
+        return [{
+            "city_id": self.cities[row]['id'],
+            "city_name": self.cities[row]['name'],
+            "country": self.cities[row]['country'],
+            "cost_index": float(self.cost_index[row]),
+            "days": days,
+            "total": float(totals[row]),
+            "breakdown": _breakdown(matrix[i]),
+        } for i, row in enumerate(top)]
+
+def forecast_trip(costs: CityCosts, stops: Sequence[dict], baselines: Optional[Dict[str, float]] = None) -> dict:
+    # Per stop projection; shared travel days count once, for the first stop
+    days = trip_days(stops)
+    counts: Dict[str, int] = {}
+    for _, stop in days:
+        counts[stop['id']] = counts.get(stop['id'], 0) + 1
+
+    ordered = sorted(stops, key=lambda s: s['order'])
+    rows = costs.rows([stop['city_id'] for stop in ordered])
+    cost_index = costs.lookup(rows, 0.0)
+    day_counts = np.array([counts.get(stop['id'], 0) for stop in ordered], dtype=np.float64)
+    vector = baseline_vector(baselines)
+    daily = forecast_matrix(cost_index, np.ones(len(ordered)), vector)
+    totals = daily * day_counts[:, None]
+
+    by_stop = [{
+        "stop_id": stop['id'],
+        "city_id": stop['city_id'],
+        "city_name": stop.get('city_name'),
+        "cost_index": float(cost_index[i]) if rows[i] >= 0 else None,
+        "days": int(day_counts[i]),
+        "daily": _breakdown(daily[i]),
+        "daily_total": float(daily[i].sum()),
+        "total": float(totals[i].sum()),
+        "breakdown": _breakdown(totals[i]),
+    } for i, stop in enumerate(ordered)]
+    daily_by_stop = {item['stop_id']: item['daily_total'] for item in by_stop}
+    breakdown = _breakdown(totals.sum(axis=0))
+    return {
+        "total": sum(breakdown.values()),
+        "breakdown": breakdown,
+        "stops": by_stop,
+        "days": [{"date": day, "stop_id": stop['id'], "total": daily_by_stop[stop['id']]} for day, stop in days],
+    }
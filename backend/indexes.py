@@ -0,0 +1,179 @@
+import asyncio
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# ==================== INDEX SPECS ====================
+
+# One entry per query shape used by server.py. Keys are the index key lists,
+# options are passed straight to create_index.
+INDEX_SPECS: Dict[str, List[Tuple[List[Tuple[str, int]], dict]]] = {
+    "users": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    "trips": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        ([("public_url", ASCENDING)], {
+            "unique": True,
+            "partialFilterExpression": {"public_url": {"$type": "string"}},
+        }),
+    ],
+    "stops": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("id", ASCENDING), ("user_id", ASCENDING)], {}),
+        ([("trip_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "trip_activities": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("id", ASCENDING), ("user_id", ASCENDING)], {}),
+        ([("trip_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+        ([("stop_id", ASCENDING)], {}),
+        # Incremental recommendation builds: rows since the watermark
+        ([("created_at", ASCENDING)], {}),
+    ],
+    "expenses": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("id", ASCENDING), ("user_id", ASCENDING)], {}),
+        ([("trip_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+    "trip_budget_rollups": [
+        ([("trip_id", ASCENDING)], {"unique": True}),
+    ],
+    "cascade_tombstones": [
+        ([("not_before", ASCENDING)], {}),
+    ],
+    "posts": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("created_at", DESCENDING), ("id", DESCENDING)], {}),
+    ],
+    "post_likes": [
+        ([("post_id", ASCENDING), ("user_id", ASCENDING)], {"unique": True}),
+    ],
+    "city_stop_counts": [
+        ([("count", DESCENDING)], {}),
+    ],
+    "cities": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("popularity", DESCENDING)], {}),
+        ([("search_tokens", ASCENDING), ("popularity", DESCENDING)], {}),
+        ([("country_key", ASCENDING), ("popularity", DESCENDING)], {}),
+        ([("name", TEXT), ("country", TEXT), ("description", TEXT)], {
+            "weights": {"name": 10, "country": 5, "description": 1},
+            "default_language": "none",
+        }),
+    ],
+    "activity_templates": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("city_id", ASCENDING), ("category", ASCENDING), ("estimated_cost", ASCENDING), ("id", ASCENDING)], {}),
+        ([("city_id", ASCENDING), ("estimated_cost", ASCENDING), ("id", ASCENDING)], {}),
+    ],
+}
+
+def index_models(collection_name: str) -> List[IndexModel]:
+    return [IndexModel(keys, **options) for keys, options in INDEX_SPECS.get(collection_name, [])]
+
+# ==================== BOOTSTRAP ====================
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    # create_indexes is a no-op for indexes that already exist with the same
+    # spec, so this is safe to run on every startup.
+    created = {}
+    for collection_name in INDEX_SPECS:
+        try:
+            created[collection_name] = await db[collection_name].create_indexes(index_models(collection_name))
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes on {collection_name}: {e}")
+            created[collection_name] = []
+    return created
+
+# ==================== AUDIT ====================
+
+def _key_tuple(key) -> Tuple[Tuple[str, object], ...]:
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in key)
+
+def _spec_key(keys) -> Tuple[Tuple[str, object], ...]:
+    # The server stores text indexes as _fts/_ftsx whatever fields they cover
+    plain = [(field, direction) for field, direction in keys if direction != TEXT]
+    if len(plain) != len(keys):
+        plain += [("_fts", TEXT), ("_ftsx", 1)]
+    return _key_tuple(plain)
+
+async def audit_indexes(db) -> Dict[str, Dict[str, List[str]]]:
+    report = {}
+    for collection_name in INDEX_SPECS:
+        existing = await db[collection_name].index_information()
+        existing_keys = {name: _key_tuple(info["key"]) for name, info in existing.items()}
+        wanted_keys = {_spec_key(keys) for keys, _ in INDEX_SPECS[collection_name]}
+
+        missing = [
+            "_".join(f"{field}_{direction}" for field, direction in keys)
+            for keys, _ in INDEX_SPECS[collection_name]
+            if _spec_key(keys) not in existing_keys.values()
+        ]
+
+        # An index is redundant when its key is a strict prefix of another
+        # index and it carries no uniqueness guarantee of its own.
+        redundant = []
+        unmanaged = []
+        for name, key in existing_keys.items():
+            if name == "_id_":
+                continue
+            if not existing[name].get("unique") and any(
+                other != key and other[:len(key)] == key for other in existing_keys.values()
+            ):
+                redundant.append(name)
+            elif key not in wanted_keys:
+                unmanaged.append(name)
+
+        report[collection_name] = {"missing": missing, "redundant": redundant, "unmanaged": unmanaged}
+    return report
+
+async def drop_redundant_indexes(db, report: Dict[str, Dict[str, List[str]]]) -> int:
+    dropped = 0
+    for collection_name, entry in report.items():
+        for name in entry["redundant"]:
+            await db[collection_name].drop_index(name)
+            dropped += 1
+    return dropped
+
+# ==================== CLI ====================
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    if not args.check:
+        created = await ensure_indexes(db)
+        for collection_name, names in created.items():
+            print(f"{collection_name}: {', '.join(names) if names else 'no indexes created'}")
+
+    report = await audit_indexes(db)
+    for collection_name, entry in report.items():
+        for kind in ("missing", "redundant", "unmanaged"):
+            for name in entry[kind]:
+                print(f"[{kind}] {collection_name}.{name}")
+
+    if args.drop_redundant:
+        dropped = await drop_redundant_indexes(db, report)
+        print(f"Dropped {dropped} redundant indexes")
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Create and audit GlobeTrotter MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="only report missing/redundant indexes")
+    parser.add_argument("--drop-redundant", action="store_true", help="drop indexes reported as redundant")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.supervisors import Multiprocess
+
+from lifecycle import lifecycle
+
+# Production entry point: N uvicorn workers sharing one listening socket.
+# Workers are spawned (not forked), so each imports server.py on its own
+# and opens its own Motor client, bcrypt pool and caches in the lifespan.
+# uvloop and httptools are pinned in requirements.txt and required by
+# default; pass --loop asyncio --http h11 to run without them.
+#   WEB_CONCURRENCY          workers (default: one per CPU)
+#   HOST / PORT              bind address (default 0.0.0.0:8001)
+#   DRAIN_SECONDS            after SIGTERM, fail /readyz for this long before
+#                            closing the listener (default 5)
+#   GRACEFUL_TIMEOUT         then wait this long for in-flight requests (default 30)
+#   KEEP_ALIVE_TIMEOUT       idle keep-alive connection timeout (default 5)
+# Usage: python launcher.py [--workers 4] [--port 8001]
+
+logger = logging.getLogger("launcher")
+
+class DrainingServer(uvicorn.Server):
+    # On SIGTERM the worker keeps serving while /readyz reports 503, so the
+    # load balancer stops routing to it before the socket closes. A second
+    # signal (or SIGINT) shuts down straight away.
+    def __init__(self, config: uvicorn.Config, drain_seconds: float):
+        super().__init__(config)
+        self.drain_seconds = drain_seconds
+
+    def handle_exit(self, sig, frame):
+        if sig == signal.SIGTERM and self.drain_seconds > 0 and not lifecycle.draining:
+            lifecycle.start_draining()
+            logger.info(f"Draining for {self.drain_seconds:.1f}s before shutdown [{os.getpid()}]")
+            asyncio.get_event_loop().call_later(self.drain_seconds, super().handle_exit, sig, frame)
+            return
+        super().handle_exit(sig, frame)
+
+def build_config(args) -> uvicorn.Config:
+    return uvicorn.Config(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=args.loop,
+        http=args.http,
+        lifespan="on",
+        env_file=args.env_file,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        proxy_headers=True,
+    )
+
+def run(args):
+    config = build_config(args)
+    server = DrainingServer(config, args.drain_seconds)
+    if args.workers <= 1:
+        server.run()
+        return
+    # The parent binds once and forwards SIGTERM to every worker
+    sock = config.bind_socket()
+    Multiprocess(config, target=server.run, sockets=[sock]).run()
+
+if __name__ == "__main__":
+    env_file = Path(__file__).parent / '.env'
+    load_dotenv(env_file)
+    parser = argparse.ArgumentParser(description="Run the API with multiple uvicorn workers")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--loop", default="uvloop", choices=["auto", "asyncio", "uvloop"])
+    parser.add_argument("--http", default="httptools", choices=["auto", "h11", "httptools"])
+    parser.add_argument("--drain-seconds", type=float, default=float(os.environ.get('DRAIN_SECONDS', '5')))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get('GRACEFUL_TIMEOUT', '30')))
+    parser.add_argument("--keep-alive", type=int, default=int(os.environ.get('KEEP_ALIVE_TIMEOUT', '5')))
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    parser.add_argument("--env-file", default=str(env_file) if env_file.exists() else None)
+    run(parser.parse_args())
@@ -0,0 +1,32 @@
+import os
+import time
+from typing import Optional
+
+# Per-process serving state, read by the health endpoints in server.py and
+# flipped by launcher.py when a worker starts draining.
+
+class Lifecycle:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None and not self.draining
+
+    def mark_ready(self):
+        self.ready_at = time.monotonic()
+
+    def start_draining(self):
+        self.draining = True
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "ready": self.ready,
+            "draining": self.draining,
+            "startup_seconds": self.ready_at - self.started_at if self.ready_at is not None else None,
+        }
+
+lifecycle = Lifecycle()
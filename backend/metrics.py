@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Request-level instrumentation rendered in the Prometheus text format.
+# A RequestStats object is bound to a contextvar for each HTTP request;
+# Motor runs driver calls in executor threads with a copy of the caller's
+# context, so the Mongo command listener can attribute every round trip to
+# the request that issued it.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# ==================== METRIC TYPES ====================
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in self._values.items()]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            # per-bucket counts, then sum and count
+            entry = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {count}")
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {entry[-1]}')
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(entry[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {entry[-1]}")
+        return lines
+
+    def totals(self) -> Tuple[int, float]:
+        # count and sum across every label set
+        with self._lock:
+            return sum(e[-1] for e in self._values.values()), sum(e[-2] for e in self._values.values())
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+# ==================== REGISTRY ====================
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency by route")
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+REQUEST_MONGO_COMMANDS = Histogram(
+    "http_request_mongo_commands", "Mongo round trips per HTTP request by route", COUNT_BUCKETS
+)
+REQUEST_MONGO_SECONDS = Histogram("http_request_mongo_seconds", "Time spent in Mongo commands per HTTP request by route")
+MONGO_COMMAND_DURATION = Histogram("mongo_command_duration_seconds", "Mongo command latency by command")
+MONGO_COMMAND_FAILURES = Counter("mongo_command_failures_total", "Failed Mongo commands by command")
+PASSWORD_HASH_DURATION = Histogram("password_hash_duration_seconds", "bcrypt hash/verify time including pool queueing")
+SERIALIZATION_DURATION = Histogram("response_serialization_duration_seconds", "Response model validation and encoding by route")
+PLANNER_DURATION = Histogram("planner_solve_duration_seconds", "Itinerary planner solve time")
+
+REGISTRY: List[Metric] = [
+    REQUEST_DURATION, REQUESTS_IN_FLIGHT, REQUEST_MONGO_COMMANDS, REQUEST_MONGO_SECONDS,
+    MONGO_COMMAND_DURATION, MONGO_COMMAND_FAILURES, PASSWORD_HASH_DURATION, SERIALIZATION_DURATION,
+    PLANNER_DURATION,
+]
+
+def render(extra: Sequence[Metric] = ()) -> str:
+    lines = []
+    for metric in list(REGISTRY) + list(extra):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# ==================== PER-REQUEST STATS ====================
+
+MAX_LOGGED_COMMANDS = 100
+
+class RequestStats:
+    __slots__ = ("scope", "mongo_commands", "mongo_seconds", "commands", "keep_commands")
+
+    def __init__(self, scope: dict, keep_commands: bool):
+        self.scope = scope
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.commands: List[Tuple[str, str, float]] = []
+        self.keep_commands = keep_commands
+
+    @property
+    def route(self) -> str:
+        # FastAPI puts the matched route into the scope during routing
+        return getattr(self.scope.get("route"), "path", "unmatched")
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        # request_id -> (request stats, target collection) between start and finish
+        self._pending: Dict[int, Tuple[Optional[RequestStats], str]] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        self._pending[event.request_id] = (_current.get(), target if isinstance(target, str) else "")
+
+    def _finish(self, event, failed: bool):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_DURATION.observe(seconds, command=event.command_name)
+        if failed:
+            MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+        stats, target = self._pending.pop(event.request_id, (None, ""))
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_seconds += seconds
+            if stats.keep_commands and len(stats.commands) < MAX_LOGGED_COMMANDS:
+                stats.commands.append((event.command_name, target, seconds))
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+command_listener = MongoCommandListener()
+
+# ==================== MIDDLEWARE ====================
+
+class MetricsMiddleware:
+    # Plain ASGI middleware so the request runs in this task's context and
+    # streaming responses are timed until their last chunk.
+    def __init__(self, app, slow_request_seconds: float = 0.0):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope, keep_commands=self.slow_request_seconds > 0)
+        token = _current.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc(1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.inc(-1)
+            _current.reset(token)
+            labels = {"method": scope["method"], "route": stats.route}
+            REQUEST_DURATION.observe(elapsed, status=status["code"], **labels)
+            REQUEST_MONGO_COMMANDS.observe(stats.mongo_commands, **labels)
+            REQUEST_MONGO_SECONDS.observe(stats.mongo_seconds, **labels)
+            if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+                commands = ", ".join(f"{name} {target} {duration * 1000:.1f}ms" for name, target, duration in stats.commands)
+                logger.warning(
+                    f"Slow request {scope['method']} {scope['path']} ({stats.route}) {elapsed * 1000:.1f}ms "
+                    f"status={status['code']} mongo={stats.mongo_commands} cmds/{stats.mongo_seconds * 1000:.1f}ms: {commands}"
+                )
+
+# ==================== SERIALIZATION ====================
+
+def instrument_serialization():
+    # FastAPI validates and encodes response models in
+    # fastapi.routing.serialize_response, looked up at call time
+    import fastapi.routing as routing
+
+    original = routing.serialize_response
+    if getattr(original, "instrumented", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            stats = _current.get()
+            SERIALIZATION_DURATION.observe(time.perf_counter() - start, route=stats.route if stats else "unmatched")
+
+    serialize_response.instrumented = True
+    routing.serialize_response = serialize_response
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+
+# One-off data migrations. Those run from start_worker record themselves
+# in the migrations collection ({_id: name, applied_at, ...}) so later
+# starts skip them instead of rescanning every collection.
+
+async def is_applied(db, name: str) -> bool:
+    return await db.migrations.find_one({"_id": name}, {"_id": 1}) is not None
+
+async def mark_applied(db, name: str, details: dict):
+    await db.migrations.update_one(
+        {"_id": name},
+        {"$set": {"applied_at": datetime.now(timezone.utc), **details}},
+        upsert=True
+    )
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import UpdateMany
+
+# Copies each trip's user_id onto its stops, trip activities and expenses so
+# ownership can be checked on the child row itself. Only rows without a
+# user_id are touched, so the migration can be re-run safely while the app
+# keeps writing.
+# Usage: python -m migrations.backfill_child_user_id [--batch 500] [--dry-run]
+
+CHILD_COLLECTIONS = ("stops", "trip_activities", "expenses")
+
+async def count_missing(db) -> dict:
+    return {name: await db[name].count_documents({"user_id": {"$exists": False}}) for name in CHILD_COLLECTIONS}
+
+async def backfill(db, batch_size: int = 500) -> dict:
+    updated = {name: 0 for name in CHILD_COLLECTIONS}
+    batch = []
+
+    async def flush():
+        # One bulk_write per collection for the whole batch of trips
+        for name in CHILD_COLLECTIONS:
+            result = await db[name].bulk_write([
+                UpdateMany({"trip_id": trip['id'], "user_id": {"$exists": False}}, {"$set": {"user_id": trip['user_id']}})
+                for trip in batch
+            ], ordered=False)
+            updated[name] += result.modified_count
+        batch.clear()
+
+    async for trip in db.trips.find({}, {"_id": 0, "id": 1, "user_id": 1}):
+        batch.append(trip)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return updated
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    before = await count_missing(db)
+    print("Missing user_id: " + ", ".join(f"{name}={count}" for name, count in before.items()))
+    if not args.dry_run:
+        updated = await backfill(db, args.batch)
+        print("Updated: " + ", ".join(f"{name}={count}" for name, count in updated.items()))
+        # Whatever is left belongs to trips that no longer exist (see cascade.py)
+        after = await count_missing(db)
+        print("Still missing (orphans): " + ", ".join(f"{name}={count}" for name, count in after.items()))
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Backfill user_id on stops, trip activities and expenses")
+    parser.add_argument("--batch", type=int, default=500, help="trips per bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="only count rows missing user_id")
+    asyncio.run(main(parser.parse_args()))
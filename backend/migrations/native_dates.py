@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from migrations import is_applied, mark_applied
+
+logger = logging.getLogger(__name__)
+
+# Converts created_at from ISO strings to BSON dates. The API now writes
+# dates, and strings and dates don't interleave in one sort, so keyset
+# pages over created_at are only correct once every row has been
+# converted. Only string values are touched, so the migration can be
+# re-run safely while the app keeps writing. Rows whose string doesn't
+# parse are logged and left as they are. start_worker runs it once per
+# database through convert_once(); the CLI always runs it.
+# Usage: python -m migrations.native_dates [--batch 1000] [--dry-run]
+
+NAME = "native_dates"
+COLLECTIONS = ("users", "trips", "stops", "trip_activities", "expenses", "posts")
+STRING_DATES = {"created_at": {"$type": "string"}}
+
+async def count_strings(db) -> dict:
+    return {name: await db[name].count_documents(STRING_DATES) for name in COLLECTIONS}
+
+async def convert(db, batch_size: int = 1000) -> dict:
+    converted = {name: 0 for name in COLLECTIONS}
+    skipped = {name: 0 for name in COLLECTIONS}
+    for name in COLLECTIONS:
+        batch = []
+        async for doc in db[name].find(STRING_DATES, {"_id": 1, "created_at": 1}):
+            try:
+                created_at = datetime.fromisoformat(doc['created_at'])
+            except ValueError:
+                logger.warning(f"{name} {doc['_id']}: created_at {doc['created_at']!r} is not an ISO date, left as is")
+                skipped[name] += 1
+                continue
+            # Matches the string too, in case the row changed since it was read
+            batch.append(UpdateOne(
+                {"_id": doc['_id'], "created_at": doc['created_at']},
+                {"$set": {"created_at": created_at}}
+            ))
+            if len(batch) >= batch_size:
+                converted[name] += (await db[name].bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            converted[name] += (await db[name].bulk_write(batch, ordered=False)).modified_count
+    return {"converted": converted, "skipped": skipped}
+
+async def convert_once(db) -> Optional[dict]:
+    # None when an earlier start already ran it
+    if await is_applied(db, NAME):
+        return None
+    result = await convert(db)
+    await mark_applied(db, NAME, result)
+    return result
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    before = await count_strings(db)
+    print("String created_at: " + ", ".join(f"{name}={count}" for name, count in before.items()))
+    if not args.dry_run:
+        result = await convert(db, args.batch)
+        await mark_applied(db, NAME, result)
+        print("Converted: " + ", ".join(f"{name}={count}" for name, count in result["converted"].items()))
+        if any(result["skipped"].values()):
+            print("Skipped (unparseable): " + ", ".join(f"{name}={count}" for name, count in result["skipped"].items() if count))
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+    parser = argparse.ArgumentParser(description="Store created_at as BSON dates")
+    parser.add_argument("--batch", type=int, default=1000, help="updates per bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="only count rows with string dates")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import orjson
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+Sort = List[Tuple[str, int]]
+
+class InvalidCursor(ValueError):
+    pass
+
+# ==================== CURSORS ====================
+
+# Cursors are the sort-key values of the last document on a page, JSON
+# encoded and base64url wrapped. Datetimes are tagged so they round-trip.
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def encode_cursor(values: List[Any]) -> str:
+    tagged = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(tagged, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: Sort) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise InvalidCursor("Cursor does not match this listing")
+    return [
+        datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) and "$dt" in v else v
+        for v in values
+    ]
+
+def keyset_filter(sort: Sort, values: List[Any]) -> dict:
+    # (a > x) or (a == x and b > y) or ..., flipped for descending keys
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+# ==================== QUERIES ====================
+
+def _apply_cursor(query: dict, sort: Sort, cursor: Optional[str]) -> dict:
+    if not cursor:
+        return query
+    return {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+
+async def fetch_page(collection, query: dict, sort: Sort, limit: int, cursor: Optional[str] = None,
+                     projection: Optional[dict] = None):
+    # Reads one extra document to know whether another page exists. A
+    # projection must keep the sort fields, they make up the next cursor.
+    query = _apply_cursor(query, sort, cursor)
+    docs = await collection.find(query, projection or {"_id": 0}).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+    return docs, next_cursor
+
+def stream_ndjson(collection, query: dict, sort: Sort, cursor: Optional[str] = None) -> AsyncIterator[bytes]:
+    # The cursor is decoded up front so a bad token fails before the
+    # response starts rather than halfway through the stream.
+    return _stream(collection, _apply_cursor(query, sort, cursor), sort)
+
+async def _stream(collection, query: dict, sort: Sort) -> AsyncIterator[bytes]:
+    # One line per document as the Motor cursor yields batches, so memory
+    # stays flat however many rows match.
+    async for doc in collection.find(query, {"_id": 0}).sort(sort).batch_size(STREAM_BATCH_SIZE):
+        yield orjson.dumps(doc, default=_json_default, option=orjson.OPT_APPEND_NEWLINE)
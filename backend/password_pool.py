@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from passlib.context import CryptContext
+
+# Built on first use (in each pool process), not at import time
+@lru_cache(maxsize=None)
+def pwd_context() -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Module-level so they can be shipped to a process pool
+def _hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context().verify(plain_password, hashed_password)
+
+def _load_backend() -> str:
+    return pwd_context().handler().get_backend()
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+class PasswordHasher:
+    # Runs bcrypt off the event loop on a bounded pool. Once max_pending
+    # calls are queued or running, new calls are rejected immediately
+    # instead of letting login latency pile up for everyone.
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 8
+        self._executor: Optional[Executor] = None
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        elif kind == "process":
+            # Spawned, not forked: the API process already runs driver threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        elif kind != "inline":
+            raise ValueError(f"Unknown password pool kind: {kind}")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def warm_up(self):
+        # Starts the pool's threads/processes and loads the bcrypt backend
+        # so the first logins don't pay for it
+        if self._executor is None:
+            _load_backend()
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _load_backend) for _ in range(self.workers)))
+
+    async def _submit(self, fn, *args):
+        # "inline" keeps the old blocking behaviour, mainly for benchmarks
+        if self._executor is None:
+            self.completed += 1
+            return fn(*args)
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
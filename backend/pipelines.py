@@ -0,0 +1,67 @@
+from typing import List, Optional
+
+from pagination import MAX_PAGE_SIZE
+
+EXPENSE_CATEGORIES = ["transport", "accommodation", "food", "activities", "other"]
+
+# ==================== TRIP DETAIL ====================
+
+# Each child array is capped at one page (DETAIL_CHILD_LIMIT, plus one row
+# to tell whether more exist) so a large trip can't push the result past
+# the 16MB document limit; the rest comes from the paginated endpoints in
+# the same order. The budget comes from the trip's rollup document.
+DETAIL_CHILD_LIMIT = MAX_PAGE_SIZE
+
+def _capped(sort: dict) -> List[dict]:
+    return [{"$sort": sort}, {"$limit": DETAIL_CHILD_LIMIT + 1}, {"$project": {"_id": 0, "user_id": 0}}]
+
+def trip_detail_pipeline(trip_id: str, user_id: str) -> List[dict]:
+    # Ownership check, children and budget rollup in a single round trip.
+    # The localField + pipeline form of $lookup needs MongoDB 5.0+ and uses
+    # the trip_id indexes on the child collections.
+    return [
+        {"$match": {"id": trip_id, "user_id": user_id}},
+        {"$limit": 1},
+        {"$project": {"_id": 0}},
+        {"$lookup": {
+            "from": "stops", "localField": "id", "foreignField": "trip_id", "as": "stops",
+            "pipeline": _capped({"order": 1, "id": 1}),
+        }},
+        {"$lookup": {
+            "from": "trip_activities", "localField": "id", "foreignField": "trip_id", "as": "activities",
+            "pipeline": _capped({"created_at": 1, "id": 1}),
+        }},
+        {"$lookup": {
+            "from": "expenses", "localField": "id", "foreignField": "trip_id", "as": "expenses",
+            "pipeline": _capped({"created_at": 1, "id": 1}),
+        }},
+        {"$lookup": {
+            "from": "trip_budget_rollups", "localField": "id", "foreignField": "trip_id", "as": "rollup",
+            # Placeholders of a rebuild in progress don't count (rollups.SETTLED)
+            "pipeline": [{"$match": {"building": {"$exists": False}}}, {"$project": {"_id": 0}}],
+        }},
+    ]
+
+# ==================== BUDGET ====================
+
+def budget_pipeline(trip_id: str, group_by: Optional[str] = None) -> List[dict]:
+    # Runs on expenses and folds trip_activities in with $unionWith (4.4+),
+    # so only per-group totals and counts leave the server. Activities are
+    # bucketed by stop_id in "stop" mode; expenses have no stop and are
+    # always bucketed by date.
+    activity_bucket = {"day": "$date", "stop": "$stop_id"}.get(group_by, {"$literal": None})
+    expense_bucket = "$date" if group_by else {"$literal": None}
+
+    return [
+        {"$match": {"trip_id": trip_id}},
+        {"$project": {"_id": 0, "source": {"$literal": "expense"}, "category": 1, "amount": 1, "bucket": expense_bucket}},
+        {"$unionWith": {"coll": "trip_activities", "pipeline": [
+            {"$match": {"trip_id": trip_id}},
+            {"$project": {"_id": 0, "source": {"$literal": "activity"}, "category": {"$literal": "activities"}, "amount": "$cost", "bucket": activity_bucket}},
+        ]}},
+        {"$group": {
+            "_id": {"source": "$source", "category": "$category", "bucket": "$bucket"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+    ]
@@ -0,0 +1,307 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Budget-constrained itinerary planning over the activity-template catalog.
+#
+# Each template scores weight[category] * duration: hours spent on things the
+# traveller likes. A plan picks templates for every day of every stop so that
+# the day's hours fit hours_per_day, the total cost fits the budget, no
+# template is used twice (also across stops in the same city) and the total score is as high as possible.
+#
+# The budget is the only constraint coupling cities, so it is relaxed with a
+# Lagrange multiplier: for a given price per unit cost (lam) every template is
+# worth score - lam * cost and each day is a small grouped knapsack over
+# durations. lam is bisected to the cheapest plan that fits the budget, and
+# leftover budget and hours are then filled greedily.
+#
+# Within a (category, duration) class templates only differ by cost, so only
+# the cheapest days * (hours_per_day // duration) of each class can ever be
+# used. PlannerIndex keeps templates per city sorted by (duration, category,
+# cost), which makes every class a contiguous slice of presorted arrays.
+
+MAX_HOURS_PER_DAY = 24
+# Bisection stops once lam is known to within this fraction of its range
+LAMBDA_TOLERANCE = 1e-3
+
+class CityTemplates:
+    def __init__(self, templates: List[dict]):
+        templates = sorted(templates, key=lambda t: (int(t['duration']), t['category'], float(t['estimated_cost']), t['id']))
+        self.templates = templates
+        self.durations = np.array([int(t['duration']) for t in templates], dtype=np.int64)
+        self.costs = np.array([float(t['estimated_cost']) for t in templates], dtype=np.float64)
+        # Start and end offsets of every (duration, category) class
+        self.classes: Dict[Tuple[int, str], Tuple[int, int]] = {}
+        for i, template in enumerate(templates):
+            key = (int(template['duration']), template['category'])
+            start, _ = self.classes.get(key, (i, i))
+            self.classes[key] = (start, i + 1)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+class PlannerIndex:
+    # Array-backed copy of the templates, rebuilt with the catalog cache
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._cities: Dict[str, CityTemplates] = {}
+
+    def build(self, templates: Iterable[dict], version: Optional[int] = None):
+        by_city: Dict[str, List[dict]] = {}
+        for template in templates:
+            by_city.setdefault(template['city_id'], []).append(template)
+        self._cities = {city_id: CityTemplates(items) for city_id, items in by_city.items()}
+        self.version = version
+
+    def city(self, city_id: str) -> Optional[CityTemplates]:
+        return self._cities.get(city_id)
+
+    def __len__(self) -> int:
+        return sum(len(city) for city in self._cities.values())
+
+# ==================== DAYS ====================
+
+def trip_days(stops: Sequence[dict]) -> List[Tuple[str, dict]]:
+    # Every date of the itinerary once, attributed like expenses are in
+    # budget.py: to the first stop (in order) whose span contains it
+    days, seen = [], set()
+    for stop in sorted(stops, key=lambda s: s['order']):
+        day = date.fromisoformat(stop['start_date'][:10])
+        end = date.fromisoformat(stop['end_date'][:10])
+        while day <= end:
+            key = day.isoformat()
+            if key not in seen:
+                seen.add(key)
+                days.append((key, stop))
+            day += timedelta(days=1)
+    return sorted(days, key=lambda d: d[0])
+
+# ==================== SOLVER ====================
+
+class _Candidates:
+    # Templates of one city that can appear in a plan, with their scores
+    def __init__(self, city: CityTemplates, day_count: int, weights: Dict[str, float], hours_per_day: int):
+        # No preferences: every category counts the same
+        default = 0.0 if weights else 1.0
+        slices, slice_weights = [], []
+        for (duration, category), (start, end) in city.classes.items():
+            weight = weights.get(category, default)
+            if weight <= 0 or duration < 1 or duration > hours_per_day:
+                continue
+            slices.append(np.arange(start, min(end, start + day_count * (hours_per_day // duration))))
+            slice_weights.append(np.full(len(slices[-1]), weight))
+        self.index = np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+        self.durations = city.durations[self.index]
+        self.costs = city.costs[self.index]
+        self.scores = (np.concatenate(slice_weights) if slices else np.zeros(0)) * self.durations
+
+def _plan_days(candidates: _Candidates, day_count: int, hours_per_day: int, lam: float) -> List[List[int]]:
+    # Days of one city in turn, each the best grouped knapsack over what the
+    # previous days left. Returns candidate positions per day.
+    reduced = candidates.scores - lam * candidates.costs
+    worth = np.flatnonzero(reduced > 0)
+    # Best first within each duration
+    worth = worth[np.lexsort((-reduced[worth], candidates.durations[worth]))]
+    durations = candidates.durations[worth]
+    bounds = np.flatnonzero(np.diff(durations)) + 1
+    queues, prefix = {}, {}
+    for positions in np.split(worth, bounds) if len(worth) else []:
+        t = int(candidates.durations[positions[0]])
+        queues[t] = positions.tolist()
+        prefix[t] = [0.0] + np.cumsum(reduced[positions]).tolist()
+    taken = {t: 0 for t in queues}
+
+    plan = []
+    for _ in range(day_count):
+        # best[h]: value with at most h hours used; choices[k][h]: how many
+        # templates of the k-th duration are taken at h
+        best = [0.0] * (hours_per_day + 1)
+        choices = []
+        for t, queue in queues.items():
+            offset = taken[t]
+            limit = min(hours_per_day // t, len(queue) - offset)
+            sums = prefix[t]
+            gains = [sums[offset + n] - sums[offset] for n in range(1, limit + 1)]
+            new_best, choice = best[:], [0] * (hours_per_day + 1)
+            for h in range(t, hours_per_day + 1):
+                value, count = new_best[h], 0
+                for n in range(1, min(h // t, limit) + 1):
+                    candidate = best[h - n * t] + gains[n - 1]
+                    if candidate > value:
+                        value, count = candidate, n
+                new_best[h], choice[h] = value, count
+            best = new_best
+            choices.append((t, choice))
+
+        picked, h = [], hours_per_day
+        for t, choice in reversed(choices):
+            n = choice[h]
+            if n:
+                picked += queues[t][taken[t]:taken[t] + n]
+                taken[t] += n
+                h -= n * t
+        plan.append(picked)
+    return plan
+
+def _totals(cities: List[Tuple[_Candidates, List[List[int]]]]) -> Tuple[float, float]:
+    score = cost = 0.0
+    for candidates, days in cities:
+        for picked in days:
+            score += float(candidates.scores[picked].sum()) if picked else 0.0
+            cost += float(candidates.costs[picked].sum()) if picked else 0.0
+    return score, cost
+
+def _repair(cities: List[Tuple[_Candidates, List[List[int]]]], overspend: float):
+    # Makes an over-budget plan fit by dropping templates: the lowest score
+    # whose cost alone covers the overspend, otherwise the worst score per
+    # unit cost, until it fits
+    while overspend > 1e-9:
+        picks = [
+            (float(c.scores[i]), float(c.costs[i]), picked, i)
+            for c, days in cities for picked in days for i in picked if c.costs[i] > 0
+        ]
+        covering = [p for p in picks if p[1] >= overspend]
+        score, cost, picked, i = min(covering) if covering else min(picks, key=lambda p: p[0] / p[1])
+        picked.remove(i)
+        overspend -= cost
+
+def _fill(cities: List[Tuple[_Candidates, List[List[int]]]], hours_per_day: int, budget_left: float):
+    # Spends what the relaxation left on the table. First upgrades: swap a
+    # chosen template for a better unused one of the same city that fits
+    # the day and the budget. Then adds the best-scoring unused template
+    # that still fits a day's hours and the remaining budget.
+    for candidates, days in cities:
+        unused = np.ones(len(candidates.index), dtype=bool)
+        for picked in days:
+            unused[picked] = False
+        for picked in days:
+            slack = hours_per_day - int(candidates.durations[picked].sum()) if picked else hours_per_day
+            for k, i in enumerate(picked):
+                fits = (
+                    unused
+                    & (candidates.scores > candidates.scores[i])
+                    & (candidates.durations <= slack + candidates.durations[i])
+                    & (candidates.costs <= budget_left + candidates.costs[i])
+                )
+                if fits.any():
+                    j = int(np.flatnonzero(fits)[np.argmax(candidates.scores[fits])])
+                    picked[k] = j
+                    unused[i], unused[j] = True, False
+                    slack += int(candidates.durations[i] - candidates.durations[j])
+                    budget_left += float(candidates.costs[i] - candidates.costs[j])
+
+        order = np.argsort(-candidates.scores, kind="stable").tolist()
+        for picked in days:
+            hours = hours_per_day - int(candidates.durations[picked].sum()) if picked else hours_per_day
+            for i in order:
+                if hours <= 0:
+                    break
+                if not unused[i] or candidates.durations[i] > hours or candidates.costs[i] > budget_left:
+                    continue
+                picked.append(i)
+                unused[i] = False
+                hours -= int(candidates.durations[i])
+                budget_left -= float(candidates.costs[i])
+
+def solve(
+    city_days: Sequence[Tuple[CityTemplates, int]],
+    budget: float,
+    weights: Dict[str, float],
+    hours_per_day: int
+) -> Tuple[List[List[List[dict]]], float, float]:
+    # city_days: (templates, number of days) per stop. Returns the chosen
+    # templates per stop and day, the total score and the total cost.
+    # Stops in the same city (the same CityTemplates) are planned as one
+    # run of days over one set of candidates, so a template used on one
+    # visit isn't available on another; days are interchangeable, so this
+    # loses nothing.
+    groups: Dict[int, List[int]] = {}
+    for position, (city, _) in enumerate(city_days):
+        groups.setdefault(id(city), []).append(position)
+    grouped = [
+        (city_days[positions[0]][0], sum(city_days[p][1] for p in positions), positions)
+        for positions in groups.values()
+    ]
+    prepared = [_Candidates(city, days, weights, hours_per_day) for city, days, _ in grouped]
+
+    def evaluate(lam: float):
+        plan = [(c, _plan_days(c, days, hours_per_day, lam)) for c, (_, days, _) in zip(prepared, grouped)]
+        return plan, _totals(plan)
+
+    best, (score, cost) = evaluate(0.0)
+    if cost > budget:
+        # Above the best score-per-cost ratio nothing with a cost is worth
+        # taking, so the plan at hi always fits
+        ratios = [float((c.scores[c.costs > 0] / c.costs[c.costs > 0]).max()) for c in prepared if (c.costs > 0).any()]
+        lo, hi = 0.0, max(ratios) + 1.0
+        tolerance = LAMBDA_TOLERANCE * hi
+        best, (score, cost) = evaluate(hi)
+        over, over_cost = None, 0.0
+        # The smallest lam first: it only breaks ties toward cheaper
+        # templates, which is often enough on its own
+        lam = tolerance
+        while hi - lo > tolerance:
+            plan, (plan_score, plan_cost) = evaluate(lam)
+            if plan_cost <= budget:
+                hi = lam
+                if plan_score > score:
+                    best, score, cost = plan, plan_score, plan_cost
+            else:
+                lo, over, over_cost = lam, plan, plan_cost
+            lam = (lo + hi) / 2
+
+        # The best plan that fits, and the closest one that doesn't with
+        # templates dropped until it does; both topped up, the better wins
+        _fill(best, hours_per_day, budget - cost)
+        score, cost = _totals(best)
+        if over is not None:
+            _repair(over, over_cost - budget)
+            _fill(over, hours_per_day, budget - _totals(over)[1])
+            over_score, over_cost = _totals(over)
+            if over_score > score:
+                best, score, cost = over, over_score, over_cost
+
+    # Each group's days go back to its stops in order
+    chosen: List[List[List[dict]]] = [[] for _ in city_days]
+    for (city, _, positions), (candidates, days) in zip(grouped, best):
+        offset = 0
+        for position in positions:
+            count = city_days[position][1]
+            chosen[position] = [
+                sorted((city.templates[int(candidates.index[i])] for i in picked), key=lambda t: (-t['duration'], t['id']))
+                for picked in days[offset:offset + count]
+            ]
+            offset += count
+    return chosen, score, cost
+
+def plan_trip(
+    index: PlannerIndex,
+    stops: Sequence[dict],
+    budget: float,
+    weights: Dict[str, float],
+    hours_per_day: int
+) -> dict:
+    days = trip_days(stops)
+    by_stop: Dict[str, List[str]] = {}
+    for day, stop in days:
+        by_stop.setdefault(stop['id'], []).append(day)
+
+    planned = [stop for stop in sorted(stops, key=lambda s: s['order']) if stop['id'] in by_stop]
+    empty = CityTemplates([])
+    city_days = [(index.city(stop['city_id']) or empty, len(by_stop[stop['id']])) for stop in planned]
+    chosen, score, cost = solve(city_days, budget, weights, hours_per_day)
+
+    schedule = []
+    for stop, stop_days in zip(planned, chosen):
+        for day, templates in zip(by_stop[stop['id']], stop_days):
+            schedule.append({
+                "date": day,
+                "stop_id": stop['id'],
+                "city_id": stop['city_id'],
+                "hours": sum(t['duration'] for t in templates),
+                "cost": sum(t['estimated_cost'] for t in templates),
+                "activities": templates,
+            })
+    schedule.sort(key=lambda d: d['date'])
+    return {"budget": budget, "total_cost": cost, "total_score": score, "days": schedule}
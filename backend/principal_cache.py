@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# ==================== SHARED BACKENDS ====================
+
+class RedisPrincipalBackend:
+    # Shared second-level store so several uvicorn workers see the same
+    # principals. Invalidations are broadcast on a pub/sub channel so every
+    # worker drops its local copy as well.
+    def __init__(self, url: str, ttl: int, prefix: str = "principal:", channel: str = "principal-invalidations"):
+        import redis.asyncio as redis  # optional dependency, only needed when configured
+
+        self._redis = redis.from_url(url)
+        self._ttl = ttl
+        self._prefix = prefix
+        self._channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(self._prefix + key)
+
+    async def set(self, key: str, value: bytes):
+        await self._redis.set(self._prefix + key, value, ex=self._ttl)
+
+    async def invalidate(self, key: str):
+        await self._redis.delete(self._prefix + key)
+        await self._redis.publish(self._channel, key)
+
+    async def subscribe(self, on_invalidate: Callable[[str], None]):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self._channel)
+
+        async def listen():
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    data = message["data"]
+                    on_invalidate(data.decode() if isinstance(data, bytes) else data)
+
+        self._listener = asyncio.create_task(listen())
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+        await self._redis.close()
+
+# ==================== PRINCIPAL CACHE ====================
+
+class PrincipalCache:
+    # In-process TTL + LRU cache of authenticated principals keyed by the
+    # token subject. Values are kept as built objects so a hit skips both the
+    # Mongo lookup and model validation.
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int,
+        backend=None,
+        dumps: Callable[[Any], bytes] = None,
+        loads: Callable[[bytes], Any] = None,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.backend = backend
+        self._dumps = dumps
+        self._loads = loads
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.backend is not None:
+            try:
+                raw = await self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Principal cache backend get failed: {e}")
+                raw = None
+            if raw is not None:
+                value = self._loads(raw)
+                self._store(key, value)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self._store(key, value)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, self._dumps(value))
+            except Exception as e:
+                logger.warning(f"Principal cache backend set failed: {e}")
+
+    async def invalidate(self, key: str):
+        self.discard(key)
+        if self.backend is not None:
+            try:
+                await self.backend.invalidate(key)
+            except Exception as e:
+                logger.warning(f"Principal cache backend invalidate failed: {e}")
+
+    def discard(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.subscribe(self.discard)
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "shared_backend": type(self.backend).__name__ if self.backend is not None else None,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
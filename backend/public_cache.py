@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+# (trip_id, payload) from the loader; None means "not found" and is not cached
+Loaded = Optional[Tuple[str, Any]]
+Entry = Tuple[bytes, str]
+
+def serialize(payload: Any) -> Entry:
+    # Same encoding as the app's ORJSONResponse, done once per cache fill
+    body = orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_NON_STR_KEYS)
+    return body, f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+# ==================== SHARED INVALIDATIONS ====================
+
+class RedisInvalidationChannel:
+    # Broadcasts trip invalidations on a pub/sub channel so every worker
+    # drops its copies, not just the one that handled the edit
+    def __init__(self, url: str, channel: str = "public-trip-invalidations"):
+        import redis.asyncio as redis  # optional dependency, only needed when configured
+
+        self._redis = redis.from_url(url)
+        self._channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, trip_id: str):
+        await self._redis.publish(self._channel, trip_id)
+
+    async def subscribe(self, on_invalidate: Callable[[str], None]):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self._channel)
+
+        async def listen():
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    data = message["data"]
+                    on_invalidate(data.decode() if isinstance(data, bytes) else data)
+
+        self._listener = asyncio.create_task(listen())
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+        await self._redis.close()
+
+# ==================== PUBLIC TRIP CACHE ====================
+
+class PublicTripCache:
+    # Pre-serialized public trip responses keyed by (public_url, page),
+    # invalidated by trip id whenever the owner edits the trip. Concurrent
+    # misses for the same key share one backend fetch.
+    #
+    # Other workers hear about an invalidation through the channel when one
+    # is configured. Without it they would keep serving a page until its
+    # TTL, so a hit is passed to revalidate(key), which checks the page is
+    # still published, at most once per revalidate_interval per key;
+    # unpublished or republished trips stop being served within that
+    # interval, while other edits still wait out the TTL.
+    def __init__(self, ttl: float, max_size: int, channel=None,
+                 revalidate: Optional[Callable[[Hashable], Awaitable[bool]]] = None,
+                 revalidate_interval: float = 1.0):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.channel = channel
+        self.revalidate = revalidate
+        self.revalidate_interval = revalidate_interval
+        # key -> (expires_at, trip_id, value, checked_at)
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Entry, float]]" = OrderedDict()
+        self._keys_by_trip: Dict[str, Set[Hashable]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.revalidations = 0
+        self.revoked = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Loaded]]) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, trip_id, value, checked_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._evict(key)
+            elif await self._still_valid(key, entry, now):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            else:
+                self.revoked += 1
+                self.discard_trip(trip_id)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            loaded = await loader()
+            value = None
+            if loaded is not None:
+                trip_id, payload = loaded
+                value = serialize(payload)
+                # An invalidation that raced with this fetch removed the
+                # in-flight marker; don't cache what may already be stale.
+                if self.enabled and self._inflight.get(key) is future:
+                    self._store(key, trip_id, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures don't log warnings
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _still_valid(self, key: Hashable, entry: tuple, now: float) -> bool:
+        expires_at, trip_id, value, checked_at = entry
+        if self.channel is not None or self.revalidate is None or now - checked_at < self.revalidate_interval:
+            return True
+        # Marked checked before the round trip so concurrent hits on the
+        # same key are served from the entry instead of checking too
+        self._entries[key] = (expires_at, trip_id, value, now)
+        self.revalidations += 1
+        return await self.revalidate(key)
+
+    def _store(self, key: Hashable, trip_id: str, value: Entry):
+        now = time.monotonic()
+        self._entries[key] = (now + self.ttl, trip_id, value, now)
+        self._entries.move_to_end(key)
+        self._keys_by_trip.setdefault(trip_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._evict(oldest)
+
+    def _evict(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_trip.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_trip[entry[1]]
+
+    async def invalidate_trip(self, trip_id: str):
+        self.invalidations += 1
+        self.discard_trip(trip_id)
+        if self.channel is not None:
+            try:
+                await self.channel.publish(trip_id)
+            except Exception as e:
+                logger.warning(f"Public trip invalidation broadcast failed: {e}")
+
+    def discard_trip(self, trip_id: str):
+        for key in list(self._keys_by_trip.pop(trip_id, ())):
+            self._entries.pop(key, None)
+        # A running fetch doesn't know its trip yet, so none of them may be
+        # cached; requests already waiting on them still get the result.
+        for key in [k for k, f in self._inflight.items() if not f.done()]:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_trip.clear()
+
+    async def start(self):
+        if self.channel is not None:
+            await self.channel.subscribe(self.discard_trip)
+
+    async def close(self):
+        if self.channel is not None:
+            await self.channel.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "shared_invalidations": type(self.channel).__name__ if self.channel is not None else None,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "revalidate_seconds": self.revalidate_interval if self.channel is None and self.revalidate else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "revalidations": self.revalidations,
+            "revoked": self.revoked,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+
+# Activity recommendations from trip co-occurrence.
+#
+# The batch job (python recommendations.py build) reads trip_activities and
+# counts, per pair of templates, how many stops and how many trips contain
+# both, and per template how many stops contain it. Within a trip only
+# templates up to TRIP_WINDOW rows apart (in created_at order) are paired,
+# which keeps long trips from contributing quadratically many pairs.
+#
+# Counts are kept as sorted int64 pair keys (lo << 32 | hi) with int32
+# counts. Incremental runs read the rows created since the last watermark,
+# recount the trips they belong to with and without them and add the
+# difference; deletions are only picked up by a --full rebuild.
+#
+# The job stores the counts and a serving index in GridFS and bumps
+# recommendation_meta.version. Workers reload when the version changes and
+# answer from memory: the index is CSR (indptr, neighbours, weights) with
+# the MAX_NEIGHBOURS strongest neighbours per template, weight being
+# (stops + TRIP_WEIGHT * trips) / sqrt(popularity_a * popularity_b).
+
+STOP_WINDOW = 50
+TRIP_WINDOW = 10
+TRIP_WEIGHT = 0.25
+MAX_NEIGHBOURS = 100
+# Added to every candidate's score, scaled by its log popularity: orders
+# templates nobody has combined yet and breaks ties
+POPULARITY_WEIGHT = 0.01
+# Rows younger than this are left for the next run, so inserts that commit
+# out of created_at order aren't skipped by the watermark
+SETTLE = timedelta(seconds=30)
+READ_BATCH_SIZE = 10000
+COUNT_CHUNK_ROWS = 1000000
+TRIPS_PER_QUERY = 1000
+MODEL_BUCKET = "recommendation_models"
+
+# ==================== ROWS ====================
+
+class TemplateCodes:
+    # Dense int codes for template ids, in first-seen order
+    def __init__(self, ids: Sequence[str] = ()):
+        self.ids: List[str] = list(ids)
+        self._codes: Dict[str, int] = {template_id: code for code, template_id in enumerate(self.ids)}
+
+    def code(self, template_id: str) -> int:
+        code = self._codes.get(template_id)
+        if code is None:
+            code = self._codes[template_id] = len(self.ids)
+            self.ids.append(template_id)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class Rows:
+    # Columnar trip_activities: rows of a trip are contiguous, in created_at
+    # order; stop codes are unique across trips. is_new marks rows created
+    # after the previous watermark.
+    def __init__(self, trip: np.ndarray, stop: np.ndarray, template: np.ndarray, is_new: Optional[np.ndarray] = None):
+        self.trip = trip
+        self.stop = stop
+        self.template = template
+        self.is_new = is_new if is_new is not None else np.ones(len(trip), dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.trip)
+
+    def subset(self, mask: np.ndarray) -> "Rows":
+        return Rows(self.trip[mask], self.stop[mask], self.template[mask], self.is_new[mask])
+
+async def read_rows(collection, query: dict, codes: TemplateCodes, since: Optional[datetime] = None) -> Rows:
+    # Walks the (trip_id, created_at, id) index so trips come out contiguous
+    trip, stop, template, is_new = [], [], [], []
+    last_trip, trip_code, stop_codes, next_stop = None, -1, {}, 0
+    projection = {"_id": 0, "trip_id": 1, "stop_id": 1, "activity_template_id": 1, "created_at": 1}
+    cursor = collection.find(query, projection).sort([("trip_id", 1), ("created_at", 1), ("id", 1)])
+    async for row in cursor.batch_size(READ_BATCH_SIZE):
+        if row['trip_id'] != last_trip:
+            last_trip, trip_code = row['trip_id'], trip_code + 1
+            stop_codes = {}
+        if row['stop_id'] not in stop_codes:
+            stop_codes[row['stop_id']] = next_stop
+            next_stop += 1
+        trip.append(trip_code)
+        stop.append(stop_codes[row['stop_id']])
+        template.append(codes.code(row['activity_template_id']))
+        is_new.append(since is None or row['created_at'] > since)
+    return Rows(
+        np.array(trip, dtype=np.int64), np.array(stop, dtype=np.int64),
+        np.array(template, dtype=np.int64), np.array(is_new, dtype=bool)
+    )
+
+# ==================== COUNTS ====================
+
+def group_pairs(group: np.ndarray, template: np.ndarray, window: int) -> np.ndarray:
+    # Pair keys of distinct templates at most `window` rows apart within a
+    # group. Rows of a group must be contiguous; repeats of a template in a
+    # group count once.
+    _, first = np.unique((group << 32) | template, return_index=True)
+    first.sort()
+    group, template = group[first], template[first]
+    keys = []
+    for distance in range(1, window + 1):
+        same = group[distance:] == group[:-distance]
+        if not same.any():
+            break
+        a, b = template[:-distance][same], template[distance:][same]
+        keys.append((np.minimum(a, b) << 32) | np.maximum(a, b))
+    return np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+
+def count_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    unique, counts = np.unique(keys, return_counts=True)
+    return unique, counts.astype(np.int32)
+
+def merge_counts(keys: np.ndarray, counts: np.ndarray, other_keys: np.ndarray, other_counts: np.ndarray,
+                 sign: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    # Sum of two sorted count arrays (or difference, sign=-1), zeros
+    # dropped. Linear in the larger one, so a small delta merges cheaply.
+    positions = np.searchsorted(keys, other_keys)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == other_keys[found]
+    counts = counts.astype(np.int64)
+    counts[positions[found]] += sign * other_counts[found].astype(np.int64)
+    missing = ~found
+    keys = np.insert(keys, positions[missing], other_keys[missing])
+    counts = np.insert(counts, positions[missing], sign * other_counts[missing].astype(np.int64))
+    keep = counts != 0
+    return keys[keep], counts[keep].astype(np.int32)
+
+class PairCounts:
+    def __init__(self, size: int = 0):
+        self.popularity = np.zeros(size, dtype=np.int32)
+        self.stop_keys = np.zeros(0, dtype=np.int64)
+        self.stop_counts = np.zeros(0, dtype=np.int32)
+        self.trip_keys = np.zeros(0, dtype=np.int64)
+        self.trip_counts = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_rows(cls, rows: Rows, size: int) -> "PairCounts":
+        # Counted COUNT_CHUNK_ROWS at a time, split on trip boundaries (stops
+        # never span trips), which bounds the pair arrays held at once
+        if len(rows) <= COUNT_CHUNK_ROWS:
+            return cls._count(rows, size)
+        counts = cls(size)
+        bounds = np.searchsorted(rows.trip, rows.trip[COUNT_CHUNK_ROWS::COUNT_CHUNK_ROWS])
+        edges = [0, *np.unique(bounds).tolist(), len(rows)]
+        for start, end in zip(edges, edges[1:]):
+            if end > start:
+                counts.add(cls._count(rows.subset(slice(start, end)), size))
+        return counts
+
+    @classmethod
+    def _count(cls, rows: Rows, size: int) -> "PairCounts":
+        counts = cls(size)
+        if not len(rows):
+            return counts
+        # Stops that contain each template
+        unique = np.unique((rows.stop << 32) | rows.template)
+        counts.popularity = np.bincount(unique & 0xFFFFFFFF, minlength=size).astype(np.int32)
+        order = np.argsort(rows.stop, kind="stable")
+        counts.stop_keys, counts.stop_counts = count_keys(group_pairs(rows.stop[order], rows.template[order], STOP_WINDOW))
+        counts.trip_keys, counts.trip_counts = count_keys(group_pairs(rows.trip, rows.template, TRIP_WINDOW))
+        return counts
+
+    def resize(self, size: int):
+        if size > len(self.popularity):
+            self.popularity = np.concatenate([self.popularity, np.zeros(size - len(self.popularity), dtype=np.int32)])
+
+    def add(self, other: "PairCounts", sign: int = 1):
+        self.resize(len(other.popularity))
+        self.popularity[:len(other.popularity)] += sign * other.popularity
+        self.stop_keys, self.stop_counts = merge_counts(self.stop_keys, self.stop_counts, other.stop_keys, other.stop_counts, sign)
+        self.trip_keys, self.trip_counts = merge_counts(self.trip_keys, self.trip_counts, other.trip_keys, other.trip_counts, sign)
+
+    def apply(self, rows: Rows, size: int):
+        # Adds the new rows of the trips in `rows`: their counts with the new
+        # rows minus their counts without them, merged in as one delta
+        delta = PairCounts.from_rows(rows, size)
+        delta.add(PairCounts.from_rows(rows.subset(~rows.is_new), size), sign=-1)
+        self.add(delta)
+
+# ==================== SERVING INDEX ====================
+
+def build_index(counts: PairCounts, max_neighbours: int = MAX_NEIGHBOURS) -> Dict[str, np.ndarray]:
+    size = len(counts.popularity)
+    # Stop and trip pairs are two sorted runs; a stable sort merges them
+    keys = np.concatenate([counts.stop_keys, counts.trip_keys])
+    strength = np.concatenate([counts.stop_counts.astype(np.float64), TRIP_WEIGHT * counts.trip_counts])
+    order = np.argsort(keys, kind="stable")
+    keys, strength = keys[order], strength[order]
+    first = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if len(keys) else np.zeros(0, dtype=np.int64)
+    keys, strength = keys[first], np.add.reduceat(strength, first) if len(first) else strength
+    a, b = keys >> 32, keys & 0xFFFFFFFF
+    popularity = np.maximum(counts.popularity, 1).astype(np.float64)
+    weights = (strength / np.sqrt(popularity[a] * popularity[b])).astype(np.float32)
+
+    # Both directions, strongest first within each template: positive
+    # float32 bit patterns sort like the floats, so (row, -weight) is one
+    # int64 key
+    rows = np.concatenate([a, b])
+    neighbours = np.concatenate([b, a]).astype(np.int32)
+    weights = np.concatenate([weights, weights])
+    order = np.argsort((rows << 32) | (0xFFFFFFFF - weights.view(np.uint32).astype(np.int64)))
+    rows, neighbours, weights = rows[order], neighbours[order], weights[order]
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    keep = np.arange(len(rows)) - indptr[rows] < max_neighbours
+    rows, neighbours, weights = rows[keep], neighbours[keep], weights[keep]
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "neighbours": neighbours,
+        "weights": weights,
+        "prior": (np.log1p(counts.popularity) / max(np.log1p(counts.popularity.max(initial=0)), 1.0)).astype(np.float32),
+    }
+
+class RecommendationIndex:
+    # In-memory copy of the latest model, one per worker
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._codes: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.neighbours = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.prior = np.zeros(0, dtype=np.float32)
+
+    def build(self, template_ids: Sequence[str], arrays: Dict[str, np.ndarray], version: Optional[int] = None):
+        self._codes = {template_id: code for code, template_id in enumerate(template_ids)}
+        self.indptr = arrays['indptr']
+        self.neighbours = arrays['neighbours']
+        self.weights = arrays['weights']
+        self.prior = arrays['prior']
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.neighbours.nbytes + self.weights.nbytes + self.prior.nbytes
+
+    def stats(self) -> dict:
+        return {"version": self.version, "templates": len(self), "neighbours": len(self.neighbours), "bytes": self.nbytes()}
+
+    def recommend(self, seed_ids: Sequence[str], candidates: Sequence[dict], limit: int) -> List[Tuple[dict, float]]:
+        # Candidates (a city's templates) ranked by how strongly they go with
+        # the seeds (what the stop already has); seeds are never returned
+        get = self._codes.get
+        codes = np.array([get(template['id'], -1) for template in candidates], dtype=np.int64)
+        known = codes >= 0
+        scores = np.zeros(len(codes))
+        scores[known] = POPULARITY_WEIGHT * self.prior[codes[known]]
+
+        seeds = [code for code in (get(seed_id) for seed_id in set(seed_ids)) if code is not None]
+        if seeds and len(candidates):
+            neighbours = np.concatenate([self.neighbours[self.indptr[s]:self.indptr[s + 1]] for s in seeds])
+            weights = np.concatenate([self.weights[self.indptr[s]:self.indptr[s + 1]] for s in seeds])
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            positions = np.minimum(np.searchsorted(sorted_codes, neighbours), len(codes) - 1)
+            found = sorted_codes[positions] == neighbours
+            np.add.at(scores, order[positions[found]], weights[found])
+
+        excluded = set(seed_ids)
+        ranked = []
+        for i in np.argsort(-scores, kind="stable"):
+            if candidates[i]['id'] not in excluded:
+                ranked.append((candidates[i], float(scores[i])))
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+# ==================== STORAGE ====================
+
+def _dump(arrays: Dict[str, np.ndarray]) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+async def save_model(db, codes: TemplateCodes, counts: PairCounts, watermark: datetime, rows: int) -> int:
+    index = build_index(counts)
+    data = _dump({
+        "template_ids": np.array(codes.ids, dtype=str),
+        "popularity": counts.popularity,
+        "stop_keys": counts.stop_keys, "stop_counts": counts.stop_counts,
+        "trip_keys": counts.trip_keys, "trip_counts": counts.trip_counts,
+        **index,
+    })
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=MODEL_BUCKET)
+    file_id = await bucket.upload_from_stream("model.npz", data)
+    # Workers may still be downloading the previous file, so that one stays
+    # until the next build
+    before = await db.recommendation_meta.find_one_and_update(
+        {"_id": "model"},
+        [{"$set": {
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            "file_id": file_id,
+            "previous_file_id": "$file_id",
+            "watermark": watermark,
+            "rows": rows,
+            "built_at": datetime.now(timezone.utc),
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before and before.get('previous_file_id'):
+        await bucket.delete(before['previous_file_id'])
+    return (before or {}).get('version', 0) + 1
+
+async def load_arrays(db, file_id) -> Dict[str, np.ndarray]:
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=MODEL_BUCKET)
+    stream = await bucket.open_download_stream(file_id)
+    return dict(np.load(io.BytesIO(await stream.read()), allow_pickle=False))
+
+async def refresh_index(db, index: RecommendationIndex):
+    # Called by the workers; downloads the model only when it changed
+    meta = await db.recommendation_meta.find_one({"_id": "model"})
+    if not meta or meta['version'] == index.version:
+        return
+    arrays = await load_arrays(db, meta['file_id'])
+    index.build(arrays.pop('template_ids').tolist(), arrays, meta['version'])
+
+# ==================== BUILD ====================
+
+async def build_model(db, full: bool = False) -> dict:
+    meta = None if full else await db.recommendation_meta.find_one({"_id": "model"})
+    watermark = datetime.now(timezone.utc) - SETTLE
+
+    if meta is None:
+        codes = TemplateCodes()
+        rows = await read_rows(db.trip_activities, {"created_at": {"$lte": watermark}}, codes)
+        counts = PairCounts.from_rows(rows, len(codes))
+        total = len(rows)
+    else:
+        arrays = await load_arrays(db, meta['file_id'])
+        codes = TemplateCodes(arrays['template_ids'].tolist())
+        counts = PairCounts()
+        counts.popularity = arrays['popularity']
+        counts.stop_keys, counts.stop_counts = arrays['stop_keys'], arrays['stop_counts']
+        counts.trip_keys, counts.trip_counts = arrays['trip_keys'], arrays['trip_counts']
+        since = meta['watermark']
+        trip_ids = await db.trip_activities.distinct("trip_id", {"created_at": {"$gt": since, "$lte": watermark}})
+        total = meta['rows']
+        for start in range(0, len(trip_ids), TRIPS_PER_QUERY):
+            query = {"trip_id": {"$in": trip_ids[start:start + TRIPS_PER_QUERY]}, "created_at": {"$lte": watermark}}
+            rows = await read_rows(db.trip_activities, query, codes, since)
+            counts.apply(rows, len(codes))
+            total += int(rows.is_new.sum())
+
+    version = await save_model(db, codes, counts, watermark, total)
+    return {
+        "version": version,
+        "incremental": meta is not None,
+        "rows": total,
+        "templates": len(codes),
+        "stop_pairs": len(counts.stop_keys),
+        "trip_pairs": len(counts.trip_keys),
+    }
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    report = await build_model(db, full=args.full)
+    print(
+        f"Model version {report['version']} ({'incremental' if report['incremental'] else 'full'}): "
+        f"{report['rows']} rows, {report['templates']} templates, "
+        f"{report['stop_pairs']} stop pairs, {report['trip_pairs']} trip pairs"
+    )
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Build the activity recommendation model from trip_activities")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--full", action="store_true", help="recount every row instead of only the new ones")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from budget import compute_budget, empty_breakdown
+from pipelines import EXPENSE_CATEGORIES
+
+# One trip_budget_rollups document per trip, kept current with $inc from
+# the write handlers so the budget view is a single point read:
+#   {trip_id, user_id, breakdown: {category: amount}, activities_count, expenses_count, version}
+# Writes never upsert: a missing rollup is rebuilt from source on read, so
+# increments can't create a partial document for a trip that predates it.
+# Every increment bumps version, which lets a rebuild tell whether one
+# landed while it was recomputing. A rebuild of a missing rollup first
+# upserts a placeholder marked building, so increments made meanwhile
+# have a document to land on (and a version to bump); readers skip
+# placeholders (SETTLED) and treat them as missing.
+
+SETTLED = {"building": {"$exists": False}}
+
+REBUILD_ATTEMPTS = 3
+
+def as_budget(rollup: dict) -> dict:
+    breakdown = {category: rollup.get('breakdown', {}).get(category, 0) for category in EXPENSE_CATEGORIES}
+    return {
+        "total": sum(breakdown.values()),
+        "breakdown": breakdown,
+        "activities_count": rollup.get('activities_count', 0),
+        "expenses_count": rollup.get('expenses_count', 0)
+    }
+
+async def _inc(db, trip_id: str, inc: dict, session=None):
+    inc = {field: value for field, value in inc.items() if value}
+    if inc:
+        await db.trip_budget_rollups.update_one(
+            {"trip_id": trip_id},
+            {"$inc": {**inc, "version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            session=session
+        )
+
+# ==================== WRITE HOOKS ====================
+
+async def init_rollup(db, trip_id: str, user_id: str):
+    await db.trip_budget_rollups.update_one(
+        {"trip_id": trip_id},
+        {"$setOnInsert": {
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "breakdown": empty_breakdown(),
+            "activities_count": 0,
+            "expenses_count": 0,
+            "version": 0,
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+async def record_expense(db, trip_id: str, category: str, amount: float, sign: int = 1):
+    inc = {"expenses_count": sign}
+    if category in EXPENSE_CATEGORIES:
+        inc[f"breakdown.{category}"] = sign * amount
+    await _inc(db, trip_id, inc)
+
+async def record_expenses(db, trip_id: str, expenses: List[Tuple[str, float]]):
+    # Several expenses for one trip folded into a single update
+    inc = {"expenses_count": len(expenses)}
+    for category, amount in expenses:
+        if category in EXPENSE_CATEGORIES:
+            inc[f"breakdown.{category}"] = inc.get(f"breakdown.{category}", 0) + amount
+    await _inc(db, trip_id, inc)
+
+async def record_activities(db, trip_id: str, cost: float, count: int = 1, session=None):
+    await _inc(db, trip_id, {"activities_count": count, "breakdown.activities": cost}, session)
+
+async def delete_rollup(db, trip_id: str):
+    await db.trip_budget_rollups.delete_one({"trip_id": trip_id})
+
+# ==================== READS ====================
+
+async def read_budget(db, trip_id: str, user_id: str) -> Optional[dict]:
+    rollup = await db.trip_budget_rollups.find_one({"trip_id": trip_id, "user_id": user_id, **SETTLED}, {"_id": 0})
+    return as_budget(rollup) if rollup else None
+
+async def rebuild_rollup(db, trip_id: str, user_id: str) -> dict:
+    # The recomputed rollup only replaces the version it started from; if
+    # an increment landed in between, the computation may or may not have
+    # seen its write, so it runs again. When increments keep winning the
+    # rollup is left as they made it and the fresh budget is just returned.
+    try:
+        await db.trip_budget_rollups.update_one(
+            {"trip_id": trip_id},
+            {"$setOnInsert": {
+                "trip_id": trip_id,
+                "user_id": user_id,
+                "breakdown": empty_breakdown(),
+                "activities_count": 0,
+                "expenses_count": 0,
+                "version": 0,
+                "building": True,
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another rebuild's placeholder won the race
+        pass
+    for _ in range(REBUILD_ATTEMPTS):
+        current = await db.trip_budget_rollups.find_one({"trip_id": trip_id}, {"_id": 0, "version": 1})
+        budget = await compute_budget(db, trip_id)
+        if current is None:
+            # Deleted with its trip in the meantime
+            return budget
+        rollup = {
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "breakdown": budget['breakdown'],
+            "activities_count": budget['activities_count'],
+            "expenses_count": budget['expenses_count'],
+            "version": (current.get('version') or 0) + 1,
+            "updated_at": datetime.now(timezone.utc)
+        }
+        # Rollups from before versioning match on the missing field
+        result = await db.trip_budget_rollups.replace_one({"trip_id": trip_id, "version": current.get('version')}, rollup)
+        if result.matched_count:
+            return budget
+    return budget
+
+# ==================== RECONCILIATION ====================
+
+def _drift(expected: dict, actual: Optional[dict]) -> List[str]:
+    if actual is None:
+        return ["missing"]
+    fields = []
+    for category in EXPENSE_CATEGORIES:
+        if abs(expected['breakdown'][category] - actual['breakdown'][category]) > 1e-6:
+            fields.append(f"breakdown.{category}")
+    for field in ("activities_count", "expenses_count"):
+        if expected[field] != actual[field]:
+            fields.append(field)
+    return fields
+
+async def reconcile_rollups(db, fix: bool = False) -> dict:
+    report = {"checked": 0, "drifted": [], "orphaned": 0}
+    async for trip in db.trips.find({}, {"_id": 0, "id": 1, "user_id": 1}):
+        report["checked"] += 1
+        expected = await compute_budget(db, trip['id'])
+        actual = await read_budget(db, trip['id'], trip['user_id'])
+        drift = _drift(expected, actual)
+        if drift:
+            report["drifted"].append({"trip_id": trip['id'], "fields": drift})
+            if fix:
+                await rebuild_rollup(db, trip['id'], trip['user_id'])
+
+    # Rollups left behind by trips that no longer exist
+    async for rollup in db.trip_budget_rollups.find({}, {"_id": 0, "trip_id": 1}):
+        if not await db.trips.find_one({"id": rollup['trip_id']}, {"_id": 1}):
+            report["orphaned"] += 1
+            if fix:
+                await delete_rollup(db, rollup['trip_id'])
+    return report
+
+async def main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    report = await reconcile_rollups(db, fix=args.fix)
+    for entry in report["drifted"]:
+        print(f"[drift] trip {entry['trip_id']}: {', '.join(entry['fields'])}")
+    print(f"Checked {report['checked']} trips, {len(report['drifted'])} drifted, {report['orphaned']} orphaned rollups"
+          + (" (fixed)" if args.fix else ""))
+
+    client.close()
+
+if __name__ == "__main__":
+    load_dotenv(Path(__file__).parent / '.env')
+    parser = argparse.ArgumentParser(description="Rebuild trip budget rollups from source data and report drift")
+    parser.add_argument("--fix", action="store_true", help="rewrite drifted rollups and drop orphaned ones")
+    asyncio.run(main(parser.parse_args()))
@@ -3,7 +3,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-import uuid
+
+from catalog_io import import_catalog
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -14,21 +15,21 @@ db = client[os.environ['DB_NAME']]
 
 # Sample cities data
 cities_data = [
-    {"id": str(uuid.uuid4()), "name": "Paris", "country": "France", "cost_index": 7.5, "popularity": 95, "description": "City of lights and romance", "image_url": "https://images.unsplash.com/photo-1502602898657-3e91760cbb34"},
-    {"id": str(uuid.uuid4()), "name": "Tokyo", "country": "Japan", "cost_index": 8.0, "popularity": 90, "description": "Modern metropolis meets tradition", "image_url": "https://images.unsplash.com/photo-1540959733332-eab4deabeeaf"},
-    {"id": str(uuid.uuid4()), "name": "New York", "country": "USA", "cost_index": 9.0, "popularity": 92, "description": "The city that never sleeps", "image_url": "https://images.unsplash.com/photo-1496442226666-8d4d0e62e6e9"},
-    {"id": str(uuid.uuid4()), "name": "London", "country": "UK", "cost_index": 8.5, "popularity": 88, "description": "Historic capital with modern flair", "image_url": "https://images.unsplash.com/photo-1513635269975-59663e0ac1ad"},
-    {"id": str(uuid.uuid4()), "name": "Dubai", "country": "UAE", "cost_index": 7.0, "popularity": 85, "description": "Luxury and innovation", "image_url": "https://images.unsplash.com/photo-1512453979798-5ea266f8880c"},
-    {"id": str(uuid.uuid4()), "name": "Barcelona", "country": "Spain", "cost_index": 6.0, "popularity": 87, "description": "Art, architecture, and beaches", "image_url": "https://images.unsplash.com/photo-1583422409516-2895a77efded"},
-    {"id": str(uuid.uuid4()), "name": "Bali", "country": "Indonesia", "cost_index": 4.0, "popularity": 89, "description": "Tropical paradise", "image_url": "https://images.unsplash.com/photo-1537996194471-e657df975ab4"},
-    {"id": str(uuid.uuid4()), "name": "Rome", "country": "Italy", "cost_index": 6.5, "popularity": 91, "description": "Ancient history and culture", "image_url": "https://images.unsplash.com/photo-1552832230-c0197dd311b5"},
-    {"id": str(uuid.uuid4()), "name": "Sydney", "country": "Australia", "cost_index": 7.5, "popularity": 84, "description": "Harbor city with iconic landmarks", "image_url": "https://images.unsplash.com/photo-1506973035872-a4ec16b8e8d9"},
-    {"id": str(uuid.uuid4()), "name": "Singapore", "country": "Singapore", "cost_index": 7.8, "popularity": 86, "description": "Garden city of the future", "image_url": "https://images.unsplash.com/photo-1525625293386-3f8f99389edd"},
-    {"id": str(uuid.uuid4()), "name": "Bangkok", "country": "Thailand", "cost_index": 3.5, "popularity": 88, "description": "Street food and temples", "image_url": "https://images.unsplash.com/photo-1508009603885-50cf7c579365"},
-    {"id": str(uuid.uuid4()), "name": "Istanbul", "country": "Turkey", "cost_index": 5.0, "popularity": 82, "description": "Where East meets West", "image_url": "https://images.unsplash.com/photo-1524231757912-21f4fe3a7200"},
-    {"id": str(uuid.uuid4()), "name": "Amsterdam", "country": "Netherlands", "cost_index": 7.2, "popularity": 83, "description": "Canals and culture", "image_url": "https://images.unsplash.com/photo-1534351590666-13e3e96b5017"},
-    {"id": str(uuid.uuid4()), "name": "Prague", "country": "Czech Republic", "cost_index": 5.5, "popularity": 81, "description": "Fairy tale city", "image_url": "https://images.unsplash.com/photo-1541849546-216549ae216d"},
-    {"id": str(uuid.uuid4()), "name": "Santorini", "country": "Greece", "cost_index": 6.8, "popularity": 90, "description": "White and blue paradise", "image_url": "https://images.unsplash.com/photo-1613395877344-13d4a8e0d49e"},
+    {"name": "Paris", "country": "France", "cost_index": 7.5, "popularity": 95, "description": "City of lights and romance", "image_url": "https://images.unsplash.com/photo-1502602898657-3e91760cbb34"},
+    {"name": "Tokyo", "country": "Japan", "cost_index": 8.0, "popularity": 90, "description": "Modern metropolis meets tradition", "image_url": "https://images.unsplash.com/photo-1540959733332-eab4deabeeaf"},
+    {"name": "New York", "country": "USA", "cost_index": 9.0, "popularity": 92, "description": "The city that never sleeps", "image_url": "https://images.unsplash.com/photo-1496442226666-8d4d0e62e6e9"},
+    {"name": "London", "country": "UK", "cost_index": 8.5, "popularity": 88, "description": "Historic capital with modern flair", "image_url": "https://images.unsplash.com/photo-1513635269975-59663e0ac1ad"},
+    {"name": "Dubai", "country": "UAE", "cost_index": 7.0, "popularity": 85, "description": "Luxury and innovation", "image_url": "https://images.unsplash.com/photo-1512453979798-5ea266f8880c"},
+    {"name": "Barcelona", "country": "Spain", "cost_index": 6.0, "popularity": 87, "description": "Art, architecture, and beaches", "image_url": "https://images.unsplash.com/photo-1583422409516-2895a77efded"},
+    {"name": "Bali", "country": "Indonesia", "cost_index": 4.0, "popularity": 89, "description": "Tropical paradise", "image_url": "https://images.unsplash.com/photo-1537996194471-e657df975ab4"},
+    {"name": "Rome", "country": "Italy", "cost_index": 6.5, "popularity": 91, "description": "Ancient history and culture", "image_url": "https://images.unsplash.com/photo-1552832230-c0197dd311b5"},
+    {"name": "Sydney", "country": "Australia", "cost_index": 7.5, "popularity": 84, "description": "Harbor city with iconic landmarks", "image_url": "https://images.unsplash.com/photo-1506973035872-a4ec16b8e8d9"},
+    {"name": "Singapore", "country": "Singapore", "cost_index": 7.8, "popularity": 86, "description": "Garden city of the future", "image_url": "https://images.unsplash.com/photo-1525625293386-3f8f99389edd"},
+    {"name": "Bangkok", "country": "Thailand", "cost_index": 3.5, "popularity": 88, "description": "Street food and temples", "image_url": "https://images.unsplash.com/photo-1508009603885-50cf7c579365"},
+    {"name": "Istanbul", "country": "Turkey", "cost_index": 5.0, "popularity": 82, "description": "Where East meets West", "image_url": "https://images.unsplash.com/photo-1524231757912-21f4fe3a7200"},
+    {"name": "Amsterdam", "country": "Netherlands", "cost_index": 7.2, "popularity": 83, "description": "Canals and culture", "image_url": "https://images.unsplash.com/photo-1534351590666-13e3e96b5017"},
+    {"name": "Prague", "country": "Czech Republic", "cost_index": 5.5, "popularity": 81, "description": "Fairy tale city", "image_url": "https://images.unsplash.com/photo-1541849546-216549ae216d"},
+    {"name": "Santorini", "country": "Greece", "cost_index": 6.8, "popularity": 90, "description": "White and blue paradise", "image_url": "https://images.unsplash.com/photo-1613395877344-13d4a8e0d49e"},
 ]
 
 # Sample activities for each city
@@ -91,33 +92,23 @@ activities_templates = {
     ],
 }
 
+async def seed_catalog(db):
+    # Swapped in through staging collections with stable ids (see
+    # catalog_io.py), so reseeding neither empties the live catalog nor
+    # orphans the city/template ids held by stops and trip activities
+    templates = [
+        {**activity, "city": city['name'], "country": city['country']}
+        for city in cities_data
+        for activity in activities_templates.get(city['name'], [])
+    ]
+    report = await import_catalog(db, cities_data, templates)
+    print(f"Imported {report['cities']['written']} cities")
+    print(f"Imported {report['templates']['written']} activity templates")
+    print(f"Catalog version is now {report['version']}")
+
 async def seed_database():
     print("Starting database seeding...")
-    
-    # Clear existing data
-    await db.cities.delete_many({})
-    await db.activity_templates.delete_many({})
-    
-    # Insert cities
-    await db.cities.insert_many(cities_data)
-    print(f"Inserted {len(cities_data)} cities")
-    
-    # Insert activities
-    activity_count = 0
-    for city_data in cities_data:
-        city_name = city_data['name']
-        if city_name in activities_templates:
-            activities = []
-            for activity in activities_templates[city_name]:
-                activities.append({
-                    "id": str(uuid.uuid4()),
-                    "city_id": city_data['id'],
-                    **activity
-                })
-            await db.activity_templates.insert_many(activities)
-            activity_count += len(activities)
-    
-    print(f"Inserted {activity_count} activity templates")
+    await seed_catalog(db)
     print("Database seeding completed!")
     
     client.close()
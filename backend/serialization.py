@@ -0,0 +1,20 @@
+from typing import Any, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# JSON encoding for responses. ORJSONResponse is the app's default response
+# class; handlers that opt into the trusted path return documents from our
+# own collections as TrustedJSONResponse, skipping response_model
+# validation. Those documents must already have the model's shape, so they
+# are read with model_projection() and store created_at as a BSON date.
+
+class TrustedJSONResponse(ORJSONResponse):
+    # UTC datetimes as "Z", matching what Pydantic emits on the validated path
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    # Only the fields the response model exposes leave the server
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
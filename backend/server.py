@@ -1,34 +1,86 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+import asyncio
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
 import jwt
 
+from admin_stats import AdminStats, bootstrap_counters, record_daily, record_stop_cities
+from budget import BUDGET_GROUPINGS, compute_budget
+from bulk import group_by, insert_unordered
+from cascade import delete_stop_cascade, delete_trip_cascade, reap_tombstones
+from catalog_cache import CatalogCache
+from catalog_io import EXPORT_FIELDS, export_chunks
+from catalog_version import get_catalog_version
+from database import create_client, pool_metrics, secondary_database, warm_up
+from city_search import CityPrefixIndex, backfill_search_fields, load_city_index, search_cities as run_city_search
+from forecast import CityCosts, forecast_trip
+from feed import FEED_SORT, FeedCache, LikeBuffer, ensure_like_index, feed_query, fetch_feed, like_post as record_like, unlike_post as remove_like
+from indexes import ensure_indexes
+from lifecycle import lifecycle
+from metrics import PASSWORD_HASH_DURATION, PLANNER_DURATION, Counter, Gauge, MetricsMiddleware, command_listener, instrument_serialization, render as render_metrics
+from migrations.native_dates import convert_once as convert_native_dates
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor, fetch_page, stream_ndjson
+from password_pool import PasswordHasher, PasswordPoolSaturated
+from pipelines import DETAIL_CHILD_LIMIT, trip_detail_pipeline
+from planner import MAX_HOURS_PER_DAY, PlannerIndex, plan_trip, trip_days
+from principal_cache import PrincipalCache, RedisPrincipalBackend
+from public_cache import PublicTripCache, RedisInvalidationChannel
+from recommendations import RecommendationIndex, refresh_index
+from rollups import as_budget, init_rollup, read_budget, rebuild_rollup, record_activities, record_expense, record_expenses
+from serialization import TrustedJSONResponse, model_projection
+from trip_export import EXPORT_FORMATS, account_records, encode, gzipped, trip_records
+
 ROOT_DIR = Path(__file__).parent
+# Fills in whatever the environment (or launcher.py) hasn't already set, so
+# any entry point, plain uvicorn included, sees the same configuration
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Configuration comes from the environment and .env.
+#
+# Per-worker resources (Mongo client, bcrypt pool, caches) are created by
+# open_resources() when the lifespan starts and closed when it ends, so
+# importing this module connects to nothing and starts no threads.
+# secondary_db serves catalog and public trip reads, which go to
+# secondaries when MONGO_SECONDARY_READS=true.
+client: Optional[AsyncIOMotorClient] = None
+db = None
+secondary_db = None
+password_hasher: Optional[PasswordHasher] = None
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_POOL_BUSY_STATUS = int(os.environ.get('PASSWORD_POOL_BUSY_STATUS', '503'))
 security = HTTPBearer()
-SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
+# Required: start_worker refuses to start without it, since a known key
+# would let anyone sign tokens
+SECRET_KEY = os.environ.get('SECRET_KEY')
 ALGORITHM = "HS256"
 
-# Create the main app without a prefix
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # See LIFESPAN at the bottom of this module
+    await start_worker()
+    try:
+        yield
+    finally:
+        await stop_worker()
+
+# Create the main app without a prefix; responses are encoded with orjson
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Long-running tasks started at startup, cancelled at shutdown
+background_tasks: List[asyncio.Task] = []
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -185,6 +237,18 @@ class Expense(BaseModel):
     date: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# Bulk write results, one entry per submitted item in request order
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # created, error
+    item: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
 # Community Post Models
 class PostCreate(BaseModel):
     title: str
@@ -202,13 +266,350 @@ class Post(BaseModel):
     likes: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# Trip detail (trip page in one request)
+class TripDetail(BaseModel):
+    trip: Trip
+    stops: List[Stop]
+    activities: List[TripActivity]
+    activities_by_stop: Dict[str, List[TripActivity]]
+    expenses: List[Expense]
+    budget: Dict[str, Any]
+    # Set when a list was cut at one page: continue from the paginated
+    # /trips/{id}/stops, /activities or /expenses listing with this cursor
+    next_cursors: Dict[str, str] = {}
+
+# Itinerary planner
+class PlanRequest(BaseModel):
+    budget: float = Field(ge=0)
+    # Category -> weight; categories left out (or weighted 0) are skipped.
+    # Empty means every category counts the same.
+    preferences: Dict[str, float] = {}
+    hours_per_day: int = Field(8, ge=1, le=MAX_HOURS_PER_DAY)
+
+class PlannedDay(BaseModel):
+    date: str
+    stop_id: str
+    city_id: str
+    hours: int
+    cost: float
+    activities: List[ActivityTemplate]
+
+class TripPlan(BaseModel):
+    budget: float
+    total_cost: float
+    total_score: float
+    days: List[PlannedDay]
+
+# Cost forecasts
+class StopForecast(BaseModel):
+    stop_id: str
+    city_id: str
+    city_name: Optional[str] = None
+    cost_index: Optional[float] = None
+    days: int
+    daily: Dict[str, float]
+    daily_total: float
+    total: float
+    breakdown: Dict[str, float]
+
+class DayForecast(BaseModel):
+    date: str
+    stop_id: str
+    total: float
+
+class TripForecast(BaseModel):
+    total: float
+    breakdown: Dict[str, float]
+    stops: List[StopForecast]
+    days: List[DayForecast]
+
+class CityForecast(BaseModel):
+    city_id: str
+    city_name: str
+    country: str
+    cost_index: float
+    days: int
+    total: float
+    breakdown: Dict[str, float]
+
+class ForecastBatch(BaseModel):
+    # Columnar: candidate i is (city_ids[i], days[i])
+    city_ids: List[str]
+    days: List[int]
+    baselines: Optional[Dict[str, float]] = None
+
+class ForecastBatchResult(BaseModel):
+    # null where the city is unknown
+    totals: List[Optional[float]]
+
+# Activity recommendations
+class Recommendation(BaseModel):
+    activity: ActivityTemplate
+    score: float
+
+# ==================== CATALOG CACHE ====================
+
+# Cities and activity templates only change when seed_data.py runs, so they
+# are served from memory and reloaded when the seeder bumps the catalog
+# version. The optional city prefix index, the planner's template arrays and
+# the forecast's cost_index arrays are rebuilt from the same load.
+CATALOG_CACHE = os.environ.get('CATALOG_CACHE', 'true').lower() == 'true'
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', '300'))
+CATALOG_REFRESH_SECONDS = float(os.environ.get('CATALOG_REFRESH_SECONDS', '30'))
+CITY_SEARCH_MEMORY_INDEX = os.environ.get('CITY_SEARCH_MEMORY_INDEX', 'false').lower() == 'true'
+catalog_cache: Optional[CatalogCache] = None
+city_index: Optional[CityPrefixIndex] = None
+planner_index: Optional[PlannerIndex] = None
+city_costs: Optional[CityCosts] = None
+
+async def refresh_catalog():
+    version = await get_catalog_version(secondary_db)
+    if CATALOG_CACHE and (version != catalog_cache.version or not catalog_cache.loaded):
+        await catalog_cache.load(secondary_db, version)
+    if CITY_SEARCH_MEMORY_INDEX and (version != city_index.version or not len(city_index)):
+        if catalog_cache.loaded:
+            city_index.build(catalog_cache.cities(), version)
+        else:
+            await load_city_index(secondary_db, city_index, version)
+    if catalog_cache.loaded and version != planner_index.version:
+        planner_index.build(catalog_cache.templates(), version)
+    if catalog_cache.loaded and version != city_costs.version:
+        city_costs.build(catalog_cache.cities(), version)
+
+async def catalog_refresher():
+    while True:
+        await asyncio.sleep(CATALOG_REFRESH_SECONDS)
+        try:
+            await refresh_catalog()
+        except Exception as e:
+            logger.warning(f"Catalog refresh failed: {e}")
+
+def catalog_not_modified(request: Request, response: Response) -> Optional[Response]:
+    # Catalog responses carry the catalog version as a weak ETag so clients
+    # and CDNs can revalidate with If-None-Match instead of refetching.
+    etag = catalog_cache.etag
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={CATALOG_CACHE_MAX_AGE}"}
+    response.headers.update(headers)
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return None
+
+# ==================== RECOMMENDATIONS ====================
+
+# The co-occurrence model is built offline (python recommendations.py
+# build, e.g. from cron); workers poll its version and reload it when the
+# job publishes a new one.
+RECOMMENDATIONS_REFRESH_SECONDS = float(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', '60'))
+recommendation_index: Optional[RecommendationIndex] = None
+
+async def recommendations_refresher():
+    while True:
+        await asyncio.sleep(RECOMMENDATIONS_REFRESH_SECONDS)
+        try:
+            await refresh_index(secondary_db, recommendation_index)
+        except Exception as e:
+            logger.warning(f"Recommendation model refresh failed: {e}")
+
+# ==================== PUBLIC TRIP CACHE ====================
+
+# Shared trip pages are read far more often than they are edited. Each page
+# is cached as serialized JSON with an ETag, keyed by (public_url, cursor,
+# limit), and dropped whenever the owner changes the trip. Set
+# PUBLIC_TRIP_CACHE_REDIS_URL to broadcast those drops to every worker;
+# without it, other workers re-check that a cached page is still published
+# at most every PUBLIC_TRIP_REVALIDATE_SECONDS per page, and pick up other
+# edits when the TTL runs out.
+PUBLIC_TRIP_CACHE_TTL = float(os.environ.get('PUBLIC_TRIP_CACHE_TTL', '30'))
+PUBLIC_TRIP_CACHE_SIZE = int(os.environ.get('PUBLIC_TRIP_CACHE_SIZE', '5000'))
+PUBLIC_TRIP_CACHE_REDIS_URL = os.environ.get('PUBLIC_TRIP_CACHE_REDIS_URL')
+PUBLIC_TRIP_REVALIDATE_SECONDS = float(os.environ.get('PUBLIC_TRIP_REVALIDATE_SECONDS', '1'))
+PUBLIC_TRIP_MAX_AGE = int(os.environ.get('PUBLIC_TRIP_MAX_AGE', '0'))
+public_trip_cache: Optional[PublicTripCache] = None
+
+async def still_public(key) -> bool:
+    # Point read on the public_url index, against the primary so an
+    # unpublish is seen straight away
+    return await db.trips.find_one({"public_url": key[0], "is_public": True}, {"_id": 1}) is not None
+
+# ==================== CASCADE DELETES ====================
+
+# Transactions are used when the deployment supports them; otherwise
+# tombstones plus the reaper guarantee children are eventually removed.
+# Trips with more children than the threshold are deleted in the background.
+CASCADE_TRANSACTIONS = os.environ.get('CASCADE_TRANSACTIONS', 'true').lower() == 'true'
+CASCADE_SOFT_DELETE_THRESHOLD = int(os.environ.get('CASCADE_SOFT_DELETE_THRESHOLD', '5000'))
+CASCADE_REAP_SECONDS = float(os.environ.get('CASCADE_REAP_SECONDS', '10'))
+
+async def cascade_reaper():
+    while True:
+        await asyncio.sleep(CASCADE_REAP_SECONDS)
+        try:
+            await reap_tombstones(db)
+        except Exception as e:
+            logger.warning(f"Cascade reaper failed: {e}")
+
+# ==================== BULK WRITES ====================
+
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '1000'))
+
+def check_bulk_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="No items submitted")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+async def owned_trip_ids(user_id: str, trip_ids) -> set:
+    # Ownership for every trip in a batch in one query
+    return {
+        trip['id'] async for trip in db.trips.find({"id": {"$in": list(set(trip_ids))}, "user_id": user_id}, {"_id": 0, "id": 1})
+    }
+
+async def find_owned(collection, child_id: str, user_id: str, not_found: str) -> dict:
+    # Stops, activities and expenses carry their owner's user_id, so the
+    # ownership check is part of the lookup. Rows written before the
+    # backfill fall back to checking the parent trip.
+    doc = await collection.find_one({"id": child_id, "user_id": user_id}, {"_id": 0})
+    if doc:
+        return doc
+    doc = await collection.find_one({"id": child_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail=not_found)
+    if 'user_id' not in doc and await db.trips.find_one({"id": doc['trip_id'], "user_id": user_id}, {"_id": 1}):
+        return doc
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+async def lookup_cities(city_ids) -> Dict[str, dict]:
+    if CATALOG_CACHE:
+        return await catalog_cache.get_cities(secondary_db, city_ids)
+    return {city['id']: city async for city in secondary_db.cities.find({"id": {"$in": list(set(city_ids))}}, {"_id": 0})}
+
+async def lookup_templates(template_ids) -> Dict[str, dict]:
+    if CATALOG_CACHE:
+        return await catalog_cache.get_templates(secondary_db, template_ids)
+    return {
+        template['id']: template
+        async for template in secondary_db.activity_templates.find({"id": {"$in": list(set(template_ids))}}, {"_id": 0})
+    }
+
+async def insert_bulk(collection, pending: list, results: List[BulkItemResult]) -> list:
+    # pending holds (index, model, doc); returns the models that were written
+    errors = await insert_unordered(collection, [doc for _, _, doc in pending])
+    written = []
+    for position, (index, model, _) in enumerate(pending):
+        if position in errors:
+            results.append(BulkItemResult(index=index, status="error", error=errors[position]))
+        else:
+            results.append(BulkItemResult(index=index, status="created", item=model.model_dump()))
+            written.append(model)
+    return written
+
+def bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.status == "created")
+    return BulkResult(created=created, failed=len(results) - created, results=results)
+
+# ==================== FEED ====================
+
+# Likes are buffered per post and folded into posts.likes every
+# FEED_LIKE_FLUSH_SECONDS; the first feed page is shared for FEED_CACHE_TTL.
+FEED_LIKE_FLUSH_SECONDS = float(os.environ.get('FEED_LIKE_FLUSH_SECONDS', '1'))
+FEED_CACHE_TTL = float(os.environ.get('FEED_CACHE_TTL', '2'))
+like_buffer: Optional[LikeBuffer] = None
+feed_cache: Optional[FeedCache] = None
+
+async def like_flusher():
+    while True:
+        await asyncio.sleep(FEED_LIKE_FLUSH_SECONDS)
+        try:
+            await like_buffer.flush(db)
+        except Exception as e:
+            logger.warning(f"Like counter flush failed: {e}")
+
+# ==================== ADMIN STATS ====================
+
+ADMIN_STATS_REFRESH_SECONDS = float(os.environ.get('ADMIN_STATS_REFRESH_SECONDS', '60'))
+admin_stats: Optional[AdminStats] = None
+
+async def admin_stats_refresher():
+    while True:
+        await asyncio.sleep(ADMIN_STATS_REFRESH_SECONDS)
+        try:
+            await admin_stats.refresh(db)
+        except Exception as e:
+            logger.warning(f"Admin stats refresh failed: {e}")
+
+# ==================== PAGINATION ====================
+
+# Keyset sort orders for list endpoints; each is backed by an index in
+# indexes.py and ends with the unique id as a tie-breaker.
+TRIP_SORT = [("created_at", 1), ("id", 1)]
+STOP_SORT = [("order", 1), ("id", 1)]
+CHILD_SORT = [("created_at", 1), ("id", 1)]
+TEMPLATE_SORT = [("estimated_cost", 1), ("id", 1)]
+
+# TRUSTED_SERIALIZATION=true returns owner-scoped documents without
+# response_model validation. Requires created_at stored as a date, which
+# start_worker converts (migrations.native_dates).
+TRUSTED_SERIALIZATION = os.environ.get('TRUSTED_SERIALIZATION', 'false').lower() == 'true'
+
+def trusted_response(content, response: Optional[Response] = None):
+    if not TRUSTED_SERIALIZATION:
+        return content
+    # A returned Response doesn't pick up headers set on the injected one
+    return TrustedJSONResponse(content, headers=dict(response.headers) if response else None)
+
+async def fetch_list(response: Response, collection, query: dict, sort, limit: int, cursor: Optional[str],
+                     model=None) -> List[dict]:
+    # With a model, only its fields are read
+    try:
+        docs, next_cursor = await fetch_page(
+            collection, query, sort, limit, cursor, model_projection(model) if model else None
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
+
+def ndjson_response(collection, query: dict, sort, cursor: Optional[str]) -> StreamingResponse:
+    try:
+        body = stream_ndjson(collection, query, sort, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
 # ==================== AUTH UTILITIES ====================
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=PASSWORD_POOL_BUSY_STATUS,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+async def hash_password(password: str) -> str:
+    try:
+        with PASSWORD_HASH_DURATION.time(op="hash"):
+            return await password_hasher.hash(password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        with PASSWORD_HASH_DURATION.time(op="verify"):
+            return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
+
+# Principal cache: avoids the users lookup on every authenticated request.
+# Set PRINCIPAL_CACHE_TTL=0 to disable, PRINCIPAL_CACHE_REDIS_URL to share
+# entries and invalidations between workers.
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_REDIS_URL = os.environ.get('PRINCIPAL_CACHE_REDIS_URL')
+principal_cache: Optional[PrincipalCache] = None
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -229,15 +630,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
     
+    principal = await principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
     user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    # Convert datetime strings back to datetime objects
-    if isinstance(user.get('created_at'), str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
-    
-    return User(**user)
+    principal = User(**user)
+    await principal_cache.set(user_id, principal)
+    return principal
 
 # ==================== AUTH ROUTES ====================
 
@@ -249,16 +652,16 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user_dict = user_data.model_dump()
     del user_dict['password']
     
     user = User(**user_dict)
     user_doc = user.model_dump()
     user_doc['password'] = hashed_password
-    user_doc['created_at'] = user_doc['created_at'].isoformat()
     
     await db.users.insert_one(user_doc)
+    await record_daily(db, "signups")
     
     # Create token
     token = create_access_token({"sub": user.id})
@@ -268,13 +671,9 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user_doc = await db.users.find_one({"email": credentials.email})
-    if not user_doc or not verify_password(credentials.password, user_doc['password']):
+    if not user_doc or not await verify_password(credentials.password, user_doc['password']):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Convert datetime string back
-    if isinstance(user_doc.get('created_at'), str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     user = User(**{k: v for k, v in user_doc.items() if k != 'password' and k != '_id'})
     token = create_access_token({"sub": user.id})
     
@@ -289,10 +688,9 @@ async def update_profile(update_data: UserUpdate, current_user: User = Depends(g
     update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
     if update_dict:
         await db.users.update_one({"id": current_user.id}, {"$set": update_dict})
+        await principal_cache.invalidate(current_user.id)
     
     updated_user = await db.users.find_one({"id": current_user.id}, {"_id": 0, "password": 0})
-    if isinstance(updated_user.get('created_at'), str):
-        updated_user['created_at'] = datetime.fromisoformat(updated_user['created_at'])
     
     return User(**updated_user)
 
@@ -302,28 +700,70 @@ async def update_profile(update_data: UserUpdate, current_user: User = Depends(g
 async def create_trip(trip_data: TripCreate, current_user: User = Depends(get_current_user)):
     trip = Trip(**trip_data.model_dump(), user_id=current_user.id)
     trip_doc = trip.model_dump()
-    trip_doc['created_at'] = trip_doc['created_at'].isoformat()
     
     await db.trips.insert_one(trip_doc)
+    await init_rollup(db, trip.id, current_user.id)
+    await record_daily(db, "trips")
     return trip
 
 @api_router.get("/trips", response_model=List[Trip])
-async def get_trips(current_user: User = Depends(get_current_user)):
-    trips = await db.trips.find({"user_id": current_user.id}, {"_id": 0}).to_list(1000)
-    for trip in trips:
-        if isinstance(trip.get('created_at'), str):
-            trip['created_at'] = datetime.fromisoformat(trip['created_at'])
-    return trips
+async def get_trips(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    query = {"user_id": current_user.id}
+    if stream:
+        return ndjson_response(db.trips, query, TRIP_SORT, cursor)
+    
+    trips = await fetch_list(response, db.trips, query, TRIP_SORT, limit, cursor, Trip)
+    return trusted_response(trips, response)
 
 @api_router.get("/trips/{trip_id}", response_model=Trip)
 async def get_trip(trip_id: str, current_user: User = Depends(get_current_user)):
     trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id}, {"_id": 0})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
-    if isinstance(trip.get('created_at'), str):
-        trip['created_at'] = datetime.fromisoformat(trip['created_at'])
     return Trip(**trip)
 
+@api_router.get("/trips/{trip_id}/full", response_model=TripDetail)
+async def get_trip_full(trip_id: str, current_user: User = Depends(get_current_user)):
+    # Trip, stops, activities, expenses and budget rollup in one aggregation; each
+    # list holds at most one page (see next_cursors)
+    results = await db.trips.aggregate(trip_detail_pipeline(trip_id, current_user.id)).to_list(1)
+    if not results:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    
+    trip = results[0]
+    next_cursors = {}
+    children = {}
+    for name, sort in (("stops", STOP_SORT), ("activities", CHILD_SORT), ("expenses", CHILD_SORT)):
+        docs = trip.pop(name)
+        if len(docs) > DETAIL_CHILD_LIMIT:
+            docs = docs[:DETAIL_CHILD_LIMIT]
+            next_cursors[name] = encode_cursor([docs[-1].get(field) for field, _ in sort])
+        children[name] = docs
+    stops, activities, expenses = children["stops"], children["activities"], children["expenses"]
+    # A trip without a rollup yet gets one built from source
+    rollup = trip.pop('rollup')
+    budget = as_budget(rollup[0]) if rollup else await rebuild_rollup(db, trip_id, current_user.id)
+    
+    activities_by_stop = {stop['id']: [] for stop in stops}
+    for activity in activities:
+        activities_by_stop.setdefault(activity['stop_id'], []).append(activity)
+    
+    return trusted_response({
+        "trip": trip,
+        "stops": stops,
+        "activities": activities,
+        "activities_by_stop": activities_by_stop,
+        "expenses": expenses,
+        "budget": budget,
+        "next_cursors": next_cursors
+    })
+
 @api_router.put("/trips/{trip_id}", response_model=Trip)
 async def update_trip(trip_id: str, trip_data: TripUpdate, current_user: User = Depends(get_current_user)):
     update_dict = {k: v for k, v in trip_data.model_dump().items() if v is not None}
@@ -334,22 +774,27 @@ async def update_trip(trip_id: str, trip_data: TripUpdate, current_user: User =
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Trip not found")
+        # Covers metadata edits and unpublishing (is_public=False)
+        await public_trip_cache.invalidate_trip(trip_id)
     
     trip = await db.trips.find_one({"id": trip_id}, {"_id": 0})
-    if isinstance(trip.get('created_at'), str):
-        trip['created_at'] = datetime.fromisoformat(trip['created_at'])
     return Trip(**trip)
 
 @api_router.delete("/trips/{trip_id}")
 async def delete_trip(trip_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.trips.delete_one({"id": trip_id, "user_id": current_user.id})
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Trip not found")
+    # City counters are decremented for the stops about to go
+    city_ids = [stop['city_id'] async for stop in db.stops.find({"trip_id": trip_id}, {"_id": 0, "city_id": 1})]
     
-    # Delete related data
-    await db.stops.delete_many({"trip_id": trip_id})
-    await db.trip_activities.delete_many({"trip_id": trip_id})
-    await db.expenses.delete_many({"trip_id": trip_id})
+    # Removes the trip with its stops, activities, expenses and rollup
+    mode = await delete_trip_cascade(
+        db, trip_id, current_user.id,
+        use_transactions=CASCADE_TRANSACTIONS,
+        soft_threshold=CASCADE_SOFT_DELETE_THRESHOLD
+    )
+    if mode is None:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    await record_stop_cities(db, city_ids, -1)
+    await public_trip_cache.invalidate_trip(trip_id)
     
     return {"message": "Trip deleted successfully"}
 
@@ -362,21 +807,45 @@ async def publish_trip(trip_id: str, current_user: User = Depends(get_current_us
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Trip not found")
+    # Republishing replaces the URL; pages under the old one must go
+    await public_trip_cache.invalidate_trip(trip_id)
     return {"public_url": public_url}
 
-@api_router.get("/public/trips/{public_url}")
-async def get_public_trip(public_url: str):
-    trip = await db.trips.find_one({"public_url": public_url, "is_public": True}, {"_id": 0})
+async def load_public_trip(public_url: str, cursor: Optional[str], limit: int):
+    # With secondary reads on, a page refilled right after an edit may lag
+    # the primary by the replication delay until the next invalidation/TTL
+    trip = await secondary_db.trips.find_one({"public_url": public_url, "is_public": True}, {"_id": 0})
     if not trip:
-        raise HTTPException(status_code=404, detail="Public trip not found")
-    if isinstance(trip.get('created_at'), str):
-        trip['created_at'] = datetime.fromisoformat(trip['created_at'])
+        return None
     
-    # Get stops and activities
-    stops = await db.stops.find({"trip_id": trip['id']}, {"_id": 0}).sort("order", 1).to_list(1000)
-    activities = await db.trip_activities.find({"trip_id": trip['id']}, {"_id": 0}).to_list(1000)
+    # Get stops and a page of activities
+    stops = await secondary_db.stops.find({"trip_id": trip['id']}, {"_id": 0}).sort(STOP_SORT).to_list(None)
+    try:
+        activities, next_cursor = await fetch_page(secondary_db.trip_activities, {"trip_id": trip['id']}, CHILD_SORT, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"trip": trip, "stops": stops, "activities": activities}
+    return trip['id'], {"trip": trip, "stops": stops, "activities": activities, "next_cursor": next_cursor}
+
+@api_router.get("/public/trips/{public_url}")
+async def get_public_trip(
+    public_url: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    # Concurrent misses for the same page share one database fetch
+    cached = await public_trip_cache.get_or_load(
+        (public_url, cursor, limit), lambda: load_public_trip(public_url, cursor, limit)
+    )
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Public trip not found")
+    
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PUBLIC_TRIP_MAX_AGE}"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # ==================== STOP ROUTES ====================
 
@@ -388,7 +857,10 @@ async def create_stop(stop_data: StopCreate, current_user: User = Depends(get_cu
         raise HTTPException(status_code=404, detail="Trip not found")
     
     # Get city info
-    city = await db.cities.find_one({"id": stop_data.city_id}, {"_id": 0})
+    if CATALOG_CACHE:
+        city = await catalog_cache.get_city(secondary_db, stop_data.city_id)
+    else:
+        city = await secondary_db.cities.find_one({"id": stop_data.city_id}, {"_id": 0})
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
     
@@ -398,59 +870,100 @@ async def create_stop(stop_data: StopCreate, current_user: User = Depends(get_cu
         country=city['country']
     )
     stop_doc = stop.model_dump()
-    stop_doc['created_at'] = stop_doc['created_at'].isoformat()
+    stop_doc['user_id'] = current_user.id
     
     await db.stops.insert_one(stop_doc)
+    await record_stop_cities(db, [stop.city_id])
+    await public_trip_cache.invalidate_trip(stop.trip_id)
     return stop
 
+@api_router.post("/stops/bulk", response_model=BulkResult)
+async def create_stops_bulk(items: List[StopCreate], current_user: User = Depends(get_current_user)):
+    check_bulk_size(items)
+    owned = await owned_trip_ids(current_user.id, [item.trip_id for item in items])
+    cities = await lookup_cities([item.city_id for item in items])
+    
+    results, pending = [], []
+    for index, item in enumerate(items):
+        city = cities.get(item.city_id)
+        if item.trip_id not in owned:
+            results.append(BulkItemResult(index=index, status="error", error="Trip not found"))
+        elif not city:
+            results.append(BulkItemResult(index=index, status="error", error="City not found"))
+        else:
+            stop = Stop(**item.model_dump(), city_name=city['name'], country=city['country'])
+            stop_doc = stop.model_dump()
+            stop_doc['user_id'] = current_user.id
+            pending.append((index, stop, stop_doc))
+    
+    written = await insert_bulk(db.stops, pending, results)
+    await record_stop_cities(db, [stop.city_id for stop in written])
+    for trip_id in {stop.trip_id for stop in written}:
+        await public_trip_cache.invalidate_trip(trip_id)
+    return bulk_result(results)
+
 @api_router.get("/trips/{trip_id}/stops", response_model=List[Stop])
-async def get_stops(trip_id: str, current_user: User = Depends(get_current_user)):
+async def get_stops(
+    trip_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
     # Verify trip ownership
     trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    stops = await db.stops.find({"trip_id": trip_id}, {"_id": 0}).sort("order", 1).to_list(1000)
-    for stop in stops:
-        if isinstance(stop.get('created_at'), str):
-            stop['created_at'] = datetime.fromisoformat(stop['created_at'])
-    return stops
+    if stream:
+        return ndjson_response(db.stops, {"trip_id": trip_id}, STOP_SORT, cursor)
+    
+    stops = await fetch_list(response, db.stops, {"trip_id": trip_id}, STOP_SORT, limit, cursor, Stop)
+    return trusted_response(stops, response)
 
 @api_router.delete("/stops/{stop_id}")
 async def delete_stop(stop_id: str, current_user: User = Depends(get_current_user)):
-    stop = await db.stops.find_one({"id": stop_id}, {"_id": 0})
-    if not stop:
-        raise HTTPException(status_code=404, detail="Stop not found")
+    stop = await find_owned(db.stops, stop_id, current_user.id, "Stop not found")
     
-    # Verify trip ownership
-    trip = await db.trips.find_one({"id": stop['trip_id'], "user_id": current_user.id})
-    if not trip:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
-    await db.stops.delete_one({"id": stop_id})
-    await db.trip_activities.delete_many({"stop_id": stop_id})
+    # Removes the stop and its activities and decrements the budget rollup
+    await delete_stop_cascade(db, stop_id, stop['trip_id'], use_transactions=CASCADE_TRANSACTIONS)
+    await record_stop_cities(db, [stop['city_id']], -1)
+    await public_trip_cache.invalidate_trip(stop['trip_id'])
     
     return {"message": "Stop deleted successfully"}
 
 # ==================== CITY ROUTES ====================
 
 @api_router.get("/cities", response_model=List[City])
-async def search_cities(search: Optional[str] = None, country: Optional[str] = None):
-    query = {}
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"country": {"$regex": search, "$options": "i"}}
-        ]
-    if country:
-        query["country"] = {"$regex": country, "$options": "i"}
-    
-    cities = await db.cities.find(query, {"_id": 0}).sort("popularity", -1).to_list(100)
-    return cities
+async def search_cities(
+    request: Request,
+    response: Response,
+    search: Optional[str] = None,
+    country: Optional[str] = None,
+    q: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=100)
+):
+    not_modified = catalog_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    # search: accent/case-insensitive word-prefix match (typeahead)
+    # q: free-form text search ranked by relevance and popularity
+    if CITY_SEARCH_MEMORY_INDEX and not q and len(city_index):
+        return city_index.search(search, country, limit)
+    return await run_city_search(secondary_db, search=search, country=country, text=q, limit=limit)
 
 @api_router.get("/cities/{city_id}", response_model=City)
-async def get_city(city_id: str):
-    city = await db.cities.find_one({"id": city_id}, {"_id": 0})
+async def get_city(city_id: str, request: Request, response: Response):
+    not_modified = catalog_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    if CATALOG_CACHE:
+        city = await catalog_cache.get_city(secondary_db, city_id)
+    else:
+        city = await secondary_db.cities.find_one({"id": city_id}, {"_id": 0})
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
     return City(**city)
@@ -460,31 +973,52 @@ async def get_city(city_id: str):
 @api_router.get("/cities/{city_id}/activities", response_model=List[ActivityTemplate])
 async def get_city_activities(
     city_id: str,
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
-    max_cost: Optional[float] = None
+    max_cost: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False
 ):
+    not_modified = catalog_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    if CATALOG_CACHE and catalog_cache.loaded and not stream:
+        # Presorted per-city arrays: category picks the array, max_cost and
+        # the cursor are bisects
+        try:
+            after = tuple(decode_cursor(cursor, TEMPLATE_SORT)) if cursor else None
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        activities, has_more = catalog_cache.city_templates(city_id, category, max_cost or None, after, limit)
+        if has_more:
+            response.headers["X-Next-Cursor"] = encode_cursor([activities[-1]['estimated_cost'], activities[-1]['id']])
+        return activities
+    
     query = {"city_id": city_id}
     if category:
         query["category"] = category
     if max_cost:
         query["estimated_cost"] = {"$lte": max_cost}
     
-    activities = await db.activity_templates.find(query, {"_id": 0}).to_list(1000)
+    if stream:
+        return ndjson_response(secondary_db.activity_templates, query, TEMPLATE_SORT, cursor)
+    
+    activities = await fetch_list(response, secondary_db.activity_templates, query, TEMPLATE_SORT, limit, cursor)
     return activities
 
 @api_router.post("/trip-activities", response_model=TripActivity)
 async def add_trip_activity(activity_data: TripActivityCreate, current_user: User = Depends(get_current_user)):
     # Get stop and verify ownership
-    stop = await db.stops.find_one({"id": activity_data.stop_id}, {"_id": 0})
-    if not stop:
-        raise HTTPException(status_code=404, detail="Stop not found")
-    
-    trip = await db.trips.find_one({"id": stop['trip_id'], "user_id": current_user.id})
-    if not trip:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    stop = await find_owned(db.stops, activity_data.stop_id, current_user.id, "Stop not found")
     
     # Get activity template
-    template = await db.activity_templates.find_one({"id": activity_data.activity_template_id}, {"_id": 0})
+    if CATALOG_CACHE:
+        template = await catalog_cache.get_template(secondary_db, activity_data.activity_template_id)
+    else:
+        template = await secondary_db.activity_templates.find_one({"id": activity_data.activity_template_id}, {"_id": 0})
     if not template:
         raise HTTPException(status_code=404, detail="Activity not found")
     
@@ -502,37 +1036,249 @@ async def add_trip_activity(activity_data: TripActivityCreate, current_user: Use
     )
     
     activity_doc = trip_activity.model_dump()
-    activity_doc['created_at'] = activity_doc['created_at'].isoformat()
+    activity_doc['user_id'] = current_user.id
     
     await db.trip_activities.insert_one(activity_doc)
+    await record_activities(db, trip_activity.trip_id, trip_activity.cost)
+    await public_trip_cache.invalidate_trip(trip_activity.trip_id)
     return trip_activity
 
+@api_router.post("/trip-activities/bulk", response_model=BulkResult)
+async def add_trip_activities_bulk(items: List[TripActivityCreate], current_user: User = Depends(get_current_user)):
+    check_bulk_size(items)
+    stops = {
+        stop['id']: stop
+        async for stop in db.stops.find({"id": {"$in": list({item.stop_id for item in items})}}, {"_id": 0})
+    }
+    # Stops carry user_id; only rows predating the backfill need their trip checked
+    owned = {stop_id for stop_id, stop in stops.items() if stop.get('user_id') == current_user.id}
+    legacy = {stop_id: stop['trip_id'] for stop_id, stop in stops.items() if 'user_id' not in stop}
+    if legacy:
+        owned_trips = await owned_trip_ids(current_user.id, legacy.values())
+        owned |= {stop_id for stop_id, trip_id in legacy.items() if trip_id in owned_trips}
+    templates = await lookup_templates([item.activity_template_id for item in items])
+    
+    results, pending = [], []
+    for index, item in enumerate(items):
+        stop = stops.get(item.stop_id)
+        template = templates.get(item.activity_template_id)
+        if not stop:
+            results.append(BulkItemResult(index=index, status="error", error="Stop not found"))
+        elif item.stop_id not in owned:
+            results.append(BulkItemResult(index=index, status="error", error="Not authorized"))
+        elif not template:
+            results.append(BulkItemResult(index=index, status="error", error="Activity not found"))
+        else:
+            trip_activity = TripActivity(
+                trip_id=stop['trip_id'],
+                stop_id=item.stop_id,
+                activity_template_id=item.activity_template_id,
+                activity_name=template['name'],
+                activity_description=template.get('description'),
+                category=template['category'],
+                duration=template['duration'],
+                date=item.date,
+                time=item.time,
+                cost=item.custom_cost if item.custom_cost else template['estimated_cost']
+            )
+            activity_doc = trip_activity.model_dump()
+            activity_doc['user_id'] = current_user.id
+            pending.append((index, trip_activity, activity_doc))
+    
+    written = await insert_bulk(db.trip_activities, pending, results)
+    # One rollup update per trip for the whole batch
+    for trip_id, costs in group_by((activity.trip_id, activity.cost) for activity in written).items():
+        await record_activities(db, trip_id, sum(costs), len(costs))
+        await public_trip_cache.invalidate_trip(trip_id)
+    return bulk_result(results)
+
 @api_router.get("/trips/{trip_id}/activities", response_model=List[TripActivity])
-async def get_trip_activities(trip_id: str, current_user: User = Depends(get_current_user)):
+async def get_trip_activities(
+    trip_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
     # Verify trip ownership
     trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    activities = await db.trip_activities.find({"trip_id": trip_id}, {"_id": 0}).to_list(1000)
-    for activity in activities:
-        if isinstance(activity.get('created_at'), str):
-            activity['created_at'] = datetime.fromisoformat(activity['created_at'])
-    return activities
+    if stream:
+        return ndjson_response(db.trip_activities, {"trip_id": trip_id}, CHILD_SORT, cursor)
+    
+    activities = await fetch_list(response, db.trip_activities, {"trip_id": trip_id}, CHILD_SORT, limit, cursor, TripActivity)
+    return trusted_response(activities, response)
 
 @api_router.delete("/trip-activities/{activity_id}")
 async def delete_trip_activity(activity_id: str, current_user: User = Depends(get_current_user)):
-    activity = await db.trip_activities.find_one({"id": activity_id}, {"_id": 0})
-    if not activity:
-        raise HTTPException(status_code=404, detail="Activity not found")
+    # Ownership is part of the delete filter: one round trip when it matches
+    activity = await db.trip_activities.find_one_and_delete(
+        {"id": activity_id, "user_id": current_user.id}, {"_id": 0, "trip_id": 1, "cost": 1}
+    )
+    if activity is None:
+        activity = await find_owned(db.trip_activities, activity_id, current_user.id, "Activity not found")
+        result = await db.trip_activities.delete_one({"id": activity_id})
+        if not result.deleted_count:
+            activity = None
+    if activity:
+        await record_activities(db, activity['trip_id'], -activity['cost'], -1)
+        await public_trip_cache.invalidate_trip(activity['trip_id'])
+    return {"message": "Activity deleted successfully"}
+
+# ==================== PLANNER ROUTES ====================
+
+# Longer trips are planned in parts; the solver is linear in days
+MAX_PLAN_DAYS = int(os.environ.get('PLANNER_MAX_DAYS', '90'))
+
+@api_router.post("/trips/{trip_id}/plan", response_model=TripPlan)
+async def plan_trip_activities(trip_id: str, request: PlanRequest, current_user: User = Depends(get_current_user)):
+    # Suggests a schedule only; the client adds the activities it keeps
+    # through /trip-activities/bulk
+    trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id}, {"_id": 1})
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    stops = await db.stops.find(
+        {"trip_id": trip_id}, {"_id": 0, "id": 1, "city_id": 1, "start_date": 1, "end_date": 1, "order": 1}
+    ).to_list(None)
+    try:
+        planner_days = trip_days(stops)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Stop dates must be ISO dates")
+    if len(planner_days) > MAX_PLAN_DAYS:
+        raise HTTPException(status_code=400, detail=f"Plans cover at most {MAX_PLAN_DAYS} days")
     
-    # Verify trip ownership
-    trip = await db.trips.find_one({"id": activity['trip_id'], "user_id": current_user.id})
+    index = planner_index
+    if not (CATALOG_CACHE and catalog_cache.loaded):
+        index = PlannerIndex()
+        index.build(await secondary_db.activity_templates.find(
+            {"city_id": {"$in": list({stop['city_id'] for stop in stops})}}, {"_id": 0}
+        ).to_list(None))
+    
+    with PLANNER_DURATION.time():
+        return plan_trip(index, stops, request.budget, request.preferences, request.hours_per_day)
+
+# ==================== FORECAST ROUTES ====================
+
+# Projected spend from City.cost_index (see forecast.py), as opposed to the
+# budget endpoints, which sum what has been entered
+FORECAST_BATCH_MAX = int(os.environ.get('FORECAST_BATCH_MAX', '10000'))
+
+async def current_city_costs() -> CityCosts:
+    if CATALOG_CACHE and catalog_cache.loaded:
+        return city_costs
+    costs = CityCosts()
+    costs.build(await secondary_db.cities.find(
+        {}, {"_id": 0, "id": 1, "name": 1, "country": 1, "cost_index": 1}
+    ).to_list(None))
+    return costs
+
+@api_router.get("/trips/{trip_id}/forecast", response_model=TripForecast)
+async def get_trip_forecast(trip_id: str, current_user: User = Depends(get_current_user)):
+    trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id}, {"_id": 1})
     if not trip:
-        raise HTTPException(status_code=403, detail="Not authorized")
+        raise HTTPException(status_code=404, detail="Trip not found")
+    stops = await db.stops.find(
+        {"trip_id": trip_id}, {"_id": 0, "id": 1, "city_id": 1, "city_name": 1, "start_date": 1, "end_date": 1, "order": 1}
+    ).to_list(None)
+    try:
+        return forecast_trip(await current_city_costs(), stops)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Stop dates must be ISO dates")
+
+@api_router.get("/forecast/cities", response_model=List[CityForecast])
+async def get_cheapest_cities(
+    days: Optional[int] = Query(None, ge=1, le=365),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)
+):
+    # "Cheapest cities for my dates": every city scored for the same stay
+    if days is None:
+        if not (start_date and end_date):
+            raise HTTPException(status_code=400, detail="Pass days or start_date and end_date")
+        try:
+            days = (datetime.fromisoformat(end_date[:10]) - datetime.fromisoformat(start_date[:10])).days + 1
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be ISO dates")
+        if not 1 <= days <= 365:
+            raise HTTPException(status_code=400, detail="Stays must be 1 to 365 days")
+    return (await current_city_costs()).cheapest(days, limit)
+
+@api_router.post("/forecast/batch", response_model=ForecastBatchResult)
+async def forecast_batch(batch: ForecastBatch):
+    if len(batch.city_ids) != len(batch.days):
+        raise HTTPException(status_code=400, detail="city_ids and days must have the same length")
+    if len(batch.city_ids) > FORECAST_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {FORECAST_BATCH_MAX} candidates per batch")
+    totals = (await current_city_costs()).score(batch.city_ids, batch.days, batch.baselines)
+    return {"totals": [None if total != total else total for total in totals.tolist()]}
+
+# ==================== RECOMMENDATION ROUTES ====================
+
+@api_router.get("/stops/{stop_id}/recommendations", response_model=List[Recommendation])
+async def get_stop_recommendations(
+    stop_id: str,
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    # The stop and what it already holds are read fresh (ownership, and the
+    # user may have just added something); ranking is in memory against
+    # the city's cached templates
+    stop, seed_ids = await asyncio.gather(
+        find_owned(db.stops, stop_id, current_user.id, "Stop not found"),
+        db.trip_activities.distinct("activity_template_id", {"stop_id": stop_id})
+    )
+    if CATALOG_CACHE and catalog_cache.loaded:
+        candidates, _ = catalog_cache.city_templates(stop['city_id'], category)
+    else:
+        query = {"city_id": stop['city_id']}
+        if category:
+            query["category"] = category
+        candidates = await secondary_db.activity_templates.find(query, {"_id": 0}).sort(TEMPLATE_SORT).to_list(None)
     
-    await db.trip_activities.delete_one({"id": activity_id})
-    return {"message": "Activity deleted successfully"}
+    ranked = recommendation_index.recommend(seed_ids, candidates, limit)
+    return [{"activity": template, "score": score} for template, score in ranked]
+
+# ==================== EXPORT ROUTES ====================
+
+EXPORT_FORMAT_PATTERN = "^(ndjson|csv|ics)$"
+
+def export_response(records, fmt: str, compress: bool, filename: str, calendar_name: Optional[str] = None) -> StreamingResponse:
+    # Rows are encoded and, with gzip=true, compressed as the cursors yield
+    # them; nothing is buffered beyond one chunk
+    body = encode(records, fmt, calendar_name)
+    filename = f"{filename}.{fmt}"
+    media_type = EXPORT_FORMATS[fmt]
+    if compress:
+        body = gzipped(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@api_router.get("/trips/{trip_id}/export")
+async def export_trip(
+    trip_id: str,
+    format: str = Query("ndjson", pattern=EXPORT_FORMAT_PATTERN),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id}, {"_id": 0})
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return export_response(trip_records(db, trip), format, gzip, f"trip-{trip_id}", trip['name'])
+
+@api_router.get("/account/export")
+async def export_account(
+    format: str = Query("ndjson", pattern=EXPORT_FORMAT_PATTERN),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    # Every trip of the account, one after the other
+    return export_response(account_records(db, current_user.id), format, gzip, "globetrotter-export", "GlobeTrotter")
 
 # ==================== EXPENSE ROUTES ====================
 
@@ -545,55 +1291,72 @@ async def create_expense(expense_data: ExpenseCreate, current_user: User = Depen
     
     expense = Expense(**expense_data.model_dump())
     expense_doc = expense.model_dump()
-    expense_doc['created_at'] = expense_doc['created_at'].isoformat()
+    expense_doc['user_id'] = current_user.id
     
     await db.expenses.insert_one(expense_doc)
+    await record_expense(db, expense.trip_id, expense.category, expense.amount)
     return expense
 
+@api_router.post("/expenses/bulk", response_model=BulkResult)
+async def create_expenses_bulk(items: List[ExpenseCreate], current_user: User = Depends(get_current_user)):
+    check_bulk_size(items)
+    owned = await owned_trip_ids(current_user.id, [item.trip_id for item in items])
+    
+    results, pending = [], []
+    for index, item in enumerate(items):
+        if item.trip_id not in owned:
+            results.append(BulkItemResult(index=index, status="error", error="Trip not found"))
+        else:
+            expense = Expense(**item.model_dump())
+            expense_doc = expense.model_dump()
+            expense_doc['user_id'] = current_user.id
+            pending.append((index, expense, expense_doc))
+    
+    written = await insert_bulk(db.expenses, pending, results)
+    for trip_id, expenses in group_by((expense.trip_id, (expense.category, expense.amount)) for expense in written).items():
+        await record_expenses(db, trip_id, expenses)
+    return bulk_result(results)
+
 @api_router.get("/trips/{trip_id}/expenses", response_model=List[Expense])
-async def get_trip_expenses(trip_id: str, current_user: User = Depends(get_current_user)):
+async def get_trip_expenses(
+    trip_id: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    current_user: User = Depends(get_current_user)
+):
     # Verify trip ownership
     trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    expenses = await db.expenses.find({"trip_id": trip_id}, {"_id": 0}).to_list(1000)
-    for expense in expenses:
-        if isinstance(expense.get('created_at'), str):
-            expense['created_at'] = datetime.fromisoformat(expense['created_at'])
-    return expenses
+    if stream:
+        return ndjson_response(db.expenses, {"trip_id": trip_id}, CHILD_SORT, cursor)
+    
+    expenses = await fetch_list(response, db.expenses, {"trip_id": trip_id}, CHILD_SORT, limit, cursor, Expense)
+    return trusted_response(expenses, response)
 
 @api_router.get("/trips/{trip_id}/budget")
-async def get_trip_budget(trip_id: str, current_user: User = Depends(get_current_user)):
+async def get_trip_budget(trip_id: str, group_by: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if group_by and group_by not in BUDGET_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(BUDGET_GROUPINGS)}")
+    
+    # The rollup is scoped to the owner, so a hit doubles as the ownership check
+    if not group_by:
+        budget = await read_budget(db, trip_id, current_user.id)
+        if budget is not None:
+            return budget
+    
     # Verify trip ownership
     trip = await db.trips.find_one({"id": trip_id, "user_id": current_user.id})
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
     
-    # Get all activities cost
-    activities = await db.trip_activities.find({"trip_id": trip_id}, {"_id": 0}).to_list(1000)
-    activities_cost = sum(a['cost'] for a in activities)
-    
-    # Get all expenses
-    expenses = await db.expenses.find({"trip_id": trip_id}, {"_id": 0}).to_list(1000)
-    
-    # Calculate breakdown
-    breakdown = {
-        "transport": sum(e['amount'] for e in expenses if e['category'] == 'transport'),
-        "accommodation": sum(e['amount'] for e in expenses if e['category'] == 'accommodation'),
-        "food": sum(e['amount'] for e in expenses if e['category'] == 'food'),
-        "activities": activities_cost + sum(e['amount'] for e in expenses if e['category'] == 'activities'),
-        "other": sum(e['amount'] for e in expenses if e['category'] == 'other')
-    }
-    
-    total = sum(breakdown.values())
-    
-    return {
-        "total": total,
-        "breakdown": breakdown,
-        "activities_count": len(activities),
-        "expenses_count": len(expenses)
-    }
+    # Totals are grouped server-side, no documents are transferred
+    if not group_by:
+        return await rebuild_rollup(db, trip_id, current_user.id)
+    return await compute_budget(db, trip_id, group_by)
 
 # ==================== COMMUNITY ROUTES ====================
 
@@ -605,54 +1368,158 @@ async def create_post(post_data: PostCreate, current_user: User = Depends(get_cu
         user_name=f"{current_user.first_name} {current_user.last_name}"
     )
     post_doc = post.model_dump()
-    post_doc['created_at'] = post_doc['created_at'].isoformat()
     
     await db.posts.insert_one(post_doc)
+    feed_cache.clear()
     return post
 
 @api_router.get("/posts", response_model=List[Post])
-async def get_posts(limit: int = 50):
-    posts = await db.posts.find({}, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
-    for post in posts:
-        if isinstance(post.get('created_at'), str):
-            post['created_at'] = datetime.fromisoformat(post['created_at'])
-    return posts
+async def get_posts(
+    response: Response,
+    before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False
+):
+    # before: only posts created earlier than this timestamp
+    if stream:
+        return ndjson_response(db.posts, feed_query(before), FEED_SORT, cursor)
+    
+    try:
+        posts, next_cursor = await fetch_feed(db, feed_cache, like_buffer, before, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return trusted_response(posts, response)
 
 @api_router.post("/posts/{post_id}/like")
 async def like_post(post_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.posts.update_one({"id": post_id}, {"$inc": {"likes": 1}})
-    if result.matched_count == 0:
+    liked = await record_like(db, like_buffer, post_id, current_user.id)
+    if liked is None:
         raise HTTPException(status_code=404, detail="Post not found")
+    if not liked:
+        return {"message": "Post already liked"}
     return {"message": "Post liked"}
 
+@api_router.delete("/posts/{post_id}/like")
+async def unlike_post(post_id: str, current_user: User = Depends(get_current_user)):
+    if not await remove_like(db, like_buffer, post_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Like not found")
+    return {"message": "Like removed"}
+
 # ==================== ADMIN ROUTES ====================
 
 @api_router.get("/admin/stats")
-async def get_admin_stats(current_user: User = Depends(get_current_user)):
+async def get_admin_stats(fresh: bool = False, current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    users_count = await db.users.count_documents({})
-    trips_count = await db.trips.count_documents({})
-    activities_count = await db.trip_activities.count_documents({})
-    posts_count = await db.posts.count_documents({})
+    # Served from the snapshot; fresh=true rebuilds it first
+    if fresh:
+        return await admin_stats.refresh(db)
+    return await admin_stats.get(db)
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Top cities
-    pipeline = [
-        {"$group": {"_id": "$city_id", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    top_cities = await db.stops.aggregate(pipeline).to_list(10)
+    return {
+        "principals": principal_cache.stats(),
+        "catalog": catalog_cache.stats(),
+        "public_trips": public_trip_cache.stats(),
+        "feed": feed_cache.stats(),
+        "likes": like_buffer.stats(),
+        "recommendations": recommendation_index.stats()
+    }
+
+@api_router.get("/admin/db-pool")
+async def get_db_pool_stats(current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
     
+    options = client.options.pool_options
     return {
-        "users_count": users_count,
-        "trips_count": trips_count,
-        "activities_count": activities_count,
-        "posts_count": posts_count,
-        "top_cities": top_cities
+        "max_pool_size": options.max_pool_size,
+        "min_pool_size": options.min_pool_size,
+        **pool_metrics.stats()
     }
 
+@api_router.get("/admin/catalog/{collection}/export")
+async def export_catalog(
+    collection: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if collection not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown catalog collection")
+    
+    # Streamed in chunks, the same files catalog_io.py imports
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_chunks(secondary_db, collection, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
+
+# ==================== METRICS ====================
+
+# Prometheus text at /metrics (outside /api, no auth; keep it off the public
+# ingress). SLOW_REQUEST_SECONDS > 0 logs slower requests with their Mongo
+# commands.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', '0'))
+
+def pool_metric_families() -> list:
+    stats = pool_metrics.stats()
+    checkouts = Counter("mongo_pool_checkouts_total", "Connections checked out of the Mongo pool")
+    checkouts.inc(stats["checkouts"])
+    failures = Counter("mongo_pool_checkout_failures_total", "Failed pool check-outs by reason")
+    for reason, count in stats["checkout_failures"].items():
+        failures.inc(count, reason=reason)
+    in_use = Gauge("mongo_pool_in_use", "Connections currently checked out")
+    in_use.set(stats["in_use"])
+    open_connections = Gauge("mongo_pool_open_connections", "Open pooled connections")
+    open_connections.set(stats["open_connections"])
+    clears = Counter("mongo_pool_clears_total", "Times the Mongo pool was cleared")
+    clears.inc(stats["pool_clears"])
+    wait_sum = Counter("mongo_pool_wait_seconds_total", "Total time spent waiting for a pooled connection")
+    wait_sum.inc(stats["wait_seconds"]["sum"])
+    wait_max = Gauge("mongo_pool_wait_seconds_max", "Longest wait for a pooled connection")
+    wait_max.set(stats["wait_seconds"]["max"])
+    return [checkouts, failures, in_use, open_connections, clears, wait_sum, wait_max]
+
+if METRICS_ENABLED:
+    instrument_serialization()
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return Response(render_metrics(extra=pool_metric_families()), media_type="text/plain; version=0.0.4")
+
+# ==================== HEALTH ====================
+
+# Liveness: the process is serving. Readiness: startup (indexes, caches,
+# pool warm-up) has finished, the worker isn't draining after SIGTERM (see
+# launcher.py) and MongoDB answers a ping.
+READINESS_TIMEOUT_SECONDS = float(os.environ.get('READINESS_TIMEOUT_SECONDS', '2'))
+
+@app.get("/healthz", include_in_schema=False)
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readiness():
+    if not lifecycle.ready:
+        return ORJSONResponse({"status": "not ready", **lifecycle.status()}, status_code=503)
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), READINESS_TIMEOUT_SECONDS)
+    except (PyMongoError, asyncio.TimeoutError):
+        return ORJSONResponse({"status": "database unavailable", **lifecycle.status()}, status_code=503)
+    return {"status": "ready", **lifecycle.status()}
+
 # ==================== BASIC ROUTE ====================
 
 @api_router.get("/")
@@ -668,8 +1535,13 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Added last so it wraps everything, including CORS preflights
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, slow_request_seconds=SLOW_REQUEST_SECONDS)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -677,6 +1549,108 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# ==================== LIFESPAN ====================
+
+def open_resources(mongo_client: Optional[AsyncIOMotorClient] = None):
+    # Idempotent, so scripts and benchmarks can open resources (optionally
+    # around their own client) before running the lifespan. The command
+    # listener attributes Mongo round trips to the request that issued
+    # them (/metrics).
+    global client, db, secondary_db, password_hasher, catalog_cache, city_index, planner_index
+    global city_costs, recommendation_index
+    global public_trip_cache, like_buffer, feed_cache, admin_stats, principal_cache
+    if client is not None:
+        return
+    client = mongo_client or create_client(listeners=[command_listener])
+    db = client[os.environ['DB_NAME']]
+    secondary_db = secondary_database(client, os.environ['DB_NAME'])
+    password_hasher = PasswordHasher(
+        kind=os.environ.get('PASSWORD_POOL_KIND', 'thread'),
+        workers=int(os.environ['PASSWORD_POOL_WORKERS']) if os.environ.get('PASSWORD_POOL_WORKERS') else None,
+        max_pending=int(os.environ['PASSWORD_POOL_MAX_PENDING']) if os.environ.get('PASSWORD_POOL_MAX_PENDING') else None,
+    )
+    catalog_cache = CatalogCache()
+    city_index = CityPrefixIndex()
+    planner_index = PlannerIndex()
+    city_costs = CityCosts()
+    recommendation_index = RecommendationIndex()
+    public_trip_cache = PublicTripCache(
+        ttl=PUBLIC_TRIP_CACHE_TTL,
+        max_size=PUBLIC_TRIP_CACHE_SIZE,
+        channel=RedisInvalidationChannel(PUBLIC_TRIP_CACHE_REDIS_URL) if PUBLIC_TRIP_CACHE_REDIS_URL else None,
+        revalidate=still_public,
+        revalidate_interval=PUBLIC_TRIP_REVALIDATE_SECONDS,
+    )
+    like_buffer = LikeBuffer()
+    feed_cache = FeedCache(ttl=FEED_CACHE_TTL)
+    admin_stats = AdminStats()
+    principal_cache = PrincipalCache(
+        ttl=PRINCIPAL_CACHE_TTL,
+        max_size=PRINCIPAL_CACHE_SIZE,
+        backend=RedisPrincipalBackend(PRINCIPAL_CACHE_REDIS_URL, ttl=int(PRINCIPAL_CACHE_TTL))
+        if PRINCIPAL_CACHE_REDIS_URL else None,
+        dumps=lambda user: user.model_dump_json().encode(),
+        loads=User.model_validate_json,
+    )
+
+async def close_resources():
+    global client, db, secondary_db, password_hasher
+    if client is None:
+        return
+    await principal_cache.close()
+    await public_trip_cache.close()
+    await like_buffer.flush(db)
+    password_hasher.shutdown()
+    client.close()
+    client = db = secondary_db = password_hasher = None
+
+async def start_worker():
+    # Runs in order; /readyz only passes once every step has finished
+    if not SECRET_KEY:
+        raise RuntimeError("SECRET_KEY is not set (environment or backend/.env)")
+    open_resources()
+    # Opens MONGO_MIN_POOL_SIZE connections (at least one) before serving
+    await warm_up(client)
+    if os.environ.get('ENSURE_INDEXES', 'true').lower() == 'true':
+        await ensure_indexes(db)
+    
+    await backfill_search_fields(db)
+    if CATALOG_CACHE or CITY_SEARCH_MEMORY_INDEX:
+        await refresh_catalog()
+        background_tasks.append(asyncio.create_task(catalog_refresher()))
+    
+    # String created_at values left from before BSON dates. Runs once per
+    # database (recorded in the migrations collection); a failure is
+    # logged and retried on the next start rather than blocking this one
+    try:
+        result = await convert_native_dates(db)
+        if result:
+            logger.info(f"Converted string created_at values: {result}")
+    except PyMongoError as e:
+        logger.error(f"created_at migration failed: {e}")
+    try:
+        if await bootstrap_counters(db):
+            logger.info("Built city_stop_counts and daily_stats from source")
+    except PyMongoError as e:
+        logger.error(f"Admin counter bootstrap failed: {e}")
+    await ensure_like_index(db)
+    background_tasks.append(asyncio.create_task(like_flusher()))
+    background_tasks.append(asyncio.create_task(admin_stats_refresher()))
+    background_tasks.append(asyncio.create_task(cascade_reaper()))
+    try:
+        await refresh_index(secondary_db, recommendation_index)
+    except Exception as e:
+        # Until a model loads, recommendations fall back to catalog order
+        logger.warning(f"Recommendation model load failed: {e}")
+    background_tasks.append(asyncio.create_task(recommendations_refresher()))
+    await principal_cache.start()
+    await public_trip_cache.start()
+    await password_hasher.warm_up()
+    lifecycle.mark_ready()
+
+async def stop_worker():
+    lifecycle.start_draining()
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await close_resources()
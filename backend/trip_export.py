@@ -0,0 +1,219 @@
+import csv
+import io
+import logging
+import re
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from pagination import STREAM_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Streaming exports of a trip, or of every trip in an account.
+#
+# Records come straight off Motor cursors over trips, stops, trip_activities
+# and expenses, one trip at a time, in the same index-backed orders as the
+# listing endpoints. Only the stops of the current trip are held (activity
+# rows need their city), so memory stays flat however many activities an
+# account has. Encoders turn records into byte chunks of CHUNK_ROWS rows
+# and gzipped() compresses those chunks as they go out.
+
+CHUNK_ROWS = 500
+GZIP_LEVEL = 6
+
+TRIP_SORT = [("created_at", 1), ("id", 1)]
+STOP_SORT = [("order", 1), ("id", 1)]
+CHILD_SORT = [("created_at", 1), ("id", 1)]
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv", "ics": "text/calendar"}
+
+Record = Tuple[str, dict, Optional[dict]]
+
+# ==================== RECORDS ====================
+
+def _find(collection, query: dict, sort):
+    return collection.find(query, {"_id": 0}).sort(sort).batch_size(STREAM_BATCH_SIZE)
+
+async def trip_records(db, trip: dict) -> AsyncIterator[Record]:
+    # (type, document, stop) for the trip, its stops, activities and
+    # expenses; stop is the activity's stop, None otherwise
+    yield "trip", trip, None
+    stops: Dict[str, dict] = {}
+    async for stop in _find(db.stops, {"trip_id": trip['id']}, STOP_SORT):
+        stops[stop['id']] = stop
+        yield "stop", stop, None
+    async for activity in _find(db.trip_activities, {"trip_id": trip['id']}, CHILD_SORT):
+        yield "activity", activity, stops.get(activity['stop_id'])
+    async for expense in _find(db.expenses, {"trip_id": trip['id']}, CHILD_SORT):
+        yield "expense", expense, None
+
+async def account_records(db, user_id: str) -> AsyncIterator[Record]:
+    async for trip in _find(db.trips, {"user_id": user_id}, TRIP_SORT):
+        async for record in trip_records(db, trip):
+            yield record
+
+# ==================== ENCODERS ====================
+
+async def _chunks(lines: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer: List[bytes] = []
+    async for line in lines:
+        buffer.append(line)
+        if len(buffer) >= CHUNK_ROWS:
+            yield b"".join(buffer)
+            buffer = []
+    if buffer:
+        yield b"".join(buffer)
+
+async def _ndjson_lines(records: AsyncIterator[Record]) -> AsyncIterator[bytes]:
+    async for kind, doc, _ in records:
+        yield orjson.dumps({"type": kind, **doc}, option=orjson.OPT_APPEND_NEWLINE)
+
+CSV_FIELDS = [
+    "type", "trip_id", "id", "stop_id", "name", "city", "country", "category",
+    "start_date", "end_date", "time", "duration", "amount", "status", "description",
+]
+
+def csv_row(kind: str, doc: dict, stop: Optional[dict]) -> list:
+    # One column layout for every record type, blank where it doesn't apply
+    if kind == "trip":
+        row = {"trip_id": doc['id'], "name": doc['name'], "start_date": doc['start_date'],
+               "end_date": doc['end_date'], "status": doc.get('status'), "description": doc.get('description')}
+    elif kind == "stop":
+        row = {"trip_id": doc['trip_id'], "name": doc['city_name'], "city": doc['city_name'], "country": doc['country'],
+               "start_date": doc['start_date'], "end_date": doc['end_date']}
+    elif kind == "activity":
+        row = {"trip_id": doc['trip_id'], "stop_id": doc['stop_id'], "name": doc['activity_name'],
+               "city": stop['city_name'] if stop else None, "country": stop['country'] if stop else None,
+               "category": doc['category'], "start_date": doc['date'], "time": doc.get('time'),
+               "duration": doc['duration'], "amount": doc['cost'], "description": doc.get('activity_description')}
+    else:
+        row = {"trip_id": doc['trip_id'], "category": doc['category'], "start_date": doc['date'],
+               "amount": doc['amount'], "description": doc.get('description')}
+    row.update(type=kind, id=doc['id'])
+    return ["" if row.get(field) is None else row[field] for field in CSV_FIELDS]
+
+async def _csv_lines(records: AsyncIterator[Record]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+
+    def line(row: Iterable) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue().encode()
+
+    yield line(CSV_FIELDS)
+    async for kind, doc, stop in records:
+        yield line(csv_row(kind, doc, stop))
+
+# iCalendar (RFC 5545): trips and stops as all-day events, activities at
+# their time when they have one (floating local time, the city's), all-day
+# otherwise. Expenses have no place in a calendar and are skipped.
+
+ICS_PRODID = "-//GlobeTrotter//Trip export//EN"
+TIME_PATTERN = re.compile(r"^(\d{1,2}):(\d{2})")
+
+def _ics_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+def _ics_fold(line: str) -> bytes:
+    # Lines over 75 octets continue on the next line after a space, split
+    # between (not inside) UTF-8 sequences
+    raw = line.encode()
+    if len(raw) <= 75:
+        return raw + b"\r\n"
+    parts, start, limit = [], 0, 75
+    while len(raw) - start > limit:
+        end = start + limit
+        while raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end])
+        start, limit = end, 74
+    parts.append(raw[start:])
+    return b"\r\n ".join(parts) + b"\r\n"
+
+def _ics_date(value) -> Optional[date]:
+    # Dates are free-form strings on trips and stops; None if not ISO
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+def _ics_stamp(value) -> str:
+    if not isinstance(value, datetime):
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def ics_event(kind: str, doc: dict, stop: Optional[dict]) -> Optional[bytes]:
+    # None for expenses, and for records whose dates can't be placed on a
+    # calendar: the headers are already out, so they are logged and left
+    # out rather than failing the stream
+    if kind == "expense":
+        return None
+    dates = [doc.get('date')] if kind == "activity" else [doc.get('start_date'), doc.get('end_date')]
+    if any(_ics_date(value) is None for value in dates):
+        logger.warning(f"ICS export skipped {kind} {doc['id']}: dates {dates!r} are not ISO dates")
+        return None
+    lines = ["BEGIN:VEVENT", f"UID:{kind}-{doc['id']}@globetrotter", f"DTSTAMP:{_ics_stamp(doc.get('created_at'))}"]
+    if kind == "activity":
+        day = _ics_date(doc['date'])
+        match = TIME_PATTERN.match(doc.get('time') or "")
+        if match and int(match.group(1)) < 24 and int(match.group(2)) < 60:
+            start = datetime(day.year, day.month, day.day, int(match.group(1)), int(match.group(2)))
+            lines += [f"DTSTART:{start:%Y%m%dT%H%M%S}", f"DURATION:PT{max(int(doc['duration']), 0)}H"]
+        else:
+            lines += [f"DTSTART;VALUE=DATE:{day:%Y%m%d}", f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}"]
+        summary = doc['activity_name']
+        location = f"{stop['city_name']}, {stop['country']}" if stop else None
+        description = doc.get('activity_description')
+        lines.append(f"CATEGORIES:{_ics_text(doc['category'])}")
+    else:
+        # DTEND is exclusive for all-day events
+        start, end = _ics_date(doc['start_date']), _ics_date(doc['end_date'])
+        lines += [f"DTSTART;VALUE=DATE:{start:%Y%m%d}", f"DTEND;VALUE=DATE:{max(end, start) + timedelta(days=1):%Y%m%d}"]
+        if kind == "trip":
+            summary, location, description = doc['name'], None, doc.get('description')
+        else:
+            summary = location = f"{doc['city_name']}, {doc['country']}"
+            description = None
+    lines.append(f"SUMMARY:{_ics_text(summary)}")
+    if location:
+        lines.append(f"LOCATION:{_ics_text(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_ics_text(description)}")
+    lines.append("END:VEVENT")
+    return b"".join(_ics_fold(line) for line in lines)
+
+async def _ics_lines(records: AsyncIterator[Record], calendar_name: Optional[str]) -> AsyncIterator[bytes]:
+    header = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{ICS_PRODID}", "CALSCALE:GREGORIAN"]
+    if calendar_name:
+        header.append(f"X-WR-CALNAME:{_ics_text(calendar_name)}")
+    yield b"".join(_ics_fold(line) for line in header)
+    async for kind, doc, stop in records:
+        event = ics_event(kind, doc, stop)
+        if event:
+            yield event
+    yield _ics_fold("END:VCALENDAR")
+
+def encode(records: AsyncIterator[Record], fmt: str, calendar_name: Optional[str] = None) -> AsyncIterator[bytes]:
+    if fmt == "csv":
+        lines = _csv_lines(records)
+    elif fmt == "ics":
+        lines = _ics_lines(records, calendar_name)
+    else:
+        lines = _ndjson_lines(records)
+    return _chunks(lines)
+
+async def gzipped(chunks: AsyncIterator[bytes], level: int = GZIP_LEVEL) -> AsyncIterator[bytes]:
+    # gzip framing (wbits 31) over a single deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { getTrip, getStops, getTripActivities, getTripBudget, createStop, deleteStop, addTripActivity, deleteTripActivity, searchCities, getCityActivities } from '@/utils/api';
+import { getTripFull, getRemainingPages, createStop, deleteStop, addTripActivity, deleteTripActivity, searchCities, getCityActivities } from '@/utils/api';
 import Navbar from '@/components/Navbar';
 import { Button } from '@/components/ui/button';
 import { Card, CardHeader, CardTitle, CardContent } from '@/components/ui/card';
@@ -52,16 +52,17 @@ const TripDetail = () => {
 
   const loadTripData = async () => {
     try {
-      const [tripData, stopsData, activitiesData, budgetData] = await Promise.all([
-        getTrip(tripId),
-        getStops(tripId),
-        getTripActivities(tripId),
-        getTripBudget(tripId)
+      const data = await getTripFull(tripId);
+      // Large trips come back with the first page of each list
+      const cursors = data.next_cursors || {};
+      const [moreStops, moreActivities] = await Promise.all([
+        getRemainingPages(`/trips/${tripId}/stops`, cursors.stops),
+        getRemainingPages(`/trips/${tripId}/activities`, cursors.activities),
       ]);
-      setTrip(tripData);
-      setStops(stopsData);
-      setActivities(activitiesData);
-      setBudget(budgetData);
+      setTrip(data.trip);
+      setStops([...data.stops, ...moreStops]);
+      setActivities([...data.activities, ...moreActivities]);
+      setBudget(data.budget);
     } catch (error) {
       toast.error('Failed to load trip data');
     } finally {
@@ -46,6 +46,22 @@ export const getTrip = async (tripId) => {
   return response.data;
 };
 
+export const getTripFull = async (tripId) => {
+  const response = await axios.get(`${API}/trips/${tripId}/full`, { headers: getAuthHeader() });
+  return response.data;
+};
+
+// Follows a listing's X-Next-Cursor pages from `cursor` to the end
+export const getRemainingPages = async (path, cursor) => {
+  const items = [];
+  while (cursor) {
+    const response = await axios.get(`${API}${path}`, { headers: getAuthHeader(), params: { cursor } });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  }
+  return items;
+};
+
 export const updateTrip = async (tripId, data) => {
   const response = await axios.put(`${API}/trips/${tripId}`, data, { headers: getAuthHeader() });
   return response.data;
@@ -72,6 +88,11 @@ export const createStop = async (stopData) => {
   return response.data;
 };
 
+export const createStopsBulk = async (stops) => {
+  const response = await axios.post(`${API}/stops/bulk`, stops, { headers: getAuthHeader() });
+  return response.data;
+};
+
 export const getStops = async (tripId) => {
   const response = await axios.get(`${API}/trips/${tripId}/stops`, { headers: getAuthHeader() });
   return response.data;
@@ -110,6 +131,11 @@ export const addTripActivity = async (activityData) => {
   return response.data;
 };
 
+export const addTripActivitiesBulk = async (activities) => {
+  const response = await axios.post(`${API}/trip-activities/bulk`, activities, { headers: getAuthHeader() });
+  return response.data;
+};
+
 export const getTripActivities = async (tripId) => {
   const response = await axios.get(`${API}/trips/${tripId}/activities`, { headers: getAuthHeader() });
   return response.data;
@@ -126,6 +152,11 @@ export const createExpense = async (expenseData) => {
   return response.data;
 };
 
+export const createExpensesBulk = async (expenses) => {
+  const response = await axios.post(`${API}/expenses/bulk`, expenses, { headers: getAuthHeader() });
+  return response.data;
+};
+
 export const getTripExpenses = async (tripId) => {
   const response = await axios.get(`${API}/trips/${tripId}/expenses`, { headers: getAuthHeader() });
   return response.data;
@@ -152,6 +183,11 @@ export const likePost = async (postId) => {
   return response.data;
 };
 
+export const unlikePost = async (postId) => {
+  const response = await axios.delete(`${API}/posts/${postId}/like`, { headers: getAuthHeader() });
+  return response.data;
+};
+
 // Admin APIs
 export const getAdminStats = async () => {
   const response = await axios.get(`${API}/admin/stats`, { headers: getAuthHeader() });
@@ -0,0 +1,48 @@
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+load_dotenv(BACKEND_DIR / '.env')
+
+# Checked once per session
+_reachable = None
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db():
+    # A throwaway database on MONGO_URL; the tests are skipped without a server
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo.errors import PyMongoError
+
+    global _reachable
+    if _reachable is False:
+        pytest.skip("MongoDB is not reachable at MONGO_URL")
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'), serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+        _reachable = True
+    except PyMongoError:
+        _reachable = False
+        client.close()
+        pytest.skip("MongoDB is not reachable at MONGO_URL")
+    name = f"{os.environ.get('DB_NAME', 'globetrotter_db')}_test_{uuid.uuid4().hex[:8]}"
+    yield client[name]
+    await client.drop_database(name)
+    client.close()
+
+@pytest.fixture
+def mock_db():
+    # In-memory database for tests that only need plain reads and writes;
+    # mongomock lacks $lookup sub-pipelines, $unionWith and GridFS
+    from mongomock_motor import AsyncMongoMockClient
+
+    return AsyncMongoMockClient()["test"]
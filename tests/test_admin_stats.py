@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import admin_stats
+
+pytestmark = pytest.mark.anyio
+
+async def test_bootstrap_rebuilds_once(mock_db, monkeypatch):
+    rebuilds = []
+
+    async def rebuild(db):
+        rebuilds.append(db)
+    monkeypatch.setattr(admin_stats, "rebuild_counters", rebuild)
+
+    assert await admin_stats.bootstrap_counters(mock_db) is True
+    assert await admin_stats.bootstrap_counters(mock_db) is False
+    assert len(rebuilds) == 1
+
+async def test_counter_hooks(mock_db):
+    await admin_stats.record_stop_cities(mock_db, ["paris", "paris", "rome"])
+    await admin_stats.record_stop_cities(mock_db, ["paris"], -1)
+    counts = {row['_id']: row['count'] async for row in mock_db.city_stop_counts.find({})}
+    assert counts == {"paris": 1, "rome": 1}
+
+    when = datetime(2025, 6, 1, 23, 30, tzinfo=timezone.utc)
+    await admin_stats.record_daily(mock_db, "signups", when=when)
+    await admin_stats.record_daily(mock_db, "signups", when=when)
+    assert await mock_db.daily_stats.find_one({"_id": "2025-06-01"}) == {"_id": "2025-06-01", "signups": 2}
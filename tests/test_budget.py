@@ -0,0 +1,131 @@
+import uuid
+
+import pytest
+
+from budget import compute_budget
+from pipelines import EXPENSE_CATEGORIES
+
+pytestmark = pytest.mark.anyio
+
+TRIP_ID = "trip-1"
+
+STOPS = [
+    {"id": "stop-a", "trip_id": TRIP_ID, "city_name": "Paris", "start_date": "2025-06-01", "end_date": "2025-06-03", "order": 0},
+    # Shares 2025-06-03 with Paris; that day's expenses go to the first stop
+    {"id": "stop-b", "trip_id": TRIP_ID, "city_name": "Rome", "start_date": "2025-06-03", "end_date": "2025-06-06", "order": 1},
+]
+
+ACTIVITIES = [
+    ("stop-a", "2025-06-01", 30.0),
+    ("stop-a", "2025-06-02", 12.5),
+    ("stop-b", "2025-06-03", 20.0),
+    ("stop-b", "2025-06-05", 45.0),
+    # Its stop was removed
+    ("stop-gone", "2025-06-04", 8.0),
+]
+
+EXPENSES = [
+    ("transport", "2025-06-01", 120.0),
+    ("accommodation", "2025-06-02", 200.0),
+    ("food", "2025-06-03", 35.5),
+    ("activities", "2025-06-05", 15.0),
+    ("other", "2025-06-06", 4.0),
+    # Outside every stop
+    ("food", "2025-06-10", 9.0),
+    # Counted but not totalled
+    ("souvenirs", "2025-06-02", 50.0),
+]
+
+async def seed(db):
+    await db.stops.insert_many([dict(stop) for stop in STOPS])
+    await db.trip_activities.insert_many([{
+        "id": str(uuid.uuid4()), "trip_id": TRIP_ID, "stop_id": stop_id, "activity_name": "Activity",
+        "category": "sightseeing", "duration": 2, "date": date, "cost": cost,
+    } for stop_id, date, cost in ACTIVITIES])
+    await db.expenses.insert_many([{
+        "id": str(uuid.uuid4()), "trip_id": TRIP_ID, "category": category, "amount": amount, "date": date,
+    } for category, date, amount in EXPENSES])
+    # Another trip's rows must not leak in
+    await db.expenses.insert_one({"id": str(uuid.uuid4()), "trip_id": "trip-2", "category": "food", "amount": 999.0, "date": "2025-06-01"})
+
+# ==================== LEGACY SUMMING ====================
+
+# The Python-side summing the endpoint used before the $group pipeline
+
+def legacy_breakdown(activities, expenses) -> dict:
+    breakdown = {category: sum(amount for c, _, amount in expenses if c == category) for category in EXPENSE_CATEGORIES}
+    breakdown["activities"] += sum(cost for _, _, cost in activities)
+    return breakdown
+
+def legacy_stop_for_date(date: str):
+    for stop in STOPS:
+        if stop['start_date'] <= date <= stop['end_date']:
+            return stop['id']
+    return None
+
+def assert_breakdown(expected: dict, actual: dict):
+    assert set(actual) == set(EXPENSE_CATEGORIES)
+    for category in EXPENSE_CATEGORIES:
+        assert actual[category] == pytest.approx(expected[category]), category
+
+# ==================== TESTS ====================
+
+async def test_default_matches_legacy(db):
+    await seed(db)
+    result = await compute_budget(db, TRIP_ID)
+
+    expected = legacy_breakdown(ACTIVITIES, EXPENSES)
+    assert_breakdown(expected, result["breakdown"])
+    assert result["total"] == pytest.approx(sum(expected.values()))
+    assert result["activities_count"] == len(ACTIVITIES)
+    assert result["expenses_count"] == len(EXPENSES)
+    assert "by_day" not in result and "by_stop" not in result
+
+async def test_day_mode(db):
+    await seed(db)
+    result = await compute_budget(db, TRIP_ID, "day")
+
+    dates = sorted({date for _, date, _ in ACTIVITIES} | {date for category, date, _ in EXPENSES if category in EXPENSE_CATEGORIES})
+    assert [day["date"] for day in result["by_day"]] == dates
+    for day in result["by_day"]:
+        expected = legacy_breakdown(
+            [a for a in ACTIVITIES if a[1] == day["date"]],
+            [e for e in EXPENSES if e[1] == day["date"]]
+        )
+        assert_breakdown(expected, day["breakdown"])
+        assert day["total"] == pytest.approx(sum(expected.values()))
+
+    # Days add up to the trip
+    assert sum(day["total"] for day in result["by_day"]) == pytest.approx(result["total"])
+    assert_breakdown(legacy_breakdown(ACTIVITIES, EXPENSES), result["breakdown"])
+
+async def test_stop_mode(db):
+    await seed(db)
+    result = await compute_budget(db, TRIP_ID, "stop")
+
+    assert [stop["stop_id"] for stop in result["by_stop"]] == ["stop-a", "stop-b"]
+    assert [stop["city_name"] for stop in result["by_stop"]] == ["Paris", "Rome"]
+    for stop in result["by_stop"]:
+        expected = legacy_breakdown(
+            [a for a in ACTIVITIES if a[0] == stop["stop_id"]],
+            [e for e in EXPENSES if legacy_stop_for_date(e[1]) == stop["stop_id"]]
+        )
+        assert_breakdown(expected, stop["breakdown"])
+        assert stop["total"] == pytest.approx(sum(expected.values()))
+
+    # The removed stop's activity and the expense outside every stop
+    expected = legacy_breakdown(
+        [a for a in ACTIVITIES if a[0] not in {"stop-a", "stop-b"}],
+        [e for e in EXPENSES if legacy_stop_for_date(e[1]) is None]
+    )
+    assert_breakdown(expected, result["unassigned"]["breakdown"])
+    assert sum(stop["total"] for stop in result["by_stop"]) + result["unassigned"]["total"] == pytest.approx(result["total"])
+
+async def test_empty_trip(db):
+    await db.stops.insert_many([dict(stop) for stop in STOPS])
+    for group_by in (None, "day", "stop"):
+        result = await compute_budget(db, TRIP_ID, group_by)
+        assert result["total"] == 0
+        assert result["activities_count"] == result["expenses_count"] == 0
+        assert_breakdown({category: 0 for category in EXPENSE_CATEGORIES}, result["breakdown"])
+    assert [stop["total"] for stop in result["by_stop"]] == [0, 0]
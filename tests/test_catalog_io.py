@@ -0,0 +1,79 @@
+import gzip
+
+import pytest
+
+from catalog_io import CITY_FIELDS, CITY_REQUIRED, TEMPLATE_FIELDS, TEMPLATE_REQUIRED, ImportAborted, ImportStats
+from catalog_io import city_id_for, coerce, import_catalog, read_rows, template_id_for
+
+def city(name: str, country: str = "France") -> dict:
+    return {"name": name, "country": country, "cost_index": 1.2, "popularity": 50}
+
+def test_coerce_casts_csv_strings():
+    row = {"name": "Louvre", "category": "culture", "duration": "3.0", "estimated_cost": "17.5", "extra": "x"}
+    assert coerce(row, TEMPLATE_FIELDS, TEMPLATE_REQUIRED) == {
+        "name": "Louvre", "category": "culture", "duration": 3, "estimated_cost": 17.5,
+    }
+
+def test_coerce_rejects_bad_values_and_missing_fields():
+    with pytest.raises(ValueError, match="cost_index is not a valid float: 'cheap'"):
+        coerce({**city("Paris"), "cost_index": "cheap"}, CITY_FIELDS, CITY_REQUIRED)
+    with pytest.raises(ValueError, match="missing country, popularity"):
+        coerce({"name": "Paris", "cost_index": 2}, CITY_FIELDS, CITY_REQUIRED)
+
+def test_ids_stable_across_spelling():
+    assert city_id_for("São Paulo", "Brazil") == city_id_for("sao  paulo", "BRAZIL")
+    assert city_id_for("Paris", "France") != city_id_for("Paris", "United States")
+    paris = city_id_for("Paris", "France")
+    assert template_id_for(paris, "Louvre Museum") == template_id_for(paris, "louvre museum")
+
+def test_refusal_reasons():
+    stats = ImportStats()
+    assert stats.refusal(0.05) == "no valid rows"
+    stats.read, stats.written, stats.invalid = 20, 19, 1
+    assert stats.refusal(0.05) is None
+    stats.read, stats.written, stats.invalid = 20, 18, 2
+    assert stats.refusal(0.05) == "2 of 20 rows invalid (limit 5%)"
+
+def test_read_rows_csv_drops_empty_cells(tmp_path):
+    path = tmp_path / "cities.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        f.write("name,country,cost_index,popularity,description\nParis,France,8,90,\n")
+    assert list(read_rows(path)) == [{"name": "Paris", "country": "France", "cost_index": "8", "popularity": "90"}]
+
+@pytest.mark.anyio
+async def test_swap_replaces_catalog(mock_db):
+    await import_catalog(mock_db, [city("Paris"), city("Lyon")])
+    report = await import_catalog(mock_db, [city("Paris")])
+    assert report["cities"]["written"] == 1
+    assert [doc['name'] async for doc in mock_db.cities.find({})] == ["Paris"]
+
+@pytest.mark.anyio
+async def test_swap_with_no_valid_rows_keeps_live_catalog(mock_db):
+    await import_catalog(mock_db, [city("Paris"), city("Lyon")])
+    # A CSV with the wrong header: every row is missing its fields
+    with pytest.raises(ImportAborted) as aborted:
+        await import_catalog(mock_db, [{"nom": "Paris"}, {"nom": "Lyon"}])
+    assert aborted.value.report["cities"]["invalid"] == 2
+    assert await mock_db.cities.count_documents({}) == 2
+    assert await mock_db.list_collection_names() == ["cities", "catalog_meta"]
+
+@pytest.mark.anyio
+async def test_swap_over_invalid_threshold_keeps_live_catalog(mock_db):
+    await import_catalog(mock_db, [city("Paris")])
+    rows = [city(f"City {i}") for i in range(9)] + [{"name": "No country"}]
+    with pytest.raises(ImportAborted):
+        await import_catalog(mock_db, rows, max_invalid=0.05)
+    assert await mock_db.cities.count_documents({}) == 1
+
+    report = await import_catalog(mock_db, rows, max_invalid=0.2)
+    assert report["cities"]["invalid"] == 1
+    assert await mock_db.cities.count_documents({}) == 9
+
+@pytest.mark.anyio
+async def test_templates_checked_before_cities_swap(mock_db):
+    await import_catalog(mock_db, [city("Paris")])
+    templates = [{"name": "Louvre", "city": "Rome", "country": "Italy", "category": "culture", "duration": 3, "estimated_cost": 20}]
+    # Every template points at an unknown city, so neither collection is swapped
+    with pytest.raises(ImportAborted):
+        await import_catalog(mock_db, [city("Lyon")], templates)
+    assert [doc['name'] async for doc in mock_db.cities.find({})] == ["Paris"]
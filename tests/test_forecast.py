@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from forecast import CityCosts, baseline_vector, forecast_matrix, forecast_totals, forecast_trip, parse_baselines
+from pipelines import EXPENSE_CATEGORIES
+
+BASELINES = {"transport": 1.0, "accommodation": 10.0, "food": 4.0, "activities": 0.0, "other": 0.0}
+
+def city(id: str, cost_index, name: str = None) -> dict:
+    return {"id": id, "name": name or id, "country": "X", "cost_index": cost_index}
+
+@pytest.fixture
+def costs() -> CityCosts:
+    costs = CityCosts()
+    costs.build([city("paris", 8), city("lisbon", 4), city("hanoi", 2), city("unpriced", None)])
+    return costs
+
+def test_parse_baselines_overrides_defaults():
+    baselines = parse_baselines("food=6, accommodation = 15")
+    assert baselines['food'] == 6.0 and baselines['accommodation'] == 15.0
+    assert baselines['transport'] == 2.0
+
+def test_totals_match_matrix():
+    rng = np.random.default_rng(0)
+    cost_index, days = rng.uniform(1, 10, 50), rng.integers(1, 15, 50)
+    vector = baseline_vector(BASELINES)
+    assert np.allclose(forecast_totals(cost_index, days, vector), forecast_matrix(cost_index, days, vector).sum(axis=1))
+
+def test_score_marks_unknown_cities(costs):
+    totals = costs.score(["lisbon", "nowhere", "unpriced"], [3, 3, 3], BASELINES)
+    assert totals[0] == 4 * 3 * 15.0
+    assert np.isnan(totals[1]) and np.isnan(totals[2])
+
+def test_cheapest_sorted_and_limited(costs):
+    result = costs.cheapest(2, 2, BASELINES)
+    assert [item['city_id'] for item in result] == ["hanoi", "lisbon"]
+    assert result[0]['total'] == 2 * 2 * 15.0
+    assert result[0]['breakdown']['accommodation'] == 40.0
+    assert costs.cheapest(2, 0, BASELINES) == []
+
+def test_forecast_trip_counts_shared_day_once(costs):
+    stops = [
+        {"id": "s1", "city_id": "lisbon", "order": 1, "start_date": "2025-06-03", "end_date": "2025-06-04"},
+        {"id": "s0", "city_id": "paris", "order": 0, "start_date": "2025-06-01", "end_date": "2025-06-03"},
+        {"id": "s2", "city_id": "nowhere", "order": 2, "start_date": "2025-06-05", "end_date": "2025-06-05"},
+    ]
+    forecast = forecast_trip(costs, stops, BASELINES)
+
+    assert [(s['stop_id'], s['days']) for s in forecast['stops']] == [("s0", 3), ("s1", 1), ("s2", 1)]
+    # Unknown cities cost nothing rather than failing the forecast
+    assert forecast['stops'][2]['cost_index'] is None and forecast['stops'][2]['total'] == 0.0
+    assert forecast['total'] == 3 * 8 * 15.0 + 4 * 15.0
+    assert forecast['breakdown']['food'] == 3 * 8 * 4.0 + 4 * 4.0
+    assert set(forecast['breakdown']) == set(EXPENSE_CATEGORIES)
+    assert [day['total'] for day in forecast['days']] == [120.0] * 3 + [60.0, 0.0]
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pytest
+
+from migrations.native_dates import convert, convert_once
+
+pytestmark = pytest.mark.anyio
+
+async def test_converts_strings_and_skips_bad_rows(mock_db):
+    await mock_db.trips.insert_many([
+        {"id": "a", "created_at": "2025-06-01T10:00:00+00:00"},
+        {"id": "b", "created_at": "yesterday"},
+        {"id": "c", "created_at": datetime(2025, 6, 2)},
+    ])
+    result = await convert(mock_db)
+    assert result["converted"]["trips"] == 1
+    assert result["skipped"]["trips"] == 1
+
+    rows = {doc['id']: doc['created_at'] async for doc in mock_db.trips.find({})}
+    assert isinstance(rows["a"], datetime)
+    assert rows["b"] == "yesterday"
+    assert rows["c"] == datetime(2025, 6, 2)
+
+async def test_convert_once_runs_once(mock_db):
+    await mock_db.posts.insert_one({"id": "p", "created_at": "2025-06-01T10:00:00"})
+    assert (await convert_once(mock_db))["converted"]["posts"] == 1
+
+    # Rows written as strings after the first run are the CLI's business
+    await mock_db.posts.insert_one({"id": "q", "created_at": "2025-06-02T10:00:00"})
+    assert await convert_once(mock_db) is None
+    assert await mock_db.posts.count_documents({"created_at": {"$type": "string"}}) == 1
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, fetch_page, keyset_filter
+
+SORT = [("created_at", -1), ("id", 1)]
+
+def test_cursor_round_trips_datetimes():
+    created = datetime(2025, 6, 1, 12, 30, tzinfo=timezone.utc)
+    token = encode_cursor([created, "t-7"])
+    assert "=" not in token
+    assert decode_cursor(token, SORT) == [created, "t-7"]
+
+def test_malformed_cursor_rejected():
+    with pytest.raises(InvalidCursor, match="Malformed"):
+        decode_cursor("not base64 json!", SORT)
+
+def test_cursor_from_another_listing_rejected():
+    with pytest.raises(InvalidCursor, match="does not match"):
+        decode_cursor(encode_cursor(["t-7"]), SORT)
+
+def test_keyset_filter_flips_descending_keys():
+    assert keyset_filter(SORT, ["d", "t-7"]) == {"$or": [
+        {"created_at": {"$lt": "d"}},
+        {"created_at": "d", "id": {"$gt": "t-7"}},
+    ]}
+
+@pytest.mark.anyio
+async def test_pages_cover_every_document_once(mock_db):
+    # Ties on created_at exercise the id tiebreaker
+    await mock_db.trips.insert_many([
+        {"id": f"t-{i:02d}", "created_at": datetime(2025, 6, 1 + i // 3, tzinfo=timezone.utc)} for i in range(10)
+    ])
+    seen, cursor = [], None
+    while True:
+        docs, cursor = await fetch_page(mock_db.trips, {}, SORT, 4, cursor)
+        seen.extend(doc['id'] for doc in docs)
+        if cursor is None:
+            break
+
+    expected = [doc['id'] for doc in sorted(
+        await mock_db.trips.find({}).to_list(None), key=lambda d: (-d['created_at'].timestamp(), d['id'])
+    )]
+    assert seen == expected and len(seen) == 10
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from benchmarks.bench_planner import CATEGORIES, brute_force, check_plan, make_templates
+from planner import CityTemplates, PlannerIndex, plan_trip, solve, trip_days
+
+def template(id: str, city_id: str, duration: int, cost: float, category: str = "food") -> dict:
+    return {"id": id, "city_id": city_id, "name": id, "category": category, "duration": duration, "estimated_cost": cost}
+
+def stop(id: str, city_id: str, order: int, start: str, end: str) -> dict:
+    return {"id": id, "city_id": city_id, "order": order, "start_date": start, "end_date": end}
+
+def test_trip_days_shared_day_goes_to_first_stop():
+    stops = [stop("b", "rome", 1, "2025-06-03", "2025-06-04"), stop("a", "paris", 0, "2025-06-01", "2025-06-03")]
+    assert [(day, s['id']) for day, s in trip_days(stops)] == [
+        ("2025-06-01", "a"), ("2025-06-02", "a"), ("2025-06-03", "a"), ("2025-06-04", "b"),
+    ]
+
+def test_revisited_city_does_not_reuse_templates():
+    index = PlannerIndex()
+    index.build([template(f"{city}-{i}", city, 2, 10.0) for city in ("paris", "rome") for i in range(3)])
+    stops = [
+        stop("s0", "paris", 0, "2025-06-01", "2025-06-01"),
+        stop("s1", "rome", 1, "2025-06-02", "2025-06-02"),
+        stop("s2", "paris", 2, "2025-06-03", "2025-06-03"),
+    ]
+    plan = plan_trip(index, stops, 1000.0, {}, 4)
+
+    ids = [t['id'] for day in plan['days'] for t in day['activities']]
+    assert len(ids) == len(set(ids)) == 5
+    # Paris has three 2h templates: two fit the first visit, one is left
+    assert [len(day['activities']) for day in plan['days']] == [2, 2, 1]
+
+def test_budget_respected_and_unknown_city_empty():
+    index = PlannerIndex()
+    index.build([template(f"t{i}", "paris", 1, 40.0) for i in range(5)])
+    stops = [stop("s0", "paris", 0, "2025-06-01", "2025-06-02"), stop("s1", "nowhere", 1, "2025-06-03", "2025-06-03")]
+    plan = plan_trip(index, stops, 100.0, {}, 8)
+    assert plan['total_cost'] == 80.0
+    assert plan['days'][-1]['activities'] == []
+
+def test_zero_weight_categories_skipped():
+    city = CityTemplates([template("museum", "paris", 2, 0.0, "culture"), template("bar", "paris", 2, 0.0, "nightlife")])
+    chosen, score, _ = solve([(city, 1)], 100.0, {"culture": 1.0, "nightlife": 0.0}, 8)
+    assert [t['id'] for t in chosen[0][0]] == ["museum"]
+    assert score == 2.0
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    stops = rng.randint(1, 3)
+    cities = [CityTemplates(make_templates(rng, [f"city-{c}"], rng.randint(2, 4), max_duration=4, free=0.2)) for c in range(stops)]
+    # Later stops sometimes go back to an earlier city
+    city_days = [(rng.choice(cities[:s + 1]) if s and rng.random() < 0.5 else cities[s], rng.randint(1, 2)) for s in range(stops)]
+    weights = {category: rng.choice([0.0, 0.5, 1.0, 2.0]) for category in CATEGORIES}
+    hours = rng.randint(2, 6)
+    budget = float(rng.randint(0, 400))
+
+    chosen, score, _ = solve(city_days, budget, weights, hours)
+    check_plan(chosen, city_days, budget, hours)
+    optimum = brute_force(city_days, budget, weights, hours)
+    # The relaxation is a heuristic: never above the optimum, rarely below
+    assert score <= optimum + 1e-9
+    assert score >= 0.75 * optimum - 1e-9
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import principal_cache
+from principal_cache import PrincipalCache
+
+pytestmark = pytest.mark.anyio
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class MemoryBackend:
+    # Stands in for RedisPrincipalBackend: a shared store plus a broadcast
+    def __init__(self):
+        self.store = {}
+        self.subscribers = []
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("backend down")
+        return self.store.get(key)
+
+    async def set(self, key, value):
+        if self.fail:
+            raise ConnectionError("backend down")
+        self.store[key] = value
+
+    async def invalidate(self, key):
+        self.store.pop(key, None)
+        for on_invalidate in self.subscribers:
+            on_invalidate(key)
+
+    async def subscribe(self, on_invalidate):
+        self.subscribers.append(on_invalidate)
+
+    async def close(self):
+        pass
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(principal_cache.time, "monotonic", clock.monotonic)
+    return clock
+
+def shared_cache(backend: MemoryBackend, ttl: float = 60) -> PrincipalCache:
+    return PrincipalCache(ttl=ttl, max_size=100, backend=backend, dumps=lambda v: json.dumps(v).encode(), loads=json.loads)
+
+async def test_hit_until_ttl(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    await cache.set("u1", {"id": "u1"})
+    assert await cache.get("u1") == {"id": "u1"}
+
+    clock.now += 61
+    assert await cache.get("u1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+async def test_least_recently_used_evicted(clock):
+    cache = PrincipalCache(ttl=60, max_size=2)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    # Touching a makes b the oldest
+    await cache.get("a")
+    await cache.set("c", 3)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1 and await cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+async def test_disabled_cache_stores_nothing(clock):
+    cache = PrincipalCache(ttl=0, max_size=10)
+    await cache.set("a", 1)
+    assert await cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+async def test_invalidate_reaches_other_workers(clock):
+    backend = MemoryBackend()
+    first, second = shared_cache(backend), shared_cache(backend)
+    await first.start()
+    await second.start()
+
+    await first.set("u1", {"name": "Old"})
+    # The second worker fills its local copy from the shared store
+    assert await second.get("u1") == {"name": "Old"}
+
+    await first.invalidate("u1")
+    assert await second.get("u1") is None
+    assert await first.get("u1") is None
+
+async def test_backend_failure_falls_back_to_miss(clock):
+    backend = MemoryBackend()
+    cache = shared_cache(backend)
+    backend.fail = True
+    await cache.set("u1", {"id": "u1"})
+    # Still cached locally; only the shared copy failed
+    assert await cache.get("u1") == {"id": "u1"}
+    cache.clear()
+    assert await cache.get("u1") is None
@@ -0,0 +1,86 @@
+import pytest
+
+import public_cache
+from public_cache import PublicTripCache
+
+pytestmark = pytest.mark.anyio
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(public_cache.time, "monotonic", clock.monotonic)
+    return clock
+
+def make_cache(published: dict, checks: list, **options) -> PublicTripCache:
+    async def revalidate(key):
+        checks.append(key)
+        return published.get(key[0], False)
+    return PublicTripCache(ttl=30, max_size=10, revalidate=revalidate, **options)
+
+def loader(trip_id: str, payload: dict):
+    async def load():
+        return trip_id, payload
+    return load
+
+async def test_hits_revalidate_once_per_interval(clock):
+    published, checks = {"url-1": True}, []
+    cache = make_cache(published, checks, revalidate_interval=1.0)
+    key = ("url-1", None, 10)
+    await cache.get_or_load(key, loader("trip-1", {"name": "A"}))
+
+    for _ in range(100):
+        assert await cache.get_or_load(key, loader("trip-1", {})) is not None
+    assert checks == []
+
+    clock.now += 1.5
+    for _ in range(100):
+        await cache.get_or_load(key, loader("trip-1", {}))
+    assert checks == [key]
+    assert cache.stats()["hits"] == 200
+
+async def test_unpublished_trip_is_dropped_after_interval(clock):
+    published, checks = {"url-1": True}, []
+    cache = make_cache(published, checks, revalidate_interval=1.0)
+    key = ("url-1", None, 10)
+    await cache.get_or_load(key, loader("trip-1", {"name": "A"}))
+
+    # Another worker unpublishes; this one hasn't heard about it
+    published["url-1"] = False
+    clock.now += 2
+
+    async def not_found():
+        return None
+    assert await cache.get_or_load(key, not_found) is None
+    assert cache.stats()["revoked"] == 1
+    assert cache.stats()["size"] == 0
+
+async def test_shared_channel_skips_revalidation(clock):
+    class Channel:
+        async def publish(self, trip_id):
+            self.on_invalidate(trip_id)
+
+        async def subscribe(self, on_invalidate):
+            self.on_invalidate = on_invalidate
+
+        async def close(self):
+            pass
+
+    published, checks = {"url-1": True}, []
+    cache = make_cache(published, checks, channel=Channel())
+    await cache.start()
+    key = ("url-1", None, 10)
+    await cache.get_or_load(key, loader("trip-1", {"name": "A"}))
+    clock.now += 10
+    await cache.get_or_load(key, loader("trip-1", {}))
+    assert checks == []
+
+    # A broadcast from any worker drops the pages
+    cache.channel.on_invalidate("trip-1")
+    assert cache.stats()["size"] == 0
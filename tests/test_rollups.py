@@ -0,0 +1,63 @@
+import pytest
+
+import rollups
+from budget import empty_breakdown
+
+pytestmark = pytest.mark.anyio
+
+TRIP_ID = "trip-1"
+
+def fake_source(monkeypatch, expenses: list, during_compute=None):
+    # compute_budget over an in-memory list of (category, amount); the
+    # hook runs after the first computation has read it, like a write
+    # landing between the aggregate and the rollup write
+    calls = []
+
+    async def compute(db, trip_id):
+        breakdown = empty_breakdown()
+        for category, amount in expenses:
+            breakdown[category] += amount
+        budget = {"total": sum(breakdown.values()), "breakdown": breakdown,
+                  "activities_count": 0, "expenses_count": len(expenses)}
+        calls.append(trip_id)
+        if during_compute and len(calls) == 1:
+            await during_compute()
+        return budget
+    monkeypatch.setattr(rollups, "compute_budget", compute)
+    return calls
+
+async def test_missing_rollup_keeps_increment_made_during_rebuild(mock_db, monkeypatch):
+    expenses = [("food", 10.0)]
+
+    async def concurrent_write():
+        expenses.append(("food", 5.0))
+        await rollups.record_expense(mock_db, TRIP_ID, "food", 5.0)
+    calls = fake_source(monkeypatch, expenses, concurrent_write)
+
+    await rollups.rebuild_rollup(mock_db, TRIP_ID, "user-1")
+    assert len(calls) == 2
+    budget = await rollups.read_budget(mock_db, TRIP_ID, "user-1")
+    assert budget["breakdown"]["food"] == 15.0
+    assert budget["expenses_count"] == 2
+
+async def test_placeholder_is_not_read(mock_db, monkeypatch):
+    # A rebuild that never settles leaves only a placeholder behind
+    async def keep_writing():
+        await rollups.record_expense(mock_db, TRIP_ID, "food", 1.0)
+    fake_source(monkeypatch, [], keep_writing)
+    monkeypatch.setattr(rollups, "REBUILD_ATTEMPTS", 1)
+
+    await rollups.rebuild_rollup(mock_db, TRIP_ID, "user-1")
+    assert await mock_db.trip_budget_rollups.count_documents({"trip_id": TRIP_ID, "building": True}) == 1
+    assert await rollups.read_budget(mock_db, TRIP_ID, "user-1") is None
+
+async def test_rebuild_replaces_drifted_rollup(mock_db, monkeypatch):
+    fake_source(monkeypatch, [("transport", 40.0)])
+    await rollups.init_rollup(mock_db, TRIP_ID, "user-1")
+    await rollups.record_expense(mock_db, TRIP_ID, "transport", 999.0)
+
+    await rollups.rebuild_rollup(mock_db, TRIP_ID, "user-1")
+    rollup = await mock_db.trip_budget_rollups.find_one({"trip_id": TRIP_ID})
+    assert rollup["breakdown"]["transport"] == 40.0
+    assert rollup["version"] == 2
+    assert "building" not in rollup
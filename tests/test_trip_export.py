@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from trip_export import CHUNK_ROWS, CSV_FIELDS, _ics_fold, _ics_text, encode, gzipped
+
+pytestmark = pytest.mark.anyio
+
+TRIP = {"id": "trip-1", "name": "Summer", "start_date": "2025-06-01", "end_date": "2025-06-03", "status": "upcoming"}
+STOP = {"id": "stop-1", "trip_id": "trip-1", "city_name": "Paris", "country": "France",
+        "start_date": "2025-06-01", "end_date": "2025-06-02"}
+ACTIVITY = {"id": "act-1", "trip_id": "trip-1", "stop_id": "stop-1", "activity_name": "Louvre, then dinner",
+            "category": "culture", "date": "2025-06-02", "time": "09:30", "duration": 3, "cost": 17.5}
+EXPENSE = {"id": "exp-1", "trip_id": "trip-1", "category": "food", "date": "2025-06-02", "amount": 40.0}
+
+async def records(items):
+    for item in items:
+        yield item
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+async def test_ics_skips_records_with_unparseable_dates():
+    stop = {"id": "stop-1", "trip_id": "trip-1", "city_name": "Paris", "country": "France",
+            "start_date": "early June", "end_date": "2025-06-02"}
+    body = await collect(encode(records([("trip", TRIP, None), ("stop", stop, None)]), "ics"))
+    assert body.count(b"BEGIN:VEVENT") == 1
+    assert b"UID:trip-trip-1@globetrotter" in body
+    assert body.endswith(b"END:VCALENDAR\r\n")
+
+def sample():
+    return records([("trip", TRIP, None), ("stop", STOP, None), ("activity", ACTIVITY, STOP), ("expense", EXPENSE, None)])
+
+def test_ics_fold_splits_between_utf8_sequences():
+    line = "SUMMARY:" + "é" * 80
+    folded = _ics_fold(line)
+    parts = folded[:-2].split(b"\r\n ")
+    assert all(len(part) <= 75 for part in parts)
+    # Every part decodes on its own, so no sequence was cut in half
+    assert "".join(part.decode() for part in parts) == line
+    assert _ics_fold("SHORT") == b"SHORT\r\n"
+
+def test_ics_text_escapes():
+    assert _ics_text("a,b;c\\d\ne") == "a\\,b\\;c\\\\d\\ne"
+
+async def test_ics_events():
+    body = (await collect(encode(sample(), "ics", "My trip"))).decode()
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and "X-WR-CALNAME:My trip\r\n" in body
+    # Expenses are left out of the calendar
+    assert body.count("BEGIN:VEVENT") == 3
+    # All-day DTEND is exclusive
+    assert "DTSTART;VALUE=DATE:20250601\r\nDTEND;VALUE=DATE:20250604\r\n" in body
+    assert "DTSTART:20250602T093000\r\nDURATION:PT3H\r\n" in body
+    assert "SUMMARY:Louvre\\, then dinner\r\n" in body
+    assert "LOCATION:Paris\\, France\r\n" in body
+
+async def test_csv_rows():
+    body = (await collect(encode(sample(), "csv"))).decode()
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert list(rows[0]) == CSV_FIELDS
+    assert [row['type'] for row in rows] == ["trip", "stop", "activity", "expense"]
+    assert rows[2]['name'] == "Louvre, then dinner" and rows[2]['city'] == "Paris" and rows[2]['amount'] == "17.5"
+    assert rows[3]['amount'] == "40.0" and rows[3]['name'] == ""
+
+async def test_ndjson_lines_tagged_with_type():
+    body = await collect(encode(sample(), "ndjson"))
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line['type'] for line in lines] == ["trip", "stop", "activity", "expense"]
+    assert lines[2] == {"type": "activity", **ACTIVITY}
+
+async def test_gzipped_chunks_decompress():
+    expenses = [("expense", {**EXPENSE, "id": f"exp-{i}"}, None) for i in range(CHUNK_ROWS * 2 + 1)]
+    plain = [chunk async for chunk in encode(records(expenses), "ndjson")]
+    assert len(plain) == 3
+    body = await collect(gzipped(encode(records(expenses), "ndjson")))
+    assert gzip.decompress(body) == b"".join(plain)